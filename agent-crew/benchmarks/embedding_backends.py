@@ -0,0 +1,90 @@
+"""
+쿼리 임베딩 백엔드 비교 벤치마크 (PyTorch vs int8 ONNX)
+
+각 백엔드를 별도 프로세스에서 로드하여 단일 쿼리 처리량(QPS)과 최대 RSS를 측정하고,
+두 백엔드가 만든 임베딩의 코사인 유사도로 정합성(parity)을 검사합니다.
+최소 코사인 유사도가 --min-cosine 미만이면 종료 코드 1을 반환하므로 배포 전 검증에 사용할 수 있습니다.
+
+실행 (agent-crew 디렉터리에서):
+    python -m benchmarks.embedding_backends --min-cosine 0.99
+"""
+import argparse
+import json
+import resource
+import time
+import multiprocessing as mp
+import numpy as np
+
+SAMPLE_FILES = ["benchmarks/data/routing_samples.jsonl", "benchmarks/data/retrieval_queries.jsonl"]
+
+
+def load_texts():
+    texts = []
+    for path in SAMPLE_FILES:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    item = json.loads(line)
+                    texts.append(item.get("body") or item.get("query"))
+    return texts
+
+
+def measure_backend(backend: str, texts, rounds: int, queue):
+    from utils.embeddings import build_embedding_model
+
+    start = time.perf_counter()
+    # 정합성은 이 벤치마크가 직접 측정하므로 로드 시 검사(및 PyTorch 대체)는 생략
+    model = build_embedding_model(backend, check_parity=False)
+    model.embed_query("warm up")
+    load_s = time.perf_counter() - start
+
+    vectors = [model.embed_query(t) for t in texts]
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for t in texts:
+            model.embed_query(t)
+    elapsed = time.perf_counter() - start
+
+    queue.put({
+        "backend": backend,
+        "load_s": load_s,
+        "qps": rounds * len(texts) / elapsed,
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "vectors": vectors,
+    })
+
+
+def run_isolated(backend: str, texts, rounds: int) -> dict:
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=measure_backend, args=(backend, texts, rounds, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def cosine(a, b) -> float:
+    a, b = np.asarray(a), np.asarray(b)
+    return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Embedding backend parity & throughput benchmark")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--min-cosine", type=float, default=0.99)
+    args = parser.parse_args()
+
+    sample_texts = load_texts()
+    torch_res = run_isolated("torch", sample_texts, args.rounds)
+    onnx_res = run_isolated("onnx", sample_texts, args.rounds)
+
+    sims = [cosine(a, b) for a, b in zip(torch_res.pop("vectors"), onnx_res.pop("vectors"))]
+    report = {
+        "texts": len(sample_texts),
+        "torch": torch_res,
+        "onnx": onnx_res,
+        "parity": {"min_cosine": min(sims), "mean_cosine": float(np.mean(sims)), "threshold": args.min_cosine},
+    }
+    print(json.dumps(report, indent=2))
+    raise SystemExit(0 if min(sims) >= args.min_cosine else 1)
@@ -0,0 +1,76 @@
+"""
+하이브리드(BM25 + 벡터) 검색 벤치마크
+
+라벨링된 질의 세트(JSONL: query, source_file, answer_contains)에 대해 벡터 단독 검색과
+하이브리드 검색의 recall@k 및 지연 시간(p50/p95)을 비교합니다.
+정답 판정은 상위 k개 청크 중 하나라도 answer_contains 문구를 포함하는지로 합니다.
+(청크 ID에 의존하지 않으므로 CHUNK_SIZE 등을 바꿔 재인제스천해도 라벨을 재사용할 수 있습니다.)
+answer_contains는 '졸업' 같은 주제어가 아니라 정답 청크에만 있는 구체적 사실 문구(예: '최소 이수 학점은 130학점')로
+지정해야 순위 회귀를 잡을 수 있습니다.
+
+실행 (agent-crew 디렉터리에서, ChromaDB와 RAG_ARTIFACT_DIR 의 어휘 색인 필요):
+    python -m benchmarks.hybrid_retrieval --queries benchmarks/data/retrieval_queries.jsonl
+"""
+import argparse
+import json
+import time
+from statistics import quantiles
+
+from tools.rag_tools import SearchInternalDocsTool
+from utils.lexical_index import lexical_index
+from utils.retrieval_cache import retrieval_cache
+
+
+def load_queries(path: str):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def percentile(values, pct: int) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return quantiles(values, n=100, method="inclusive")[pct - 1]
+
+
+def evaluate(tool: SearchInternalDocsTool, queries, ks) -> dict:
+    hits = {k: 0 for k in ks}
+    latencies = []
+    for item in queries:
+        start = time.perf_counter()
+        results = tool.retrieve(item["query"], item["source_file"])
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        texts = [doc.page_content for doc, _ in results]
+        for k in ks:
+            if any(any(phrase in text for phrase in item["answer_contains"]) for text in texts[:k]):
+                hits[k] += 1
+
+    return {
+        **{f"recall@{k}": hits[k] / len(queries) for k in ks},
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hybrid retrieval benchmark")
+    parser.add_argument("--queries", default="benchmarks/data/retrieval_queries.jsonl")
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 6])
+    args = parser.parse_args()
+    # 검색 경로 자체를 측정하도록 검색 결과 캐시는 끔 (벡터 단독/하이브리드 비교가 캐시 결과를 공유하지 않도록)
+    retrieval_cache.max_entries = 0
+
+    query_set = load_queries(args.queries)
+    search_tool = SearchInternalDocsTool()
+
+    # 벡터 단독
+    search_tool._lexical_index = None
+    vector_report = evaluate(search_tool, query_set, args.k)
+
+    # 하이브리드
+    search_tool._lexical_index = lexical_index
+    if not lexical_index.is_available():
+        raise SystemExit(f"Lexical index not found: {lexical_index.path}")
+    hybrid_report = evaluate(search_tool, query_set, args.k)
+
+    print(json.dumps({"queries": len(query_set), "vector": vector_report, "hybrid": hybrid_report}, indent=2))
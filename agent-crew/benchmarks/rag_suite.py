@@ -0,0 +1,268 @@
+"""
+RAG 검색 회귀 벤치마크
+
+라벨링된 규정 질의 세트(JSONL: query, source_file, answer_contains, search_queries)로
+SearchInternalDocsTool 과 AdaptiveRagSearchTool 을 실행하여 다음을 보고합니다.
+    - recall@k, MRR : 정답 문구(answer_contains)를 포함한 첫 결과의 순위 기준
+    - context_tokens : 도구가 LLM에 넘기는 결과 문자열(문맥 확장 포함)의 토큰 수
+    - p50/p95 지연 시간
+AdaptiveRagSearchTool 의 검색 계획(LLM)은 라벨의 source_file / search_queries 를 돌려주는 스텁으로 대체하므로
+OpenAI 호출 없이 검색 경로만 측정합니다.
+
+백엔드
+    --backend fixture : 픽스처 코퍼스(JSONL: source, page_number, text)를 CHUNK_SIZE / CHUNK_OVERLAP 으로
+                        인제스천의 분할/ID 함수(data-pipelines/chunking.py)로 분할하여 메모리 내 인덱스(벡터 + BM25)를 구성
+                        (파일 내 chunk_id, 내용 해시 ID가 운영 컬렉션과 같은 규칙)
+    --backend env     : VECTOR_BACKEND 설정(ChromaDB 또는 로컬 스냅샷)과 RAG_ARTIFACT_DIR 의 어휘 색인을 그대로 사용
+
+결과 JSON은 키를 정렬해 출력하므로 CHUNK_SIZE, CHUNK_OVERLAP, VECTOR_DB_K 등을 바꾼 실행끼리 diff 할 수 있습니다.
+
+실행 (agent-crew 디렉터리에서):
+    CHUNK_SIZE=500 CHUNK_OVERLAP=100 python -m benchmarks.rag_suite --output rag_suite_500.json
+"""
+import os
+import sys
+import gzip
+import json
+import math
+import time
+import argparse
+import tempfile
+from collections import Counter
+from types import SimpleNamespace
+from statistics import mean
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from schemas.task_output import RagPlan
+from tools.rag_tools import SearchInternalDocsTool, AdaptiveRagSearchTool
+from utils.embeddings import get_embedding_model, EMBEDDING_BACKEND
+from utils.email_normalizer import estimate_tokens
+from utils.lexical_index import LexicalIndex, SUPPORTED_FORMAT, tokenize, lexical_index
+from utils.reranker import reranker
+from utils.retrieval_cache import retrieval_cache
+from benchmarks.hybrid_retrieval import load_queries, percentile
+
+# 픽스처 청크를 인제스천과 같은 규칙으로 만들기 위해 data-pipelines 모듈 사용 (저장소 체크아웃에서 실행)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data-pipelines"))
+from chunking import split_pages  # noqa: E402
+
+RESULT_MARKER = "=== [Result #"
+LEXICAL_NGRAM_SIZE = 2
+
+
+# --- 픽스처 코퍼스 기반 메모리 내 인덱스 ---
+def build_fixture_chunks(corpus_path: str, chunk_size: int, chunk_overlap: int) -> List[Document]:
+    """픽스처 페이지를 인제스천의 split_pages로 분할합니다. (파일 내 chunk_id, 내용 해시 Chroma ID)"""
+    with open(corpus_path, encoding="utf-8") as f:
+        pages = [json.loads(line) for line in f if line.strip()]
+    page_docs = [
+        Document(page_content=p["text"], metadata={"source": p["source"], "page_number": p["page_number"]})
+        for p in pages
+    ]
+    splits, chunk_ids = split_pages(page_docs, chunk_size, chunk_overlap)
+    for doc, chunk_id in zip(splits, chunk_ids):
+        doc.id = chunk_id
+    return splits
+
+
+class InMemoryBackend:
+    """utils/vector_backends.py 백엔드와 같은 인터페이스의 메모리 내 정확(flat) 검색 백엔드 (벤치마크 전용)"""
+
+    def __init__(self, chunks: List[Document]):
+        self._chunks = chunks
+        vectors = get_embedding_model().embed_documents([doc.page_content for doc in chunks])
+        self._matrix = np.asarray(vectors, dtype=np.float32)
+        self._sq_norms = np.einsum("ij,ij->i", self._matrix, self._matrix)
+        self._rows_by_source: Dict[str, np.ndarray] = {}
+        for row, doc in enumerate(chunks):
+            self._rows_by_source.setdefault(doc.metadata["source"], []).append(row)
+        self._rows_by_source = {s: np.asarray(rows) for s, rows in self._rows_by_source.items()}
+        self._row_by_id = {doc.id: row for row, doc in enumerate(chunks)}
+        self._row_by_chunk = {(doc.metadata["source"], doc.metadata["chunk_id"]): row for row, doc in enumerate(chunks)}
+
+    def search(self, vector: List[float], source_file: str, k: int) -> List[Tuple[Document, float]]:
+        rows = self._rows_by_source.get(source_file)
+        if rows is None:
+            return []
+        query = np.asarray(vector, dtype=np.float32)
+        distances = self._sq_norms[rows] - 2.0 * (self._matrix[rows] @ query) + float(query @ query)
+        order = np.argsort(distances)[:k]
+        return [(self._chunks[rows[i]], 1.0 - float(distances[i]) / math.sqrt(2)) for i in order]
+
+    def get_by_ids(self, ids: List[str], source_file: str) -> List[Document]:
+        return [self._chunks[self._row_by_id[doc_id]] for doc_id in ids if doc_id in self._row_by_id]
+
+    def get_chunk_text(self, source_file: str, chunk_id: int) -> Optional[str]:
+        row = self._row_by_chunk.get((source_file, chunk_id))
+        return self._chunks[row].page_content if row is not None else None
+
+    def list_sources(self) -> List[str]:
+        return sorted(self._rows_by_source.keys())
+
+
+def build_fixture_lexical_index(chunks: List[Document], directory: str) -> LexicalIndex:
+    """픽스처 청크로 인제스천과 같은 형식의 BM25 색인 파일을 만들고 LexicalIndex로 엽니다."""
+    sources: Dict[str, Dict] = {}
+    for doc in chunks:
+        part = sources.setdefault(doc.metadata["source"], {"ids": [], "lengths": [], "postings": {}})
+        tokens = tokenize(doc.page_content, LEXICAL_NGRAM_SIZE)
+        for term, tf in Counter(tokens).items():
+            part["postings"].setdefault(term, []).append([len(part["ids"]), tf])
+        part["ids"].append(doc.id)
+        part["lengths"].append(len(tokens))
+
+    path = os.path.join(directory, "lexical_index.json.gz")
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        json.dump({"format": SUPPORTED_FORMAT, "ngram_size": LEXICAL_NGRAM_SIZE, "version": "fixture", "sources": sources},
+                  f, ensure_ascii=False)
+    return LexicalIndex(path)
+
+
+class _StubPlanner:
+    """OpenAI 클라이언트 대신 라벨의 검색 계획(source_file, search_queries)을 반환하는 스텁"""
+
+    def __init__(self, queries):
+        self._plans = {item["query"]: item for item in queries}
+        self.beta = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(parse=self._parse)))
+
+    def _parse(self, messages, **kwargs):
+        item = self._plans[messages[-1]["content"]]
+        plan = RagPlan(target_filename=item["source_file"], search_queries=item.get("search_queries") or [item["query"]])
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(parsed=plan))])
+
+
+# --- 측정 ---
+def first_hit_rank(texts: List[str], phrases: List[str]) -> Optional[int]:
+    """정답 문구를 포함한 첫 결과의 1-based 순위 (없으면 None)"""
+    for rank, text in enumerate(texts, start=1):
+        if any(phrase in text for phrase in phrases):
+            return rank
+    return None
+
+
+def summarize(ranks: List[Optional[int]], tokens: List[int], latencies: List[float], ks: List[int]) -> Dict:
+    n = len(ranks)
+    return {
+        **{f"recall@{k}": round(sum(1 for r in ranks if r and r <= k) / n, 4) for k in ks},
+        "mrr": round(sum(1.0 / r for r in ranks if r) / n, 4),
+        "context_tokens_mean": round(mean(tokens), 1),
+        "context_tokens_p95": round(percentile(tokens, 95), 1),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+    }
+
+
+def run_search_tool(tool: SearchInternalDocsTool, queries, ks, rounds: int) -> Dict:
+    """
+    retrieve() 순위로 recall@k / MRR 을, _run() 결과(상위 3개 + 앞뒤 문맥)로 토큰 수와 정답 포함 여부를 측정합니다.
+    지연 시간은 _run() 전체(검색 + 문맥 확장) 기준입니다.
+    """
+    ranks, tokens, latencies, answered = [], [], [], 0
+    per_query = []
+    for item in queries:
+        results = tool.retrieve(item["query"], item["source_file"])
+        rank = first_hit_rank([doc.page_content for doc, _ in results], item["answer_contains"])
+        for _ in range(rounds):
+            start = time.perf_counter()
+            output = tool._run(query=item["query"], source_file=item["source_file"])
+            latencies.append((time.perf_counter() - start) * 1000)
+        in_context = any(phrase in output for phrase in item["answer_contains"])
+        answered += in_context
+        ranks.append(rank)
+        tokens.append(estimate_tokens(output))
+        per_query.append({"query": item["query"], "rank": rank, "in_context": in_context, "context_tokens": tokens[-1]})
+    return {**summarize(ranks, tokens, latencies, ks), "answer_in_context": round(answered / len(queries), 4),
+            "per_query": per_query}
+
+
+def run_adaptive_tool(tool: AdaptiveRagSearchTool, queries, ks, rounds: int) -> Dict:
+    """_run() 결과를 Result 블록(문맥 확장 포함) 단위로 나누어 블록 순위 기준 recall@k / MRR 을 계산합니다."""
+    ranks, tokens, latencies = [], [], []
+    per_query = []
+    for item in queries:
+        for _ in range(rounds):
+            start = time.perf_counter()
+            output = tool._run(query=item["query"])
+            latencies.append((time.perf_counter() - start) * 1000)
+        blocks = output.split(RESULT_MARKER)[1:]
+        rank = first_hit_rank(blocks, item["answer_contains"])
+        ranks.append(rank)
+        tokens.append(estimate_tokens(output))
+        per_query.append({"query": item["query"], "rank": rank, "blocks": len(blocks), "context_tokens": tokens[-1]})
+    return {**summarize(ranks, tokens, latencies, ks), "per_query": per_query}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RAG retrieval benchmark / regression suite")
+    parser.add_argument("--queries", default="benchmarks/data/rag_suite_queries.jsonl")
+    parser.add_argument("--corpus", default="benchmarks/data/rag_fixture_corpus.jsonl")
+    parser.add_argument("--backend", choices=["fixture", "env"], default="fixture")
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 6])
+    parser.add_argument("--rounds", type=int, default=3, help="지연 시간 측정을 위한 질의당 반복 횟수")
+    parser.add_argument("--per-query", action="store_true", help="질의별 순위/토큰 수를 결과에 포함")
+    parser.add_argument("--output", default="", help="결과 JSON 저장 경로 (미지정 시 표준 출력)")
+    args = parser.parse_args()
+    # 검색 경로 자체를 측정하도록 검색 결과 캐시는 끔 (벡터 단독/하이브리드 비교가 캐시 결과를 공유하지 않도록)
+    retrieval_cache.max_entries = 0
+
+    query_set = load_queries(args.queries)
+    chunk_size = int(os.getenv("CHUNK_SIZE", 1000))
+    chunk_overlap = int(os.getenv("CHUNK_OVERLAP", 200))
+
+    # 검색 계획은 스텁으로 대체하지만 클라이언트 생성에는 키가 필요
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark-stub")
+    search_tool = SearchInternalDocsTool()
+    adaptive_tool = AdaptiveRagSearchTool()
+    adaptive_tool._openai_client = _StubPlanner(query_set)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        config = {
+            "backend": args.backend,
+            "vector_db_k": search_tool._search_k,
+            "hybrid_lexical_weight": search_tool._lexical_weight,
+            "reranker": reranker.model_name if reranker.enabled else None,
+            "embedding_backend": EMBEDDING_BACKEND,
+            "rounds": args.rounds,
+        }
+        if args.backend == "fixture":
+            chunks = build_fixture_chunks(args.corpus, chunk_size, chunk_overlap)
+            backend = InMemoryBackend(chunks)
+            fixture_lexical = build_fixture_lexical_index(chunks, workdir) if search_tool._lexical_weight > 0 else None
+            for tool in (search_tool, adaptive_tool._search_tool):
+                tool._backend = backend
+                tool._lexical_index = fixture_lexical
+            adaptive_tool._list_tool._backend = backend
+            config.update({"corpus": args.corpus, "chunk_size": chunk_size, "chunk_overlap": chunk_overlap,
+                           "chunks": len(chunks)})
+        else:
+            config.update({"vector_backend": os.getenv("VECTOR_BACKEND", "chroma"),
+                           "lexical_index": lexical_index.path if search_tool._lexical_index else None})
+
+        # 워밍업: 모델 로드 및 쿼리 임베딩 캐시 적재 (측정 구간은 검색 경로만 포함)
+        for item in query_set:
+            search_tool.retrieve(item["query"], item["source_file"])
+
+        search_report = run_search_tool(search_tool, query_set, args.k, args.rounds)
+        adaptive_report = run_adaptive_tool(adaptive_tool, query_set, args.k, args.rounds)
+
+    if not args.per_query:
+        search_report.pop("per_query")
+        adaptive_report.pop("per_query")
+    report = {
+        "queries": len(query_set),
+        "config": config,
+        "search_internal_docs": search_report,
+        "adaptive_rag": adaptive_report,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False, sort_keys=True)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+주관 부서 라우팅 정확도 벤치마크
+
+라벨링된 이메일 샘플(JSONL: body, expected_dept_id)에 대해 로컬 중심 벡터 라우터의
+판정 정확도, 로컬 결정 비율(coverage), 신뢰도 분포, 지연 시간을 측정합니다.
+--with-llm 옵션을 주면 애매한 샘플을 LLM으로 넘겨 전체 파이프라인 정확도도 함께 계산합니다.
+
+실행 (agent-crew 디렉터리에서):
+    python -m benchmarks.routing_accuracy --samples benchmarks/data/routing_samples.jsonl
+"""
+import argparse
+import json
+import time
+from statistics import mean
+
+from utils.embeddings import embed_text
+from utils.dept_router import centroid_router, NO_MATCH_ID
+
+
+def load_samples(path: str):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def run(samples, with_llm: bool):
+    if with_llm:
+        from utils.llm_helpers import determine_primary_dept
+
+    rows = []
+    for sample in samples:
+        expected = sample["expected_dept_id"]
+        vector = embed_text(sample["body"], cache=False)
+
+        start = time.perf_counter()
+        dept_id, confidence, margin = centroid_router.decide(vector)
+        local_ms = (time.perf_counter() - start) * 1000
+
+        row = {
+            "expected": expected, "local": dept_id, "confidence": confidence,
+            "margin": margin, "local_ms": local_ms, "final": dept_id,
+        }
+        if dept_id is None and with_llm:
+            start = time.perf_counter()
+            decision = determine_primary_dept(sample["body"])
+            row["llm_ms"] = (time.perf_counter() - start) * 1000
+            row["final"] = NO_MATCH_ID if decision.is_spam else decision.primary_dept_id
+        rows.append(row)
+    return rows
+
+
+def summarize(rows, with_llm: bool) -> dict:
+    local_rows = [r for r in rows if r["local"] is not None]
+    report = {
+        "samples": len(rows),
+        "local_coverage": len(local_rows) / len(rows) if rows else 0.0,
+        "local_accuracy": (
+            sum(r["local"] == r["expected"] for r in local_rows) / len(local_rows) if local_rows else None
+        ),
+        # 로컬 라우터가 '해당 없음' 샘플을 LLM으로 넘겼는지 (스팸/무관 메일을 잘못 배정하지 않았는지)
+        "no_match_deferred": (
+            sum(r["local"] is None for r in rows if r["expected"] == NO_MATCH_ID)
+            / max(1, sum(r["expected"] == NO_MATCH_ID for r in rows))
+        ),
+        "mean_confidence_local": mean(r["confidence"] for r in local_rows) if local_rows else None,
+        "mean_local_ms": mean(r["local_ms"] for r in rows) if rows else 0.0,
+    }
+    if with_llm:
+        llm_rows = [r for r in rows if "llm_ms" in r]
+        report["overall_accuracy"] = sum(r["final"] == r["expected"] for r in rows) / len(rows) if rows else 0.0
+        report["llm_calls"] = len(llm_rows)
+        report["mean_llm_ms"] = mean(r["llm_ms"] for r in llm_rows) if llm_rows else None
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Department routing accuracy benchmark")
+    parser.add_argument("--samples", default="benchmarks/data/routing_samples.jsonl")
+    parser.add_argument("--with-llm", action="store_true", help="애매한 샘플은 LLM 라우팅까지 수행")
+    parser.add_argument("--output", default="", help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    result_rows = run(load_samples(args.samples), args.with_llm)
+    report = summarize(result_rows, args.with_llm)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"report": report, "rows": result_rows}, f, indent=2, ensure_ascii=False)
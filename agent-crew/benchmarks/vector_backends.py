@@ -0,0 +1,53 @@
+"""
+벡터 검색 백엔드 지연 시간 비교 (ChromaDB HTTP vs 프로세스 내 로컬 스냅샷)
+
+동일한 쿼리 벡터로 두 백엔드를 반복 검색하여 p50/p95 지연 시간과
+상위 k개 결과의 일치율(overlap@k)을 보고합니다. 쿼리 임베딩은 미리 계산하므로 검색 자체만 측정됩니다.
+
+실행 (agent-crew 디렉터리에서, ChromaDB 서버와 RAG_ARTIFACT_DIR 스냅샷 필요):
+    python -m benchmarks.vector_backends --queries benchmarks/data/retrieval_queries.jsonl
+"""
+import argparse
+import json
+import time
+
+from utils.embeddings import embed_text
+from utils.vector_backends import ChromaBackend, LocalSnapshotBackend
+from benchmarks.hybrid_retrieval import load_queries, percentile
+
+
+def time_backend(backend, vectors, queries, k: int, rounds: int):
+    latencies = []
+    results = []
+    for _ in range(rounds):
+        results = []
+        for vector, item in zip(vectors, queries):
+            start = time.perf_counter()
+            hits = backend.search(vector, item["source_file"], k)
+            latencies.append((time.perf_counter() - start) * 1000)
+            results.append([doc.id for doc, _ in hits])
+    return {"p50_ms": percentile(latencies, 50), "p95_ms": percentile(latencies, 95)}, results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vector backend latency comparison")
+    parser.add_argument("--queries", default="benchmarks/data/retrieval_queries.jsonl")
+    parser.add_argument("--k", type=int, default=6)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    query_set = load_queries(args.queries)
+    query_vectors = [embed_text(item["query"]) for item in query_set]
+
+    chroma_report, chroma_ids = time_backend(ChromaBackend(), query_vectors, query_set, args.k, args.rounds)
+    local_report, local_ids = time_backend(LocalSnapshotBackend(), query_vectors, query_set, args.k, args.rounds)
+
+    overlap = [
+        len(set(a) & set(b)) / max(1, len(a)) for a, b in zip(chroma_ids, local_ids)
+    ]
+    print(json.dumps({
+        "queries": len(query_set), "k": args.k, "rounds": args.rounds,
+        "chroma_http": chroma_report,
+        "local_snapshot": local_report,
+        f"overlap@{args.k}": sum(overlap) / len(overlap) if overlap else 0.0,
+    }, indent=2))
@@ -2,6 +2,7 @@ import logging
 import os
 import json
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 from crewai.flow.flow import Flow, start, listen, router, or_
 
@@ -9,7 +10,10 @@ from schemas.request_io import EmailInput, EmailFlowState
 from schemas.task_output import FinalAssigneeResult
 
 from utils.dept_registry import DepartmentRegistry
-from utils.llm_helpers import determine_primary_dept, find_supporting_dept
+from utils.llm_helpers import determine_primary_dept, find_supporting_depts
+from utils.email_normalizer import normalize_email_body, normalization_stats
+from utils.embeddings import embed_text
+from utils.dept_router import centroid_router
 
 from crews.common.filtering.crew import FilteringCrew
 from crews.common.routing.crew import RoutingCrew
@@ -41,6 +45,7 @@ class EmailProcessingFlow(Flow[EmailFlowState]):
         "email": os.getenv("DEFAULT_MANAGER_EMAIL", "manager@ajou.ac.kr")
     }
     spam_webhook_url = os.getenv("N8N_SPAM_PROCESS_WEBHOOK_URL", "")
+    supporting_dept_fanout = int(os.getenv("SUPPORTING_DEPT_FANOUT", 3))
 
     def __init__(self):
         super().__init__()
@@ -88,6 +93,18 @@ class EmailProcessingFlow(Flow[EmailFlowState]):
         self.state.retry_count = 0
         self.state.current_context = ""
         self.state.draft_status = "PENDING"
+        self.state.queried_dept_ids = []
+        
+        # 본문 정규화: 이후 모든 LLM 단계는 정규화 본문(clean_body)을 사용
+        raw_body = self.state.email_data.body
+        self.state.clean_body = normalize_email_body(raw_body)
+        self.state.body_token_stats = normalization_stats(raw_body, self.state.clean_body)
+        stats = self.state.body_token_stats
+        logger.info(
+            f"[SYSTEM] Body normalized: {stats['original_tokens']} -> {stats['clean_tokens']} tokens "
+            f"(saved {stats['saved_tokens']})"
+        )
+        self.state.email_embedding = None
         
         return self.state.email_data
 
@@ -100,7 +117,9 @@ class EmailProcessingFlow(Flow[EmailFlowState]):
             crew.step_callback = self._log_crew_step
             crew.task_callback = self._log_task_finish
             
-            result = crew.kickoff(inputs=email_data.dict()).pydantic
+            inputs = email_data.dict()
+            inputs["body"] = self.state.clean_body
+            result = crew.kickoff(inputs=inputs).pydantic
             self.state.analysis_result = result
             logger.info(f"[SYSTEM] Category: {result.category}")
             return result.category
@@ -121,10 +140,20 @@ class EmailProcessingFlow(Flow[EmailFlowState]):
     @listen("SELECT_DEPT")
     def select_primary_dept(self):
         logger.info(">> STEP 2: Selecting Primary Dept")
-        email_body = self.state.email_data.body
+        email_body = self.state.clean_body
+        
+        # 이메일 임베딩은 중심 벡터 라우팅에서만 쓰이므로 분류(스팸/단순 문의 제외) 이후,
+        # 부서가 2개 이상 등록되어 로컬 라우팅이 가능한 경우에만 계산
+        if centroid_router.active:
+            try:
+                # 본문은 개인정보이고 재사용되지 않으므로 쿼리 임베딩 캐시(디스크 영속화 포함)에 넣지 않음
+                self.state.email_embedding = embed_text(email_body, cache=False)
+            except Exception as e:
+                logger.warning(f"[SYSTEM] Email embedding failed, routing falls back to LLM: {e}")
         
-        decision = determine_primary_dept(email_body)
+        decision = determine_primary_dept(email_body, self.state.email_embedding)
         self.state.routing_decision = decision.model_dump()
+        logger.info(f"[SYSTEM] Primary Dept: {decision.primary_dept_id} (by {decision.decided_by})")
         
         if decision.is_spam:
             logger.info(">> Classified as SPAM by Router.")
@@ -142,7 +171,7 @@ class EmailProcessingFlow(Flow[EmailFlowState]):
         primary_id = self.state.routing_decision.get("primary_dept_id")
         logger.info(f">> STEP 3: Assigning Staff (Dept: {primary_id})")
         
-        email_body = self.state.email_data.body
+        email_body = self.state.clean_body
         summary = self.state.analysis_result.summary
         
         try:
@@ -190,40 +219,48 @@ class EmailProcessingFlow(Flow[EmailFlowState]):
             )
         finally:
             # 첫 루프를 위한 타겟 설정 (주관 부서)
-            self.state.target_dept_id = primary_id
+            self.state.target_dept_ids = [primary_id]
             self.state.search_query = email_body
 
     # --- STEP 4: 정보 수집 (Retrieval Loop) ---
+    def _retrieve_from_dept(self, target_id: str, query: str) -> str:
+        """단일 부서 크루에서 정보를 수집하여 출처가 표시된 컨텍스트 블록으로 반환"""
+        crew_cls = DepartmentRegistry.get_crew(target_id)
+        if not crew_cls:
+            logger.warning(f"Department {target_id} not found.")
+            return f"\n[System] 부서 ID '{target_id}'를 찾을 수 없습니다.\n"
+        
+        try:
+            dept_crew = crew_cls()
+            info = dept_crew.get_information(
+                query=query,
+                step_callback=self._log_crew_step,
+                task_callback=self._log_task_finish
+            )
+            return f"\n[출처: {target_id}] {info}\n"
+        except Exception as e:
+            logger.error(f"Retrieval error from {target_id}: {e}")
+            return f"\n[System] {target_id} 정보 수집 실패: {e}\n"
+
     @listen(or_(assign_staff, "RETRIEVE_INFO"))
     def retrieve_info(self):
-        target_id = self.state.target_dept_id
+        target_ids = self.state.target_dept_ids
         query = self.state.search_query
         attempt = self.state.retry_count
         
         log_prefix = "Initial" if attempt == 0 else f"Additional (Attempt {attempt})"
-        logger.info(f">> STEP 4: {log_prefix} Retrieval from [{target_id}]")
+        logger.info(f">> STEP 4: {log_prefix} Retrieval from {target_ids}")
         
-        crew_cls = DepartmentRegistry.get_crew(target_id)
-        new_info = ""
-        
-        if crew_cls:
-            try:
-                dept_crew = crew_cls()
-                info = dept_crew.get_information(
-                    query=query,
-                    step_callback=self._log_crew_step,
-                    task_callback=self._log_task_finish
-                )
-                new_info = f"\n[출처: {target_id}] {info}\n"
-            except Exception as e:
-                logger.error(f"Retrieval error from {target_id}: {e}")
-                new_info = f"\n[System] {target_id} 정보 수집 실패: {e}\n"
+        # 후보 부서가 여럿이면 동시에 조회한 뒤, 순위 순서대로 증거를 병합
+        if len(target_ids) > 1:
+            with ThreadPoolExecutor(max_workers=len(target_ids)) as executor:
+                results = list(executor.map(lambda dept_id: self._retrieve_from_dept(dept_id, query), target_ids))
         else:
-            logger.warning(f"Department {target_id} not found.")
-            new_info = f"\n[System] 부서 ID '{target_id}'를 찾을 수 없습니다.\n"
-            
+            results = [self._retrieve_from_dept(dept_id, query) for dept_id in target_ids]
+        
+        self.state.queried_dept_ids.extend(target_ids)
         # 컨텍스트 누적
-        self.state.current_context += new_info
+        self.state.current_context += "".join(results)
 
     # --- STEP 5: 초안 작성 (Drafting) ---
     @listen(retrieve_info)
@@ -239,7 +276,7 @@ class EmailProcessingFlow(Flow[EmailFlowState]):
             crew.task_callback = self._log_task_finish
             
             draft_res = crew.kickoff(inputs={
-                "email_body": self.state.email_data.body,
+                "email_body": self.state.clean_body,
                 "retrieved_context": self.state.current_context,
                 "dept_persona": dept_persona
             })
@@ -258,6 +295,9 @@ class EmailProcessingFlow(Flow[EmailFlowState]):
             elif output.status == "NEEDS_INFO":
                 # 정보 부족 시 쿼리와 힌트 임시 저장 (Router에서 처리)
                 logger.warning(f"   >> Missing Info: {output.missing_info_query}")
+                if output.missing_info_query != self.state.search_query:
+                    # 새 질의는 이미 조회한 부서에도 다시 물어볼 수 있음
+                    self.state.queried_dept_ids = []
                 self.state.search_query = output.missing_info_query # 다음 검색 쿼리로 설정
                 self._temp_hint = output.target_dept_hint
                 return "NEEDS_INFO"
@@ -278,16 +318,18 @@ class EmailProcessingFlow(Flow[EmailFlowState]):
             if self.state.retry_count >= 3:
                 return "FORCE_FINALIZE"
             
-            # 다음 부서 찾기
-            logger.info("   >> Identifying Supporting Department...")
-            target_dept = find_supporting_dept(self.state.search_query, self._temp_hint)
+            # 다음 부서 후보 찾기 (상위 N개 부서를 한 번에 병렬 조회)
+            logger.info("   >> Identifying Supporting Departments...")
+            candidates = find_supporting_depts(
+                self.state.search_query, self._temp_hint, exclude=self.state.queried_dept_ids
+            )
             
-            if target_dept:
-                self.state.target_dept_id = target_dept
+            if candidates:
+                self.state.target_dept_ids = candidates[:self.supporting_dept_fanout]
                 self.state.retry_count += 1
                 return "RETRIEVE_INFO" # 루프: 다시 정보 수집 단계로
             else:
-                logger.warning("   >> Could not find supporting dept.")
+                logger.warning("   >> Could not find supporting depts.")
                 # 부서를 못 찾으면 그냥 현재 상태로 강제 종료 혹은 매니저에게 넘김
                 return "FORCE_FINALIZE"
         
@@ -313,7 +355,6 @@ class EmailProcessingFlow(Flow[EmailFlowState]):
     @listen("SIMPLE_INQUIRY")
     def handle_simple(self):
         logger.info(">> Handling Simple Inquiry")
-        email_data = self.state.email_data
         dept_persona = "친절한 대학 행정 안내 데스크"
         context = "이 문의는 단순 정보 요청입니다. 친절하게 확인 후 회신드리겠다고 답변하세요."
         
@@ -323,7 +364,7 @@ class EmailProcessingFlow(Flow[EmailFlowState]):
             crew.task_callback = self._log_task_finish
             
             draft_res = crew.kickoff(inputs={
-                "email_body": email_data.body,
+                "email_body": self.state.clean_body,
                 "retrieved_context": context,
                 "dept_persona": dept_persona
             })
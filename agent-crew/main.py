@@ -1,8 +1,19 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, BackgroundTasks
 from flow import EmailProcessingFlow
 from schemas.request_io import EmailInput
+from utils.retrieval_cache import retrieval_cache
+from utils.embeddings import embedding_cache
+from utils.dept_router import centroid_router
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # 종료 시: 재시작 후 워밍업 없이 재사용할 수 있도록 쿼리 임베딩 캐시와 (일괄 저장 중인) 라우팅 이력을 저장
+    embedding_cache.save()
+    centroid_router.save()
+
+app = FastAPI(lifespan=lifespan)
 
 @app.post("/run")
 async def start_email_flow(email_input: EmailInput, background_tasks: BackgroundTasks):
@@ -21,4 +32,12 @@ async def start_email_flow(email_input: EmailInput, background_tasks: Background
             print(f"Error during background flow execution: {e}")
 
     background_tasks.add_task(run_flow_in_background, email_input)
-    return {"message": "Email processing flow started in background."}
\ No newline at end of file
+    return {"message": "Email processing flow started in background."}
+
+@app.get("/metrics")
+async def get_metrics():
+    """캐시 크기 산정을 위한 적중률 등 런타임 지표를 반환합니다."""
+    return {
+        "retrieval_cache": retrieval_cache.stats(),
+        "embedding_cache": embedding_cache.stats(),
+    }
@@ -10,6 +10,9 @@ class EmailInput(BaseModel):
     
 class EmailFlowState(BaseModel):
     email_data: Optional[EmailInput] = Field(None, description="처리할 원본 이메일 입력 데이터")       
+    clean_body: str = Field(default="", description="인용문/HTML/서명/면책 문구를 제거한 정규화 본문 (LLM 입력용)")
+    body_token_stats: Dict[str, int] = Field(default={}, description="본문 정규화 전후 토큰 수 및 절감량")
+    email_embedding: Optional[List[float]] = Field(default=None, description="정규화 본문의 임베딩 벡터 (부서 선정 단계에서 계산, 중심 벡터 라우팅용)")
     analysis_result: Optional[EmailAnalysis] = Field(None, description="LLM을 통한 이메일 분석 결과 (요약, 의도, 키워드 등)")
     routing_decision: Optional[Dict[str, Any]] = Field(None, description="부서 라우팅 및 스팸 분류 결정 정보")
     final_assignee_result: Optional[FinalAssigneeResult] = Field(None, description="최종적으로 배정된 담당자 및 부서 정보")
@@ -17,6 +20,7 @@ class EmailFlowState(BaseModel):
     
     current_context: str = Field(default="", description="현재까지 수집된 부서별 정보 누적 텍스트")
     retry_count: int = Field(default=0, description="정보 부족으로 인한 재시도(루프) 횟수")
-    target_dept_id: Optional[str] = Field(default=None, description="현재 단계에서 정보를 수집해야 할 목표 부서 ID (초기는 주관부서, 이후는 협조부서)")
+    target_dept_ids: List[str] = Field(default=[], description="현재 단계에서 정보를 수집할 목표 부서 ID 목록 (초기는 주관부서, 이후는 협조부서 후보 상위 N개)")
+    queried_dept_ids: List[str] = Field(default=[], description="현재 검색 쿼리로 이미 정보를 수집한 부서 ID 목록 (동일 질의 재조회 방지)")
     search_query: Optional[str] = Field(default=None, description="현재 단계에서 해당 부서에 질의할 내용")
     draft_status: str = Field(default="PENDING", description="초안 작성 상태 (PENDING, COMPLETED, NEEDS_INFO)")
\ No newline at end of file
@@ -38,8 +38,14 @@ class DepartmentRoutingDecision(BaseModel):
     primary_dept_id: str = Field(..., description="목록에서 가장 적절한 주관 부서 ID를 선택합니다. 일치하는 부서가 없거나 스팸인 경우 'OTHER'를 선택하세요.")
     is_spam: bool = Field(default=False, description="이메일이 스팸이거나 대학 행정 업무와 무관한 경우 True입니다.")
 
-class SupportingDeptDecision(BaseModel):
-    dept_id: Optional[str] = Field(None, description="해당 문의에 답변할 수 있는 부서 ID입니다. 찾을 수 없는 경우 None을 반환합니다.")    
+class PrimaryDeptResult(DepartmentRoutingDecision):
+    """주관 부서 선정 결과 (판정 주체 및 신뢰도 포함)"""
+    decided_by: Literal["centroid", "llm", "fallback"] = Field(..., description="판정 주체 (로컬 중심 벡터 라우터 / LLM / 오류 시 기본값)")
+    confidence: Optional[float] = Field(None, description="로컬 라우터가 계산한 1순위 부서 신뢰도 (0.0 ~ 1.0)")
+    margin: Optional[float] = Field(None, description="1순위와 2순위(또는 기준선) 유사도 차이")
+
+class SupportingDeptCandidates(BaseModel):
+    dept_ids: List[str] = Field(default=[], description="해당 문의에 답변할 수 있는 부서 ID 목록. 가능성이 높은 순서대로 정렬하며, 없으면 빈 리스트를 반환합니다.")
     
 class RagPlan(BaseModel):
     target_filename: str = Field(..., description="검색할 PDF 파일명")
@@ -3,15 +3,18 @@ import logging
 import os
 import warnings
 import boto3
-from typing import Type, List, Any
+from typing import Type, List, Any, Optional, Tuple
 from crewai.tools import BaseTool
 from pydantic import BaseModel, PrivateAttr
-from langchain_chroma import Chroma
-import chromadb
-from langchain_huggingface import HuggingFaceEmbeddings
+from langchain_core.documents import Document
 from schemas.tool_input import SearchInternalDocsInput, AdaptiveRagInput
 from schemas.task_output import RagPlan
 from openai import OpenAI
+from utils.embeddings import embed_text
+from utils.vector_backends import get_vector_backend
+from utils.lexical_index import LexicalIndex, lexical_index, reciprocal_rank_fusion
+from utils.reranker import reranker
+from utils.retrieval_cache import retrieval_cache
 
 logger = logging.getLogger(__name__)
 
@@ -49,112 +52,150 @@ class ListKnowledgeBaseFilesTool(BaseTool):
     name: str = "RAG 파일 목록 조회"
     description: str = "DB에 저장된 PDF 파일명 목록을 반환합니다."
     
-    _client = PrivateAttr(default=None)
-    _collection_name: str = PrivateAttr()
+    _backend = PrivateAttr(default=None)
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         try:
-            self._collection_name = os.getenv("CHROMA_COLLECTION_NAME", "academic_regulations")
-            self._client = chromadb.HttpClient(
-                host=os.getenv("CHROMA_HOST", "chromadb"), 
-                port=int(os.getenv("CHROMA_PORT", 8000))
-            )
-        except:
-            self._client = None
+            self._backend = get_vector_backend()
+        except Exception as e:
+            logger.error(f"RAG Backend Init Failed: {e}")
+            self._backend = None
 
     def _run(self) -> List[str]:
-        if not self._client: return []
+        if not self._backend: return []
         try:
-            coll = self._client.get_collection(name=self._collection_name)
-            metas = coll.get(include=["metadatas"])['metadatas']
-            return sorted(list(set(m['source'] for m in metas if m and 'source' in m)))
+            return self._backend.list_sources()
         except:
-            return []\
+            return []
+
+def _fusion_key(doc: Document) -> str:
+    if doc.id:
+        return doc.id
+    return f"{doc.metadata.get('source', '')}#{doc.metadata.get('chunk_id', doc.page_content)}"
 
 class SearchInternalDocsTool(BaseTool):
     name: str = "RAG 단일 검색 (문맥 확장 포함)"
     description: str = "특정 파일에서 쿼리와 유사한 내용을 검색하고, 전후 문맥을 포함하여 상세 내용을 반환합니다."
     args_schema: Type[BaseModel] = SearchInternalDocsInput
     
-    _vectorstore: Chroma = PrivateAttr(default=None)
+    _backend = PrivateAttr(default=None)
     _search_k: int = PrivateAttr(default=6) 
+    _lexical_index: Optional[LexicalIndex] = PrivateAttr(default=None)
+    _lexical_weight: float = PrivateAttr(default=1.0)
     
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self._search_k = int(os.getenv("VECTOR_DB_K", 6))
+        # 하이브리드 검색: 어휘(BM25) 순위의 RRF 가중치. 0이면 벡터 검색만 사용
+        self._lexical_weight = float(os.getenv("HYBRID_LEXICAL_WEIGHT", 1.0))
+        self._lexical_index = lexical_index if self._lexical_weight > 0 else None
         
         try:
-            embeddings = HuggingFaceEmbeddings(
-                model_name=os.getenv("EMBEDDING_MODEL", "jhgan/ko-sroberta-multitask"),
-                model_kwargs={'device': os.getenv("DEVICE_TYPE", "cpu")}
-            )
-            client = chromadb.HttpClient(
-                host=os.getenv("CHROMA_HOST", "chromadb"), 
-                port=int(os.getenv("CHROMA_PORT", 8000))
-            )
-            self._vectorstore = Chroma(
-                client=client,
-                collection_name=os.getenv("CHROMA_COLLECTION_NAME", "academic_regulations"),
-                embedding_function=embeddings
-            )
+            # VECTOR_BACKEND=chroma(HTTP 서버) | local(프로세스 내 스냅샷)
+            self._backend = get_vector_backend()
         except Exception as e:
             logger.error(f"RAG Init Failed: {e}")
 
+    def retrieve(self, query: str, source_file: str) -> List[Tuple[Document, Optional[float]]]:
+        """
+        벡터 검색 결과와 (색인이 있으면) 어휘 검색 결과를 RRF로 결합하여 상위 K개 (문서, 벡터 유사도)를 반환합니다.
+        순서는 RRF 순위를 따르지만 표시되는 점수는 벡터 유사도를 유지하며 (RRF 점수는 0.01~0.03 수준의 순위 점수),
+        어휘 검색에서만 나온 청크는 벡터 유사도가 없으므로 None입니다.
+        결과는 (파일, 정규화된 검색어, 지식베이스 버전) 단위로 캐시합니다.
+        """
+        cached = retrieval_cache.get(source_file, query)
+        if cached is not None:
+            return cached
+        results = self._retrieve(query, source_file)
+        retrieval_cache.put(source_file, query, results)
+        return results
+
+    def _retrieve(self, query: str, source_file: str) -> List[Tuple[Document, Optional[float]]]:
+        # 검색어 벡터는 쿼리 임베딩 캐시를 거쳐 재인코딩을 피함
+        vector = embed_text(query)
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore", category=UserWarning)
+            docs_with_scores = self._backend.search(vector, source_file, k=self._search_k)
+
+        if not self._lexical_index or not self._lexical_index.is_available():
+            return docs_with_scores
+
+        lexical_hits = self._lexical_index.search(query, source_file, k=self._search_k)
+        if not lexical_hits:
+            return docs_with_scores
+
+        # ID가 없는 벡터 결과도 빠지지 않도록 (파일, chunk_id)를 대신 키로 사용 (어휘 결과와는 합쳐지지 않고 벡터 순위로 반영)
+        docs_by_id = {_fusion_key(doc): doc for doc, _ in docs_with_scores}
+        relevance = {_fusion_key(doc): score for doc, score in docs_with_scores}
+        fused = reciprocal_rank_fusion(
+            [list(docs_by_id.keys()), [doc_id for doc_id, _ in lexical_hits]],
+            weights=[1.0, self._lexical_weight]
+        )[:self._search_k]
+
+        # 어휘 검색에서만 나온 청크는 본문/메타데이터를 ID로 조회
+        missing = [doc_id for doc_id, _ in fused if doc_id not in docs_by_id]
+        if missing:
+            for doc in self._backend.get_by_ids(missing, source_file):
+                docs_by_id[doc.id] = doc
+
+        return [(docs_by_id[doc_id], relevance.get(doc_id)) for doc_id, _ in fused if doc_id in docs_by_id]
+
+    def _expand_context(self, doc: Document, score: Optional[float], source_file: str,
+                        reranked: Optional[bool] = None) -> str:
+        """
+        검색된 청크의 앞뒤 문맥을 붙여 하나의 결과 블록으로 만듭니다.
+        reranked: True면 score가 cross-encoder 점수, False면 재정렬하지 못한 후보(검색 점수), None이면 재정렬 미사용
+        """
+        chunk_id = doc.metadata.get('chunk_id')
+        if chunk_id is None:
+            return f"[검색된 내용]\n{doc.page_content}\n"
+
+        context_block = ""
+        # (1) 이전 청크
+        prev_text = self._backend.get_chunk_text(source_file, chunk_id - 1)
+        if prev_text:
+            context_block += f"[이전 문맥]\n{prev_text}\n"
+
+        # (2) 현재 청크
+        if reranked:
+            label = f"Rerank score: {score:.4f}"
+        else:
+            label = f"Score: {score:.4f}" if score is not None else "어휘 검색 결과"
+            if reranked is False:
+                label += ", 재정렬 안 됨"
+        context_block += f"[검색된 내용 ({label})]\n{doc.page_content}\n"
+
+        # (3) 다음 청크, (4) 다다음 청크
+        for offset, label in ((1, "다음 문맥"), (2, "다다음 문맥")):
+            next_text = self._backend.get_chunk_text(source_file, chunk_id + offset)
+            if next_text:
+                context_block += f"[{label}]\n{next_text}\n"
+
+        # (5) 중복 제거로 하나로 합쳐진 청크: 같은 내용이 실린 다른 문서도 안내
+        duplicates = set(json.loads(doc.metadata.get('dup_refs') or "{}"))
+        if doc.metadata.get('dup_of'):
+            duplicates.add(doc.metadata['dup_of'])
+        duplicates.discard(source_file)
+        if duplicates:
+            context_block += f"[동일 내용 수록 문서] {', '.join(sorted(duplicates))}\n"
+        return context_block
+
     def _run(self, query: str, source_file: str) -> str:
-        if not self._vectorstore: return "Error: DB Not Initialized"
+        if not self._backend: return "Error: DB Not Initialized"
         
         logger.info(f"[RAG Tool] Search: '{query}' in '{source_file}' (K={self._search_k})")
         
         try:
-            with warnings.catch_warnings():
-                warnings.filterwarnings("ignore", category=UserWarning)
-                docs_with_scores = self._vectorstore.similarity_search_with_relevance_scores(
-                    query, k=self._search_k, filter={"source": source_file}
-                )
+            docs_with_scores = self.retrieve(query, source_file)
             
             if not docs_with_scores:
                 return f"Info: '{source_file}'에서 '{query}' 관련 내용을 찾지 못했습니다."
             
             final_result = ""
             # 상위 3개 결과에 대해서만 앞뒤 문맥 확장 수행
-            top_docs = docs_with_scores[:3]
-            
-            for i, (doc, score) in enumerate(top_docs):
-                meta = doc.metadata
-                chunk_id = meta.get('chunk_id')
-                context_block = ""
-                
-                if chunk_id is not None:
-                    # (1) 이전 청크
-                    prev_data = self._vectorstore.get(
-                        where={"$and": [{"source": source_file}, {"chunk_id": chunk_id - 1}]},
-                        include=["documents"]
-                    )
-                    if prev_data and prev_data.get('documents'):
-                        context_block += f"[이전 문맥]\n{prev_data['documents'][0]}\n"
-
-                    # (2) 현재 청크
-                    context_block += f"[검색된 내용 (Score: {score:.4f})]\n{doc.page_content}\n"
-                    
-                    # (3) 다음 청크
-                    next_data = self._vectorstore.get(
-                        where={"$and": [{"source": source_file}, {"chunk_id": chunk_id + 1}]},
-                        include=["documents"]
-                    )
-                    if next_data and next_data.get('documents'):
-                        context_block += f"[다음 문맥]\n{next_data['documents'][0]}\n"
-                        
-                    # (4) 다다음 청크
-                    next_data = self._vectorstore.get(
-                        where={"$and": [{"source": source_file}, {"chunk_id": chunk_id + 2}]},
-                        include=["documents"]
-                    )
-                    if next_data and next_data.get('documents'):
-                        context_block += f"[다다음 문맥]\n{next_data['documents'][0]}\n"
-                else:
-                    context_block += f"[검색된 내용]\n{doc.page_content}\n"
-                
+            for i, (doc, score) in enumerate(docs_with_scores[:3]):
+                context_block = self._expand_context(doc, score, source_file)
                 final_result += f"\n=== [Result #{i+1}] ===\n{context_block}\n"
 
             return final_result
@@ -233,9 +274,45 @@ class AdaptiveRagSearchTool(BaseTool):
             target_file = files[0] if files else ""
             queries = [query]
 
+        if reranker.enabled:
+            return self._search_reranked(query, queries, target_file)
+
         aggregated_results = f"--- [검색 대상: {target_file}] ---\n"
         for q in queries:
             search_res = self._search_tool._run(query=q, source_file=target_file)
             aggregated_results += f"\n[Q: {q}]\n{search_res}\n"
             
-        return aggregated_results
\ No newline at end of file
+        return aggregated_results
+
+    def _search_reranked(self, query: str, queries: List[str], target_file: str) -> str:
+        """모든 검색어의 후보를 모아 cross-encoder로 한 번에 재정렬하고, 상위 결과만 문맥 확장하여 반환합니다."""
+        candidates = []
+        seen = set()
+        for q in queries:
+            try:
+                results = self._search_tool.retrieve(q, target_file)
+            except Exception as e:
+                logger.error(f"[AdaptiveRAG] Search failed for '{q}': {e}")
+                continue
+            for doc, score in results:
+                key = doc.id or doc.page_content
+                if key in seen:
+                    continue
+                seen.add(key)
+                candidates.append((doc, score))
+
+        if not candidates:
+            return f"Info: '{target_file}'에서 관련 내용을 찾지 못했습니다."
+
+        try:
+            ranked = reranker.rerank(query, candidates)
+        except Exception as e:
+            logger.error(f"[AdaptiveRAG] Rerank failed, using retrieval order: {e}")
+            ranked = [(doc, score, False) for doc, score in candidates[:reranker.top_n]]
+
+        aggregated_results = f"--- [검색 대상: {target_file}] ---\n[Q: {' | '.join(queries)}]\n"
+        for i, (doc, score, reranked) in enumerate(ranked):
+            # 재정렬 점수(cross-encoder)와 재정렬하지 못한 후보의 검색 점수(벡터 유사도)는 척도가 달라 구분하여 표시
+            context_block = self._search_tool._expand_context(doc, score, target_file, reranked=reranked)
+            aggregated_results += f"\n=== [Result #{i+1}] ===\n{context_block}\n"
+        return aggregated_results
@@ -35,6 +35,10 @@ class DepartmentRegistry:
     def get_all_descriptions(cls) -> str:
         return "\n".join([f"- {k}: {v}" for k, v in cls._DEPT_DESCRIPTION.items()])
 
+    @classmethod
+    def get_description_map(cls) -> Dict[str, str]:
+        return dict(cls._DEPT_DESCRIPTION)
+
     @classmethod
     def get_persona(cls, dept_id: str) -> str:
         return cls._DEPT_PERSONA.get(dept_id, "당신은 대학 행정 담당자입니다.")
\ No newline at end of file
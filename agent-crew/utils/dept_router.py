@@ -0,0 +1,169 @@
+import os
+import logging
+import tempfile
+import threading
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+from utils.dept_registry import DepartmentRegistry
+from utils.embeddings import get_embedding_model
+
+logger = logging.getLogger(__name__)
+
+NO_MATCH_ID = "OTHER"
+# LLM 라우터가 스팸으로 판정한 이메일의 중심 벡터 (이력 파일 키)
+SPAM_ID = "__spam__"
+
+
+def _normalize(vec) -> np.ndarray:
+    arr = np.asarray(vec, dtype=np.float32)
+    norm = np.linalg.norm(arr)
+    return arr / norm if norm > 0 else arr
+
+
+class CentroidDeptRouter:
+    """
+    이메일 임베딩과 부서별 중심 벡터(centroid)의 코사인 유사도로 주관 부서를 판정하는 로컬 라우터.
+    중심 벡터는 부서 설명(_DEPT_DESCRIPTION) 임베딩과 과거 라우팅된 이메일 임베딩의 평균입니다.
+    1위와 2위(또는 최소 유사도 기준선)의 차이가 충분히 클 때만 로컬에서 결정하고,
+    애매한 경우에는 None을 반환하여 LLM 라우팅으로 넘깁니다.
+
+    - 부서가 2개 이상 등록되어 있어야 로컬에서 결정합니다. (부서가 하나면 마진 검사가 고정 유사도 기준과 같아짐)
+    - 스팸 판정은 LLM 라우터만 합니다. LLM이 스팸으로 판정한 이메일이 ROUTER_MIN_SPAM_SAMPLES개 이상
+      쌓여 스팸 중심 벡터가 생기고, 1위 부서가 스팸 중심보다 마진 이상 가까울 때만 로컬에서 결정합니다.
+    - 이력은 ROUTER_HISTORY_SAVE_EVERY번 반영마다, 그리고 종료 시 save()로 저장합니다.
+    """
+
+    def __init__(self):
+        self.min_similarity = float(os.getenv("ROUTER_MIN_SIMILARITY", 0.35))
+        self.min_margin = float(os.getenv("ROUTER_MIN_MARGIN", 0.08))
+        self.temperature = float(os.getenv("ROUTER_TEMPERATURE", 0.05))
+        self.history_path = os.getenv("ROUTER_HISTORY_PATH", "")
+        self.min_spam_samples = int(os.getenv("ROUTER_MIN_SPAM_SAMPLES", 5))
+        self.save_every = max(1, int(os.getenv("ROUTER_HISTORY_SAVE_EVERY", 20)))
+
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._unsaved = 0
+        self._desc_vectors: Dict[str, np.ndarray] = {}
+        self._history_sum: Dict[str, np.ndarray] = {}
+        self._history_count: Dict[str, int] = {}
+        self._load_history()
+
+    # --- 중심 벡터 관리 ---
+    def _ensure_descriptions(self):
+        descriptions = DepartmentRegistry.get_description_map()
+        missing = [d for d in descriptions if d not in self._desc_vectors]
+        if not missing:
+            return
+        vectors = get_embedding_model().embed_documents([descriptions[d] for d in missing])
+        for dept_id, vec in zip(missing, vectors):
+            self._desc_vectors[dept_id] = _normalize(vec)
+
+    def _centroid(self, dept_id: str) -> np.ndarray:
+        if dept_id == SPAM_ID:
+            return _normalize(self._history_sum[SPAM_ID] / self._history_count[SPAM_ID])
+        desc = self._desc_vectors[dept_id]
+        count = self._history_count.get(dept_id, 0)
+        if not count:
+            return desc
+        return _normalize((desc + self._history_sum[dept_id]) / (count + 1))
+
+    def observe(self, dept_id: str, embedding: List[float], is_spam: bool = False) -> None:
+        """LLM 라우팅 결과를 해당 부서(스팸이면 스팸) 중심 벡터에 반영합니다."""
+        if is_spam:
+            dept_id = SPAM_ID
+        if embedding is None or (not is_spam and DepartmentRegistry.get_crew(dept_id) is None):
+            return
+        vec = _normalize(embedding)
+        with self._lock:
+            if dept_id in self._history_sum:
+                self._history_sum[dept_id] = self._history_sum[dept_id] + vec
+            else:
+                self._history_sum[dept_id] = vec
+            self._history_count[dept_id] = self._history_count.get(dept_id, 0) + 1
+            self._unsaved += 1
+            due = self._unsaved >= self.save_every
+        if due:
+            self.save()
+
+    @property
+    def active(self) -> bool:
+        """부서가 2개 이상 등록되어 로컬 라우팅(및 이를 위한 이메일 임베딩 계산)이 의미가 있는지"""
+        return len(DepartmentRegistry.get_description_map()) >= 2
+
+    # --- 판정 ---
+    def score(self, embedding: List[float]) -> List[Tuple[str, float]]:
+        """부서별 코사인 유사도를 내림차순으로 반환합니다."""
+        query = _normalize(embedding)
+        with self._lock:
+            self._ensure_descriptions()
+            scores = [(dept_id, float(np.dot(query, self._centroid(dept_id)))) for dept_id in self._desc_vectors]
+        return sorted(scores, key=lambda x: x[1], reverse=True)
+
+    def decide(self, embedding: List[float]) -> Tuple[Optional[str], float, float]:
+        """
+        (부서 ID 또는 None, 신뢰도, 마진)을 반환합니다.
+        최소 유사도 기준선을 '해당 없음' 후보로, 스팸 중심 벡터를 스팸 후보로 함께 비교합니다.
+        부서가 하나뿐이거나 스팸 이력이 부족하면 항상 None(LLM 라우팅)입니다.
+        """
+        with self._lock:
+            spam_samples = self._history_count.get(SPAM_ID, 0)
+        if not self.active or spam_samples < self.min_spam_samples:
+            return None, 0.0, 0.0
+
+        ranked = self.score(embedding) + [(NO_MATCH_ID, self.min_similarity)]
+        with self._lock:
+            ranked.append((SPAM_ID, float(np.dot(_normalize(embedding), self._centroid(SPAM_ID)))))
+        ranked.sort(key=lambda x: x[1], reverse=True)
+
+        sims = np.array([s for _, s in ranked], dtype=np.float32)
+        probs = np.exp((sims - sims.max()) / self.temperature)
+        probs /= probs.sum()
+
+        top_id, top_sim = ranked[0]
+        margin = top_sim - ranked[1][1]
+        confidence = float(probs[0])
+
+        if top_id in (NO_MATCH_ID, SPAM_ID) or margin < self.min_margin:
+            return None, confidence, margin
+        return top_id, confidence, margin
+
+    # --- 이력 저장 ---
+    def _load_history(self):
+        if not self.history_path or not os.path.exists(self.history_path):
+            return
+        try:
+            data = np.load(self.history_path)
+            for dept_id in data.files:
+                if dept_id.endswith("__count"):
+                    continue
+                self._history_sum[dept_id] = data[dept_id]
+                self._history_count[dept_id] = int(data[f"{dept_id}__count"])
+            logger.info(f"[Router] Loaded routing history for {len(self._history_sum)} depts.")
+        except Exception as e:
+            logger.warning(f"[Router] Failed to load routing history: {e}")
+
+    def save(self):
+        """라우팅 이력을 파일로 저장합니다. (임시 파일에 쓴 뒤 교체)"""
+        if not self.history_path:
+            return
+        with self._save_lock:
+            with self._lock:
+                arrays = dict(self._history_sum)
+                arrays.update({f"{k}__count": np.array(v) for k, v in self._history_count.items()})
+                self._unsaved = 0
+            tmp_path = None
+            try:
+                directory = os.path.dirname(os.path.abspath(self.history_path))
+                fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".router_history.", suffix=".npz")
+                with os.fdopen(fd, "wb") as f:
+                    np.savez(f, **arrays)
+                os.replace(tmp_path, self.history_path)
+            except Exception as e:
+                logger.warning(f"[Router] Failed to save routing history: {e}")
+                if tmp_path and os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+
+centroid_router = CentroidDeptRouter()
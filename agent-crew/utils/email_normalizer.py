@@ -0,0 +1,135 @@
+import html
+import re
+import logging
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("o200k_base")
+except Exception:
+    _ENCODING = None
+
+# 인용된 이전 메일이 시작되는 지점 (이 줄부터 끝까지 제거)
+_REPLY_HEADER_PATTERNS = [
+    re.compile(r"^\s*-{2,}\s*(Original Message|원본 메시지|원래 메시지)\s*-{2,}\s*$", re.IGNORECASE),
+    re.compile(r"^\s*On .{5,200}wrote:\s*$", re.IGNORECASE),
+    re.compile(r"^\s*\d{4}년\s*\d{1,2}월\s*\d{1,2}일.{0,80}(님이 작성|작성:|wrote:)\s*.*$"),
+]
+
+# Outlook 형식 회신 헤더 (From: 다음 줄에 Sent:/Date:가 오는 경우만 인용으로 판단)
+_OUTLOOK_FROM_PATTERN = re.compile(r"^\s*(From|보낸 사람|보낸사람)\s*:.+$", re.IGNORECASE)
+_OUTLOOK_SENT_PATTERN = re.compile(r"^\s*(Sent|Date|보낸 날짜|날짜)\s*:.+$", re.IGNORECASE)
+
+# 서명 시작 지점 (이 줄부터 끝까지 제거)
+_SIGNATURE_PATTERNS = [
+    re.compile(r"^--\s?$"),
+    re.compile(r"^\s*(Sent from my .+|.{0,20}에서 보냄|Get Outlook for .+)\s*$", re.IGNORECASE),
+]
+
+# 법적 고지/면책 문구 표지어. 본문 끝의 단락만, 표지어가 여럿이거나(서로 다른 2개 이상)
+# 한 개라도 긴 고지문 형태(DISCLAIMER_MIN_CHARS 이상)일 때만 제거 (학생 본문의 "기밀로 해주세요" 등은 유지)
+_DISCLAIMER_PATTERN = re.compile(
+    r"(confidential|intended recipient|disclaimer|privileged|this e-?mail|기밀|무단\s*(배포|복제|사용)|"
+    r"발신\s*전용|수신\s*거부|법적\s*(책임|조치)|수신인\s*(이외|외)|잘못\s*전송|즉시\s*삭제)",
+    re.IGNORECASE,
+)
+DISCLAIMER_MIN_CHARS = 300
+
+# HTML 본문 판정용 (평문의 "a < b 이고 c > d" 같은 부등호를 태그로 오인하지 않도록 실제 HTML 요소가 있을 때만 처리)
+_HTML_DOCUMENT_PATTERN = re.compile(r"<\s*(html|body|p|br|div|table|span|font)\b[^<>]*>", re.IGNORECASE)
+_HTML_TAG_PATTERN = re.compile(r"</?[A-Za-z][^<>]*>")
+_HTML_BLOCK_PATTERN = re.compile(r"<(script|style|head)[^>]*>.*?</\1>", re.IGNORECASE | re.DOTALL)
+_HTML_BREAK_PATTERN = re.compile(r"<\s*(br|/p|/div|/tr|/li|/h\d)\s*/?>", re.IGNORECASE)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    텍스트의 LLM 토큰 수를 추정합니다.
+    tiktoken이 없으면 한국어 기준 대략적인 문자 수 비율로 계산합니다.
+    """
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    return max(1, len(text) // 2)
+
+
+def _strip_html(text: str) -> str:
+    if "<" not in text or not _HTML_DOCUMENT_PATTERN.search(text):
+        return html.unescape(text)
+    text = _HTML_BLOCK_PATTERN.sub("", text)
+    text = _HTML_BREAK_PATTERN.sub("\n", text)
+    text = _HTML_TAG_PATTERN.sub("", text)
+    return html.unescape(text)
+
+
+def _cut_at_first_match(lines, patterns):
+    for idx, line in enumerate(lines):
+        if any(p.match(line) for p in patterns):
+            return lines[:idx]
+    return lines
+
+
+def _cut_at_outlook_header(lines):
+    for idx, line in enumerate(lines[:-1]):
+        if _OUTLOOK_FROM_PATTERN.match(line) and _OUTLOOK_SENT_PATTERN.match(lines[idx + 1]):
+            return lines[:idx]
+    return lines
+
+
+def _cut_trailing_quote(lines):
+    """본문 끝에 붙은 '>' 인용 블록만 제거합니다. (중간에 끼워 넣은 인용 답변은 유지)"""
+    end = len(lines)
+    quoted = False
+    while end > 0 and (not lines[end - 1].strip() or lines[end - 1].lstrip().startswith(">")):
+        quoted = quoted or lines[end - 1].lstrip().startswith(">")
+        end -= 1
+    return lines[:end] if quoted else lines
+
+
+def _is_disclaimer(paragraph: str) -> bool:
+    markers = {match.group(0).lower().replace(" ", "") for match in _DISCLAIMER_PATTERN.finditer(paragraph)}
+    return len(markers) >= 2 or (len(markers) == 1 and len(paragraph) >= DISCLAIMER_MIN_CHARS)
+
+
+def normalize_email_body(body: str) -> str:
+    """
+    LLM 입력용으로 이메일 본문을 정규화합니다.
+    HTML 잔여물, 인용된 회신 체인, 서명, 면책 문구를 제거하고 공백을 정리합니다.
+    정리 결과가 비어 있으면 원문을 그대로 반환합니다.
+    """
+    if not body:
+        return ""
+
+    text = _strip_html(body).replace("\r\n", "\n").replace("\r", "\n").replace(" ", " ")
+
+    lines = text.split("\n")
+    lines = _cut_at_first_match(lines, _REPLY_HEADER_PATTERNS)
+    lines = _cut_at_outlook_header(lines)
+    lines = _cut_trailing_quote(lines)
+    lines = _cut_at_first_match(lines, _SIGNATURE_PATTERNS)
+
+    # 면책 문구는 본문 끝(서명/맺음말 뒤)에만 오므로 끝에서부터 고지문 형태의 단락만 제거
+    paragraphs = [p for p in re.split(r"\n\s*\n", "\n".join(lines)) if p.strip()]
+    while paragraphs and _is_disclaimer(paragraphs[-1]):
+        paragraphs.pop()
+
+    cleaned = "\n\n".join(paragraphs)
+    cleaned = re.sub(r"[ \t]+", " ", cleaned)
+    cleaned = re.sub(r" *\n *", "\n", cleaned)
+    cleaned = re.sub(r"\n{3,}", "\n\n", cleaned).strip()
+
+    return cleaned or body.strip()
+
+
+def normalization_stats(original: str, cleaned: str) -> Dict[str, int]:
+    """원문 대비 정규화 본문의 토큰 절감량을 계산합니다."""
+    original_tokens = estimate_tokens(original)
+    cleaned_tokens = estimate_tokens(cleaned)
+    return {
+        "original_tokens": original_tokens,
+        "clean_tokens": cleaned_tokens,
+        "saved_tokens": max(0, original_tokens - cleaned_tokens),
+    }
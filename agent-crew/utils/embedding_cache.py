@@ -0,0 +1,130 @@
+import os
+import logging
+import tempfile
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    """캐시 키용 텍스트 정규화 (유니코드 NFC, 연속 공백 정리)"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class EmbeddingCache:
+    """
+    정규화된 쿼리 텍스트 -> 임베딩 벡터(float32) LRU 캐시.
+    persist_path가 주어지면 시작 시 불러오고, save_every번 삽입마다(및 종료 시) npz로 저장하여
+    컨테이너 재시작 후에도 인코더 호출을 생략할 수 있게 합니다.
+    저장 파일의 model_id가 현재 임베딩 모델과 다르면 무시합니다.
+    """
+
+    def __init__(self, max_entries: int, model_id: str, persist_path: str = "", save_every: int = 50):
+        self.max_entries = max_entries
+        self.model_id = model_id
+        self.persist_path = persist_path
+        self.save_every = save_every
+
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        # 저장은 스냅샷 시점 순서대로 한 번에 하나씩 (동시 저장이 서로의 임시 파일을 덮어쓰지 않도록)
+        self._save_lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._unsaved = 0
+        self._load()
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        key = normalize_text(text)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return vector
+
+    def put(self, text: str, vector) -> None:
+        if self.max_entries <= 0:
+            return
+        key = normalize_text(text)
+        with self._lock:
+            self._entries[key] = np.asarray(vector, dtype=np.float32)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+            self._unsaved += 1
+            should_save = self.persist_path and self._unsaved >= self.save_every
+        if should_save:
+            self.save()
+
+    def reset(self, model_id: str) -> None:
+        """임베딩 모델이 바뀐 경우 기존 항목을 비우고 이후 저장에 새 model_id를 기록합니다."""
+        with self._lock:
+            if model_id == self.model_id:
+                return
+            self.model_id = model_id
+            self._entries.clear()
+            self._unsaved = 0
+        logger.info(f"[EmbeddingCache] Reset for model: {model_id}")
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "model_id": self.model_id,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+                "memory_bytes": sum(v.nbytes for v in self._entries.values()),
+            }
+
+    # --- 영속화 ---
+    def _load(self):
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return
+        try:
+            with np.load(self.persist_path) as data:
+                if str(data["model_id"]) != self.model_id:
+                    logger.info(f"[EmbeddingCache] Ignoring cache for different model: {data['model_id']}")
+                    return
+                keys, vectors = data["keys"], data["vectors"]
+            for key, vector in list(zip(keys.tolist(), vectors))[-self.max_entries:]:
+                self._entries[key] = vector
+            logger.info(f"[EmbeddingCache] Loaded {len(self._entries)} embeddings from {self.persist_path}")
+        except Exception as e:
+            logger.warning(f"[EmbeddingCache] Failed to load '{self.persist_path}': {e}")
+
+    def save(self) -> None:
+        if not self.persist_path:
+            return
+        with self._save_lock:
+            with self._lock:
+                if not self._entries:
+                    return
+                keys = np.array(list(self._entries.keys()))
+                vectors = np.stack(list(self._entries.values()))
+                self._unsaved = 0
+            directory = os.path.dirname(self.persist_path) or "."
+            tmp_path = ""
+            try:
+                os.makedirs(directory, exist_ok=True)
+                # 같은 디렉터리의 고유 임시 파일에 기록 후 원자적으로 교체
+                fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".embedding_cache.", suffix=".npz")
+                with os.fdopen(fd, "wb") as f:
+                    np.savez(f, model_id=np.array(self.model_id), keys=keys, vectors=vectors)
+                os.replace(tmp_path, self.persist_path)
+            except Exception as e:
+                logger.warning(f"[EmbeddingCache] Failed to save '{self.persist_path}': {e}")
+                if tmp_path and os.path.exists(tmp_path):
+                    os.remove(tmp_path)
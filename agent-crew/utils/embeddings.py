@@ -0,0 +1,138 @@
+import os
+import logging
+import threading
+from typing import List, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_huggingface import HuggingFaceEmbeddings
+from utils.embedding_cache import EmbeddingCache
+
+logger = logging.getLogger(__name__)
+
+_model: Optional[Embeddings] = None
+_model_lock = threading.Lock()
+_torch_threads_applied = False
+
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "jhgan/ko-sroberta-multitask")
+# 프로세스 전역 torch intra-op 스레드 수 (임베딩/재정렬 모델 공통, 0이면 torch 기본값)
+# RERANKER_THREADS는 이전 설정 이름으로, 같은 전역 설정에 적용됨
+TORCH_NUM_THREADS = int(os.getenv("TORCH_NUM_THREADS", os.getenv("RERANKER_THREADS", 0)))
+# ONNX 백엔드 로드 시 PyTorch 모델과의 최소 코사인 유사도 (미만이면 PyTorch로 대체, 0이면 검사 생략)
+ONNX_PARITY_MIN_COSINE = float(os.getenv("ONNX_PARITY_MIN_COSINE", 0.99))
+
+# 정합성 검사용 고정 문장 (마지막 문장은 max_length를 넘겨 잘림 처리까지 비교)
+_PARITY_SENTENCES = [
+    "휴학 신청은 언제까지 해야 하나요?",
+    "졸업 최소 이수 학점과 전공 필수 과목을 알려주세요.",
+    "장학금 지급 기준 성적이 궁금합니다.",
+    "Capstone design 수업의 팀 구성 방법",
+    " ".join(["소프트웨어융합대학 학사운영규정에 따른 수강신청 정정 기간 안내"] * 30),
+]
+
+# 쿼리 텍스트 -> 벡터 캐시 (플래너 검색어 등의 재인코딩 방지, 이메일 본문은 저장하지 않음)
+embedding_cache = EmbeddingCache(
+    max_entries=int(os.getenv("EMBEDDING_CACHE_SIZE", 2048)),
+    model_id=f"{EMBEDDING_BACKEND}:{EMBEDDING_MODEL}",
+    persist_path=os.getenv("EMBEDDING_CACHE_PATH", ""),
+    save_every=int(os.getenv("EMBEDDING_CACHE_SAVE_EVERY", 50)),
+)
+
+
+def configure_torch_threads() -> None:
+    """
+    TORCH_NUM_THREADS를 torch에 적용합니다. (프로세스에서 torch 모델을 처음 로드할 때 1회)
+    torch.set_num_threads는 프로세스 전역 설정이므로 개별 모델 설정으로 두지 않습니다.
+    """
+    global _torch_threads_applied
+    if _torch_threads_applied:
+        return
+    _torch_threads_applied = True
+    if TORCH_NUM_THREADS > 0:
+        import torch
+        torch.set_num_threads(TORCH_NUM_THREADS)
+        logger.info(f"torch intra-op threads set to {TORCH_NUM_THREADS}")
+
+
+def _build_torch_model(model_name: str) -> Embeddings:
+    configure_torch_threads()
+    device = os.getenv("DEVICE_TYPE", "cpu")
+    logger.info(f"Loading embedding model: {model_name} (Device: {device})")
+    return HuggingFaceEmbeddings(model_name=model_name, model_kwargs={'device': device})
+
+
+def min_parity_cosine(model: Embeddings, reference: Embeddings) -> float:
+    """고정 문장에 대해 두 모델 임베딩의 최소 코사인 유사도를 계산합니다."""
+    a = np.asarray(model.embed_documents(_PARITY_SENTENCES), dtype=np.float32)
+    b = np.asarray(reference.embed_documents(_PARITY_SENTENCES), dtype=np.float32)
+    cosines = (a * b).sum(axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+    return float(cosines.min())
+
+
+def build_embedding_model(backend: str, check_parity: bool = True) -> Embeddings:
+    """
+    지정한 백엔드로 쿼리 임베딩 모델을 생성합니다.
+    - torch: HuggingFaceEmbeddings (sentence-transformers, PyTorch)
+    - onnx: int8 양자화 ONNX Runtime (최초 실행 시 ONNX_EXPORT_DIR에 모델을 내보냄)
+      check_parity면 로드 직후 PyTorch 모델과 고정 문장 임베딩을 비교하여, 최소 코사인 유사도가
+      ONNX_PARITY_MIN_COSINE 미만이면 (색인과 다른 벡터 공간으로 검색하지 않도록) PyTorch 모델을 대신 반환합니다.
+      검사 중에는 두 모델이 함께 메모리에 올라갑니다.
+    """
+    model_name = EMBEDDING_MODEL
+    if backend != "onnx":
+        return _build_torch_model(model_name)
+
+    from utils.onnx_embeddings import OnnxSentenceEmbeddings
+
+    export_dir = os.getenv("ONNX_EXPORT_DIR", os.path.join("onnx_models", model_name.replace("/", "__")))
+    logger.info(f"Loading embedding model: {model_name} (Backend: onnx-int8, {export_dir})")
+    model = OnnxSentenceEmbeddings(
+        model_name=model_name, export_dir=export_dir,
+        num_threads=int(os.getenv("EMBEDDING_THREADS", 0)),
+        # sentence-transformers 모델 설정(max_seq_length)과 같아야 PyTorch 백엔드와 결과가 일치
+        max_length=int(os.getenv("EMBEDDING_MAX_LENGTH", 128))
+    )
+    if not check_parity or ONNX_PARITY_MIN_COSINE <= 0:
+        return model
+
+    reference = _build_torch_model(model_name)
+    min_cosine = min_parity_cosine(model, reference)
+    if min_cosine < ONNX_PARITY_MIN_COSINE:
+        logger.error(
+            f"ONNX embedding parity check failed (min cosine {min_cosine:.4f} < {ONNX_PARITY_MIN_COSINE}), "
+            f"falling back to torch backend"
+        )
+        # 캐시에 ONNX 벡터와 PyTorch 벡터가 섞이지 않도록 실제 백엔드 기준으로 초기화
+        embedding_cache.reset(f"torch:{model_name}")
+        return reference
+    logger.info(f"ONNX embedding parity check passed (min cosine {min_cosine:.4f})")
+    return model
+
+
+def get_embedding_model() -> Embeddings:
+    """
+    프로세스 전체에서 공유하는 쿼리 임베딩 모델을 반환합니다. (최초 호출 시 1회 로드)
+    백엔드는 EMBEDDING_BACKEND(torch | onnx)로 선택합니다.
+    """
+    global _model
+    with _model_lock:
+        if _model is None:
+            _model = build_embedding_model(EMBEDDING_BACKEND)
+    return _model
+
+
+def embed_text(text: str, cache: bool = True) -> List[float]:
+    """
+    텍스트를 임베딩합니다. 캐시에 있으면 모델을 호출하지 않습니다.
+    cache=False면 캐시를 조회/저장하지 않습니다. (이메일 본문처럼 한 번만 쓰이고 개인정보가 담긴 텍스트는
+    디스크 캐시에 남기지 않고, 재사용되는 검색어 항목을 LRU에서 밀어내지 않도록)
+    """
+    if not cache:
+        return get_embedding_model().embed_query(text)
+    cached = embedding_cache.get(text)
+    if cached is not None:
+        return cached.tolist()
+
+    vector = get_embedding_model().embed_query(text)
+    embedding_cache.put(text, vector)
+    return vector
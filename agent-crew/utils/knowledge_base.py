@@ -0,0 +1,63 @@
+import os
+import time
+import logging
+import threading
+import chromadb
+
+logger = logging.getLogger(__name__)
+
+COLLECTION_NAME = os.getenv("CHROMA_COLLECTION_NAME", "academic_regulations")
+VERSION_TTL_SECONDS = float(os.getenv("KB_VERSION_TTL_SECONDS", 30))
+SNAPSHOT_DIR = os.path.join(os.getenv("RAG_ARTIFACT_DIR", "/rag_artifacts"), "vector_snapshot")
+
+_client = None
+_client_lock = threading.Lock()
+_version_cache = {"value": "", "checked_at": 0.0}
+
+
+def get_chroma_client():
+    """프로세스 전체에서 공유하는 ChromaDB HTTP 클라이언트를 반환합니다."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = chromadb.HttpClient(
+                host=os.getenv("CHROMA_HOST", "chromadb"),
+                port=int(os.getenv("CHROMA_PORT", 8000))
+            )
+    return _client
+
+
+def read_snapshot_version(snapshot_root: str = SNAPSHOT_DIR) -> str:
+    """인제스천이 내보낸 로컬 벡터 스냅샷의 활성 버전(CURRENT 포인터)을 읽습니다."""
+    try:
+        with open(os.path.join(snapshot_root, "CURRENT")) as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+
+def get_knowledge_base_version() -> str:
+    """
+    현재 지식베이스(규정집 컬렉션)의 인제스천 버전을 반환합니다.
+    인제스천 시 컬렉션 메타데이터에 기록한 'ingestion_version'을 읽으며(로컬 스냅샷 백엔드는 CURRENT 포인터),
+    조회 비용을 줄이기 위해 KB_VERSION_TTL_SECONDS 동안 결과를 재사용합니다. 조회에 실패하면 빈 문자열을 반환합니다.
+    """
+    now = time.monotonic()
+    if _version_cache["value"] and now - _version_cache["checked_at"] < VERSION_TTL_SECONDS:
+        return _version_cache["value"]
+
+    if os.getenv("VECTOR_BACKEND", "chroma").lower() == "local":
+        _version_cache["value"] = read_snapshot_version()
+        _version_cache["checked_at"] = now
+        return _version_cache["value"]
+
+    try:
+        coll = get_chroma_client().get_collection(name=COLLECTION_NAME)
+        version = (coll.metadata or {}).get("ingestion_version") or f"unversioned-{coll.count()}"
+    except Exception as e:
+        logger.warning(f"[KB] Failed to read knowledge base version: {e}")
+        version = ""
+
+    _version_cache["value"] = version
+    _version_cache["checked_at"] = now
+    return version
@@ -0,0 +1,111 @@
+import os
+import re
+import gzip
+import json
+import math
+import logging
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# data-pipelines/lexical_index.py 가 생성하는 색인 형식 버전
+SUPPORTED_FORMAT = 1
+
+_WORD_PATTERN = re.compile(r"[0-9a-zA-Z가-힣]+")
+
+
+def tokenize(text: str, ngram_size: int) -> List[str]:
+    """인제스천 시 색인 생성에 사용한 것과 동일한 단어 + 문자 n-gram 토크나이저"""
+    tokens = []
+    for word in _WORD_PATTERN.findall(text.lower()):
+        tokens.append(word)
+        if len(word) > ngram_size:
+            tokens.extend(word[i:i + ngram_size] for i in range(len(word) - ngram_size + 1))
+    return tokens
+
+
+class LexicalIndex:
+    """
+    인제스천이 RAG_ARTIFACT_DIR에 생성한 파일별 BM25 역색인을 읽어 검색합니다.
+    파일이 교체되면(mtime 변경) 다음 검색 시 자동으로 다시 로드합니다.
+    """
+
+    def __init__(self, path: str, k1: float = 1.2, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._index: Optional[Dict] = None
+        self._mtime = 0.0
+        self._avg_lengths: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _maybe_reload(self) -> bool:
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return self._index is not None
+        if self._index is not None and mtime == self._mtime:
+            return True
+
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                index = json.load(f)
+            if index.get("format") != SUPPORTED_FORMAT:
+                logger.warning(f"[Lexical] Unsupported index format: {index.get('format')}")
+                return self._index is not None
+            self._index = index
+            self._mtime = mtime
+            self._avg_lengths = {
+                source: (sum(part["lengths"]) / len(part["lengths"])) if part["lengths"] else 0.0
+                for source, part in index["sources"].items()
+            }
+            logger.info(f"[Lexical] Loaded index version {index.get('version')} ({len(index['sources'])} files)")
+        except Exception as e:
+            logger.warning(f"[Lexical] Failed to load index '{self.path}': {e}")
+        return self._index is not None
+
+    def is_available(self) -> bool:
+        with self._lock:
+            return self._maybe_reload()
+
+    def search(self, query: str, source_file: str, k: int) -> List[Tuple[str, float]]:
+        """source_file 내에서 BM25 점수 상위 k개 청크의 (Chroma ID, 점수)를 반환합니다."""
+        with self._lock:
+            if not self._maybe_reload():
+                return []
+            index = self._index
+            part = index["sources"].get(source_file)
+            avg_len = self._avg_lengths.get(source_file, 0.0)
+        if not part or not part["ids"]:
+            return []
+
+        n_docs = len(part["ids"])
+        lengths = part["lengths"]
+        scores: Dict[int, float] = {}
+        for term, qtf in Counter(tokenize(query, index["ngram_size"])).items():
+            postings = part["postings"].get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_idx, tf in postings:
+                norm = self.k1 * (1 - self.b + self.b * lengths[doc_idx] / (avg_len or 1.0))
+                scores[doc_idx] = scores.get(doc_idx, 0.0) + qtf * idf * tf * (self.k1 + 1) / (tf + norm)
+
+        ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:k]
+        return [(part["ids"][doc_idx], score) for doc_idx, score in ranked]
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], weights: List[float], rrf_k: int = 60) -> List[Tuple[str, float]]:
+    """여러 순위 목록을 RRF(Reciprocal Rank Fusion)로 결합하여 (ID, 점수) 내림차순으로 반환합니다."""
+    fused: Dict[str, float] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, doc_id in enumerate(ranking):
+            fused[doc_id] = fused.get(doc_id, 0.0) + weight / (rrf_k + rank + 1)
+    return sorted(fused.items(), key=lambda x: x[1], reverse=True)
+
+
+lexical_index = LexicalIndex(
+    path=os.path.join(os.getenv("RAG_ARTIFACT_DIR", "/rag_artifacts"), "lexical_index.json.gz")
+)
@@ -1,17 +1,34 @@
 import os
 import logging
 from openai import OpenAI
-from schemas.task_output import DepartmentRoutingDecision, SupportingDeptDecision
+from typing import List, Optional
+from schemas.task_output import DepartmentRoutingDecision, PrimaryDeptResult, SupportingDeptCandidates
 from utils.dept_registry import DepartmentRegistry
+from utils.dept_router import centroid_router
 
 logger = logging.getLogger(__name__)
 
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
-def determine_primary_dept(email_body: str) -> DepartmentRoutingDecision:
+def determine_primary_dept(email_body: str, email_embedding: Optional[List[float]] = None) -> PrimaryDeptResult:
     """
     이메일 본문을 분석하여 가장 적합한 주관 부서(Primary Dept)를 선정합니다.
+    임베딩이 주어지면 로컬 중심 벡터 라우터로 먼저 판정하고, 애매한 경우에만 LLM을 호출합니다.
     """
+    confidence, margin = None, None
+    if email_embedding is not None:
+        try:
+            dept_id, confidence, margin = centroid_router.decide(email_embedding)
+            if dept_id:
+                logger.info(f"[Router] Local decision: {dept_id} (confidence={confidence:.2f}, margin={margin:.3f})")
+                return PrimaryDeptResult(
+                    primary_dept_id=dept_id, is_spam=False,
+                    decided_by="centroid", confidence=confidence, margin=margin
+                )
+            logger.info(f"[Router] Ambiguous (confidence={confidence:.2f}, margin={margin:.3f}). Falling back to LLM.")
+        except Exception as e:
+            logger.warning(f"[Router] Local routing failed, falling back to LLM: {e}")
+
     dept_desc = DepartmentRegistry.get_all_descriptions()
     
     system_prompt = f"""
@@ -32,27 +49,42 @@ def determine_primary_dept(email_body: str) -> DepartmentRoutingDecision:
             ],
             response_format=DepartmentRoutingDecision,
         )
-        return completion.choices[0].message.parsed
+        decision = completion.choices[0].message.parsed
+        if email_embedding is not None:
+            # 스팸 판정은 LLM만 하며, 로컬 라우터는 스팸 중심 벡터와 가까운 이메일을 LLM으로 넘기는 데에만 사용
+            centroid_router.observe(decision.primary_dept_id, email_embedding, is_spam=decision.is_spam)
+        return PrimaryDeptResult(
+            **decision.model_dump(), decided_by="llm", confidence=confidence, margin=margin
+        )
     except Exception as e:
         logger.error(f"Primary Dept Selection Failed: {e}")
-        return DepartmentRoutingDecision(primary_dept_id="OTHER", is_spam=False)
+        return PrimaryDeptResult(primary_dept_id="OTHER", is_spam=False, decided_by="fallback")
 
-def find_supporting_dept(query: str, hint: str) -> str | None:
+def find_supporting_depts(query: str, hint: str, exclude: Optional[List[str]] = None) -> List[str]:
     """
-    부족한 정보(Query)와 힌트(Hint)를 바탕으로 이를 해결해 줄 협조 부서를 찾습니다.
+    부족한 정보(Query)와 힌트(Hint)를 바탕으로 이를 해결해 줄 협조 부서 후보를 순위대로 찾습니다.
+    등록되지 않은 부서와 이미 조회한 부서(exclude)는 제외합니다.
     """
     dept_desc = DepartmentRegistry.get_all_descriptions()
+    exclude = set(exclude or [])
     
     try:
         completion = client.beta.chat.completions.parse(
             model="gpt-4o-mini",
             messages=[
-                {"role": "system", "content": f"Find Dept ID based on capabilities.\nList:\n{dept_desc}"}, 
+                {"role": "system", "content": f"Rank Dept IDs that can answer the query, most likely first.\nList:\n{dept_desc}"}, 
                 {"role": "user", "content": f"Query: {query}\nHint: {hint}"}
             ],
-            response_format=SupportingDeptDecision,
+            response_format=SupportingDeptCandidates,
         )
-        return completion.choices[0].message.parsed.dept_id
+        ranked = completion.choices[0].message.parsed.dept_ids
     except Exception as e:
         logger.error(f"Supporting Dept Search Failed: {e}")
-        return None
\ No newline at end of file
+        return []
+
+    candidates = []
+    for dept_id in ranked:
+        if dept_id in exclude or dept_id in candidates or DepartmentRegistry.get_crew(dept_id) is None:
+            continue
+        candidates.append(dept_id)
+    return candidates
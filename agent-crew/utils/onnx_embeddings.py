@@ -0,0 +1,81 @@
+import os
+import logging
+import platform
+import threading
+from typing import List
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+QUANTIZED_FILE = "model_quantized.onnx"
+
+
+def export_quantized_model(model_name: str, export_dir: str) -> str:
+    """
+    HuggingFace 모델을 ONNX로 내보낸 뒤 int8 동적 양자화를 적용합니다.
+    이미 내보낸 파일이 있으면 재사용하며, 양자화된 모델 파일 경로를 반환합니다.
+    """
+    quantized_path = os.path.join(export_dir, QUANTIZED_FILE)
+    if os.path.exists(quantized_path):
+        return quantized_path
+
+    # 내보내기 시에만 필요한 의존성
+    from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from transformers import AutoTokenizer
+
+    logger.info(f"Exporting {model_name} to ONNX: {export_dir}")
+    os.makedirs(export_dir, exist_ok=True)
+    ORTModelForFeatureExtraction.from_pretrained(model_name, export=True).save_pretrained(export_dir)
+    AutoTokenizer.from_pretrained(model_name).save_pretrained(export_dir)
+
+    if platform.machine().lower() in ("arm64", "aarch64"):
+        qconfig = AutoQuantizationConfig.arm64(is_static=False, per_channel=False)
+    else:
+        qconfig = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+    ORTQuantizer.from_pretrained(export_dir).quantize(save_dir=export_dir, quantization_config=qconfig)
+    logger.info(f"Quantized ONNX model written: {quantized_path}")
+    return quantized_path
+
+
+class OnnxSentenceEmbeddings(Embeddings):
+    """
+    int8 양자화 ONNX Runtime 기반 문장 임베딩.
+    sentence-transformers 모델(jhgan/ko-sroberta-multitask)과 동일하게 mean pooling을 적용하므로
+    PyTorch 백엔드(HuggingFaceEmbeddings)와 같은 벡터 공간을 사용합니다.
+    """
+
+    def __init__(self, model_name: str, export_dir: str, num_threads: int = 0, max_length: int = 128):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("EMBEDDING_BACKEND=onnx requires: pip install -r requirements-onnx.txt") from e
+        from transformers import AutoTokenizer
+
+        model_path = export_quantized_model(model_name, export_dir)
+        options = ort.SessionOptions()
+        if num_threads > 0:
+            options.intra_op_num_threads = num_threads
+        self._session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self._input_names = {i.name for i in self._session.get_inputs()}
+        self._tokenizer = AutoTokenizer.from_pretrained(export_dir)
+        self._max_length = max_length
+        self._lock = threading.Lock()
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        with self._lock:
+            encoded = self._tokenizer(
+                texts, padding=True, truncation=True, max_length=self._max_length, return_tensors="np"
+            )
+        feeds = {name: value.astype(np.int64) for name, value in encoded.items() if name in self._input_names}
+        token_embeddings = self._session.run(None, feeds)[0]
+
+        mask = encoded["attention_mask"][..., None].astype(np.float32)
+        return (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._encode(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._encode([text])[0].tolist()
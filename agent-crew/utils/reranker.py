@@ -0,0 +1,77 @@
+import os
+import time
+import logging
+import threading
+from typing import List, Optional, Tuple
+from langchain_core.documents import Document
+from utils.embeddings import configure_torch_threads
+
+logger = logging.getLogger(__name__)
+
+
+class CrossEncoderReranker:
+    """
+    CPU cross-encoder 재정렬기.
+    여러 검색 쿼리에서 모인 후보 청크를 (질문, 청크) 쌍으로 배치 채점하여 상위 N개만 남깁니다.
+    지연 예산(RERANKER_LATENCY_BUDGET_MS)을 넘기면 남은 배치는 채점하지 않고 원래 순서/검색 점수 그대로 뒤에 붙입니다.
+    스레드 수는 임베딩 모델과 공유하는 프로세스 전역 설정(TORCH_NUM_THREADS)을 따릅니다.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("RERANKER_ENABLED", "false").lower() == "true"
+        self.model_name = os.getenv("RERANKER_MODEL", "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1")
+        self.top_n = int(os.getenv("RERANKER_TOP_N", 4))
+        self.batch_size = int(os.getenv("RERANKER_BATCH_SIZE", 32))
+        self.latency_budget_ms = float(os.getenv("RERANKER_LATENCY_BUDGET_MS", 800))
+        self.max_length = int(os.getenv("RERANKER_MAX_LENGTH", 512))
+
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        with self._lock:
+            if self._model is None:
+                import torch
+                from sentence_transformers import CrossEncoder
+
+                configure_torch_threads()
+                logger.info(f"Loading reranker model: {self.model_name} (threads={torch.get_num_threads()})")
+                self._model = CrossEncoder(self.model_name, device="cpu", max_length=self.max_length)
+        return self._model
+
+    def rerank(self, query: str,
+               candidates: List[Tuple[Document, Optional[float]]]) -> List[Tuple[Document, Optional[float], bool]]:
+        """
+        후보를 재정렬하여 상위 top_n개의 (문서, 점수, 재정렬 여부)를 반환합니다.
+        재정렬된 후보의 점수는 cross-encoder 점수, 채점하지 못한 후보는 원래 검색 점수입니다.
+        """
+        if not candidates:
+            return []
+
+        model = self._get_model()
+        start = time.perf_counter()
+        scores: List[float] = []
+        for i in range(0, len(candidates), self.batch_size):
+            batch = candidates[i:i + self.batch_size]
+            batch_scores = model.predict(
+                [(query, doc.page_content) for doc, _ in batch],
+                batch_size=self.batch_size, show_progress_bar=False
+            )
+            scores.extend(float(s) for s in batch_scores)
+            if (time.perf_counter() - start) * 1000 > self.latency_budget_ms:
+                break
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        scored = sorted(
+            ((doc, score, True) for (doc, _), score in zip(candidates, scores)),
+            key=lambda x: x[1], reverse=True
+        )
+        # 예산 초과로 채점하지 못한 후보는 기존 검색 순서와 점수를 유지하여 뒤에 배치
+        unscored = [(doc, score, False) for doc, score in candidates[len(scores):]]
+        logger.info(
+            f"[Reranker] Scored {len(scores)}/{len(candidates)} candidates in {elapsed_ms:.0f}ms, keeping {self.top_n}"
+        )
+        return (scored + unscored)[:self.top_n]
+
+
+reranker = CrossEncoderReranker()
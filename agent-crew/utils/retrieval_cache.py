@@ -0,0 +1,92 @@
+import os
+import re
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from utils.knowledge_base import get_knowledge_base_version
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(query: str) -> str:
+    """캐시 키용 질의 정규화 (대소문자, 공백, 문장부호 차이 무시)"""
+    text = re.sub(r"[^\w\s]", " ", query.lower())
+    return " ".join(text.split())
+
+
+class RetrievalCache:
+    """
+    검색 결과 LRU 캐시.
+    키는 (검색 범위(대상 파일), 정규화된 검색어, 지식베이스 버전)이며, 인제스천으로 버전이 바뀌면 전체를 비웁니다.
+    이메일 본문 대신 검색 계획이 만든 짧은 검색어로 조회하므로 서로 다른 이메일의 같은 질문끼리 적중합니다.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str, str], Any]" = OrderedDict()
+        self._version = ""
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def _sync_version(self, version: str) -> str:
+        """락을 잡은 상태에서 호출. 버전 조회(Chroma HTTP 호출)는 락 밖에서 미리 해 둡니다."""
+        if version != self._version:
+            if self._entries:
+                logger.info(f"[RetrievalCache] KB version changed ({self._version} -> {version}). Invalidating.")
+                self._invalidations += 1
+            self._entries.clear()
+            self._version = version
+        return version
+
+    def get(self, scope: str, query: str) -> Optional[Any]:
+        if self.max_entries <= 0:
+            return None
+        current = get_knowledge_base_version()
+        with self._lock:
+            version = self._sync_version(current)
+            key = (scope, normalize_query(query), version)
+            value = self._entries.get(key) if version else None
+            if value is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def put(self, scope: str, query: str, value: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        current = get_knowledge_base_version()
+        with self._lock:
+            version = self._sync_version(current)
+            # 버전을 알 수 없으면 무효화 시점을 보장할 수 없으므로 저장하지 않음
+            if not version:
+                return
+            key = (scope, normalize_query(query), version)
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "kb_version": self._version,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+            }
+
+
+retrieval_cache = RetrievalCache(max_entries=int(os.getenv("RETRIEVAL_CACHE_SIZE", 256)))
@@ -0,0 +1,249 @@
+import os
+import json
+import math
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+
+from utils.embeddings import get_embedding_model
+from utils.knowledge_base import (
+    get_chroma_client, get_knowledge_base_version, read_snapshot_version, COLLECTION_NAME, SNAPSHOT_DIR
+)
+
+logger = logging.getLogger(__name__)
+
+
+def source_ref_key(source: str) -> str:
+    """
+    대표 청크 메타데이터에서 참조 파일의 청크 위치를 담는 키.
+    인제스천 측 data-pipelines/dedup.ref_key 와 같은 규칙이어야 합니다.
+    """
+    return f"ref__{hashlib.sha1(source.encode('utf-8')).hexdigest()[:16]}"
+
+
+def _localize(doc: Document, source_file: str) -> Document:
+    """
+    다른 파일이 소유한 대표 청크를 source_file 기준 위치(chunk_id, page_number)의 문서로 바꿉니다.
+    참조 항목에 source_file 자신의 원문이 있으면(공백만 다른 경우) 그 원문을 본문으로 씁니다.
+    """
+    meta = doc.metadata or {}
+    if meta.get("source") == source_file:
+        return doc
+    refs = json.loads(meta.get("dup_refs") or "{}")
+    if source_file not in refs:
+        return doc
+    ref = refs[source_file]
+    return Document(
+        id=doc.id, page_content=ref[2] if len(ref) > 2 else doc.page_content,
+        metadata={**meta, "source": source_file, "chunk_id": ref[0], "page_number": ref[1], "dup_of": meta.get("source")}
+    )
+
+
+class ChromaBackend:
+    """
+    ChromaDB HTTP 서버를 사용하는 기본 검색 백엔드.
+    레지스트리 컬렉션(CHROMA_COLLECTION_NAME) 메타데이터(포인터)의 layout에 따라
+    - single: 활성 데이터 컬렉션(active_collection, 없으면 레지스트리 자체)을 source 메타데이터로 필터링하여 검색
+    - per_source: 라우팅 맵(source -> 파티션 컬렉션)을 따라 대상 파일의 파티션만 검색
+    포인터에 dedup이 있으면(중복 청크 제거) 대상 파일이 참조하는 다른 파일의 대표 청크도 함께 검색하고,
+    결과 메타데이터를 대상 파일 기준 위치로 바꿔 반환합니다.
+    지식베이스 버전이 바뀌면 포인터와 컬렉션 핸들을 다시 읽습니다. (전체 재구축 시 새 세대 컬렉션으로 교체되는 경우 대비)
+    """
+
+    def __init__(self):
+        self._embeddings = get_embedding_model()
+        self._layout_version: Optional[str] = None
+        self._layout = "single"
+        self._active_collection = COLLECTION_NAME
+        self._dedup = False
+        self._routing_map: Dict[str, str] = {}
+        self._stores: Dict[str, Chroma] = {}
+        self._lock = threading.Lock()
+
+    def _store(self, name: str) -> Chroma:
+        if name not in self._stores:
+            self._stores[name] = Chroma(
+                client=get_chroma_client(),
+                collection_name=name,
+                embedding_function=self._embeddings
+            )
+        return self._stores[name]
+
+    def _refresh_layout(self) -> None:
+        version = get_knowledge_base_version()
+        if version == self._layout_version:
+            return
+        try:
+            meta = get_chroma_client().get_collection(name=COLLECTION_NAME).metadata or {}
+        except Exception as e:
+            logger.warning(f"[ChromaBackend] Failed to read collection layout, keeping previous: {e}")
+            return
+        self._layout = meta.get("layout", "single")
+        self._active_collection = meta.get("active_collection") or COLLECTION_NAME
+        self._dedup = bool(meta.get("dedup"))
+        self._routing_map = json.loads(meta.get("routing_map", "{}"))
+        self._stores = {}
+        self._layout_version = version
+        logger.info(f"[ChromaBackend] Layout '{self._layout}' (version {version}, {len(self._routing_map)} partitions)")
+
+    def _partition(self, source_file: str) -> Tuple[Optional[Chroma], Optional[Dict]]:
+        """대상 파일을 검색할 컬렉션과 추가 필터를 반환합니다."""
+        with self._lock:
+            self._refresh_layout()
+            if self._layout == "per_source":
+                name = self._routing_map.get(source_file)
+                return (self._store(name), None) if name else (None, None)
+            if self._dedup:
+                return self._store(self._active_collection), {
+                    "$or": [{"source": source_file}, {source_ref_key(source_file): {"$gte": 0}}]
+                }
+            return self._store(self._active_collection), {"source": source_file}
+
+    def search(self, vector: List[float], source_file: str, k: int) -> List[Tuple[Document, float]]:
+        store, where = self._partition(source_file)
+        if store is None:
+            return []
+        docs_with_distances = store.similarity_search_by_vector_with_relevance_scores(vector, k=k, filter=where)
+        relevance_fn = store._select_relevance_score_fn()
+        return [(_localize(doc, source_file), relevance_fn(dist)) for doc, dist in docs_with_distances]
+
+    def get_by_ids(self, ids: List[str], source_file: str) -> List[Document]:
+        store, _ = self._partition(source_file)
+        if store is None:
+            return []
+        fetched = store.get(ids=ids, include=["documents", "metadatas"])
+        return [
+            _localize(Document(id=doc_id, page_content=text, metadata=meta or {}), source_file)
+            for doc_id, text, meta in zip(fetched["ids"], fetched["documents"], fetched["metadatas"])
+        ]
+
+    def get_chunk_text(self, source_file: str, chunk_id: int) -> Optional[str]:
+        store, where = self._partition(source_file)
+        if store is None:
+            return None
+        chunk_filter = {"chunk_id": chunk_id}
+        if where is None:
+            where = chunk_filter
+        elif self._dedup:
+            # 대상 파일이 소유한 청크이거나, 대상 파일의 해당 위치로 참조된 다른 파일의 대표 청크
+            where = {"$or": [{"$and": [{"source": source_file}, chunk_filter]}, {source_ref_key(source_file): chunk_id}]}
+        else:
+            where = {"$and": [where, chunk_filter]}
+        data = store.get(where=where, include=["documents", "metadatas"])
+        if data and data.get('documents'):
+            if self._dedup:
+                return _localize(Document(page_content=data['documents'][0], metadata=data['metadatas'][0] or {}),
+                                 source_file).page_content
+            return data['documents'][0]
+        return None
+
+    def list_sources(self) -> List[str]:
+        with self._lock:
+            self._refresh_layout()
+            if self._layout == "per_source":
+                return sorted(self._routing_map.keys())
+            active_collection = self._active_collection
+        coll = get_chroma_client().get_collection(name=active_collection)
+        metas = coll.get(include=["metadatas"])['metadatas']
+        sources = set(m['source'] for m in metas if m and 'source' in m)
+        # 모든 청크가 다른 파일의 대표 청크로 합쳐진 파일도 목록에 포함
+        for m in metas:
+            if m and m.get('dup_refs'):
+                sources.update(json.loads(m['dup_refs']))
+        return sorted(sources)
+
+
+class _SnapshotPartition:
+    def __init__(self, directory: str, slug: str):
+        # 임베딩 행렬은 메모리 매핑으로 열어 필요한 페이지만 적재
+        self.matrix = np.load(os.path.join(directory, f"{slug}.f32.npy"), mmap_mode="r")
+        self.sq_norms = np.einsum("ij,ij->i", self.matrix, self.matrix)
+        with open(os.path.join(directory, f"{slug}.json"), encoding="utf-8") as f:
+            data = json.load(f)
+        self.ids: List[str] = data["ids"]
+        self.documents: List[str] = data["documents"]
+        self.metadatas: List[Dict] = data["metadatas"]
+        self.row_by_id = {doc_id: i for i, doc_id in enumerate(self.ids)}
+        self.row_by_chunk = {
+            meta.get("chunk_id"): i for i, meta in enumerate(self.metadatas) if meta.get("chunk_id") is not None
+        }
+
+    def document(self, row: int) -> Document:
+        return Document(id=self.ids[row], page_content=self.documents[row], metadata=self.metadatas[row])
+
+
+class LocalSnapshotBackend:
+    """
+    인제스천이 내보낸 읽기 전용 스냅샷(RAG_ARTIFACT_DIR/vector_snapshot)을 프로세스 내에서 검색하는 백엔드.
+    원본 파일 필터는 파티션 조회로 대체되며, 파티션 내부는 정확(flat) 검색을 수행합니다.
+    CURRENT 포인터가 바뀌면 다음 호출 시 새 버전을 로드합니다.
+    """
+
+    def __init__(self, snapshot_root: str = SNAPSHOT_DIR):
+        self.snapshot_root = snapshot_root
+        self._version = ""
+        self._partitions: Dict[str, _SnapshotPartition] = {}
+        self._lock = threading.Lock()
+        self._refresh()
+
+    def _refresh(self) -> Dict[str, _SnapshotPartition]:
+        with self._lock:
+            version = read_snapshot_version(self.snapshot_root)
+            if version and version != self._version:
+                directory = os.path.join(self.snapshot_root, version)
+                with open(os.path.join(directory, "manifest.json"), encoding="utf-8") as f:
+                    manifest = json.load(f)
+                self._partitions = {
+                    source: _SnapshotPartition(directory, part["slug"])
+                    for source, part in manifest["partitions"].items()
+                }
+                self._version = version
+                logger.info(f"[LocalIndex] Loaded snapshot {version} ({len(self._partitions)} partitions)")
+            return self._partitions
+
+    def search(self, vector: List[float], source_file: str, k: int) -> List[Tuple[Document, float]]:
+        part = self._refresh().get(source_file)
+        if part is None or not part.ids:
+            return []
+        query = np.asarray(vector, dtype=np.float32)
+        # Chroma 기본 공간(l2, 제곱 거리)과 langchain 관련도 변환(1 - d/√2)을 동일하게 적용
+        distances = part.sq_norms - 2.0 * (part.matrix @ query) + float(query @ query)
+        k = min(k, len(part.ids))
+        top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.argsort(distances[top])]
+        return [(part.document(int(row)), 1.0 - float(distances[row]) / math.sqrt(2)) for row in top]
+
+    def get_by_ids(self, ids: List[str], source_file: str) -> List[Document]:
+        part = self._refresh().get(source_file)
+        if part is None:
+            return []
+        return [part.document(part.row_by_id[doc_id]) for doc_id in ids if doc_id in part.row_by_id]
+
+    def get_chunk_text(self, source_file: str, chunk_id: int) -> Optional[str]:
+        part = self._refresh().get(source_file)
+        if part is None or chunk_id not in part.row_by_chunk:
+            return None
+        return part.documents[part.row_by_chunk[chunk_id]]
+
+    def list_sources(self) -> List[str]:
+        return sorted(self._refresh().keys())
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_vector_backend():
+    """VECTOR_BACKEND(chroma | local)에 따라 프로세스 공유 검색 백엔드를 반환합니다."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if os.getenv("VECTOR_BACKEND", "chroma").lower() == "local":
+                _backend = LocalSnapshotBackend()
+            else:
+                _backend = ChromaBackend()
+    return _backend
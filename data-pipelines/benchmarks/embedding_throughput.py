@@ -0,0 +1,62 @@
+"""
+인제스천 임베딩 처리량 벤치마크
+
+동일한 청크 집합을 단일 프로세스 임베딩과 샤딩 임베딩(sharded_embedding.ShardedEmbeddings, 워커 수별)으로
+인코딩하여 chunks/s 를 비교합니다. 청크 본문은 --texts(JSONL: text) 또는 합성 문장으로 만듭니다.
+모델 로드 시간은 제외하며(워밍업 1회), 임베딩 캐시는 사용하지 않습니다.
+
+실행 (data-pipelines 디렉터리에서):
+    python -m benchmarks.embedding_throughput --chunks 2000 --workers 1 2 4
+"""
+import json
+import time
+import argparse
+
+from injest_pdfs import load_embedding_model, EMBEDDING_MODEL, DEVICE_TYPE, CHUNK_SIZE
+from sharded_embedding import ShardedEmbeddings
+
+SAMPLE_SENTENCE = "학생은 졸업에 필요한 최소 이수 학점과 전공 필수 과목을 학과 시행세칙에 따라 이수하여야 한다. "
+
+
+def load_texts(path: str, count: int):
+    if path:
+        with open(path, encoding="utf-8") as f:
+            texts = [json.loads(line)["text"] for line in f if line.strip()]
+        return (texts * (count // max(1, len(texts)) + 1))[:count]
+    base = SAMPLE_SENTENCE * (CHUNK_SIZE // len(SAMPLE_SENTENCE) + 1)
+    # 서로 다른 본문이 되도록 번호를 붙임
+    return [f"{i} {base[:CHUNK_SIZE]}" for i in range(count)]
+
+
+def measure(embeddings, texts, batch_size: int) -> float:
+    embeddings.embed_documents(texts[:batch_size])
+    started = time.perf_counter()
+    for start in range(0, len(texts), batch_size):
+        embeddings.embed_documents(texts[start:start + batch_size])
+    return len(texts) / (time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingestion embedding throughput (chunks/s)")
+    parser.add_argument("--texts", default="")
+    parser.add_argument("--chunks", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=32, help="워커당 배치 크기")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    chunk_texts = load_texts(args.texts, args.chunks)
+    runs = []
+    for n in args.workers:
+        if n == 1:
+            model = load_embedding_model(EMBEDDING_MODEL, DEVICE_TYPE)
+            rate = measure(model, chunk_texts, args.batch_size)
+        else:
+            model = ShardedEmbeddings(EMBEDDING_MODEL, DEVICE_TYPE, workers=n)
+            rate = measure(model, chunk_texts, args.batch_size * n)
+            model.close()
+        runs.append({"workers": n, "chunks_per_sec": round(rate, 2)})
+
+    baseline = runs[0]["chunks_per_sec"] or 1.0
+    for run in runs:
+        run["speedup"] = round(run["chunks_per_sec"] / baseline, 2)
+    print(json.dumps({"chunks": len(chunk_texts), "model": EMBEDDING_MODEL, "runs": runs}, indent=2))
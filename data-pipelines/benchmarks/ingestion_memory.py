@@ -0,0 +1,98 @@
+"""
+인제스천 최대 메모리(RSS) 벤치마크
+
+로컬 디렉터리의 PDF들로 파티셔닝 -> 청킹 -> 임베딩 -> 저장(메모리 내 Chroma)을 수행하면서
+본 프로세스의 최대 RSS를 측정합니다. 설정마다 새 프로세스에서 실행하므로 값이 서로 섞이지 않습니다.
+
+    --mode materialized : 모든 파일의 청크를 리스트로 모은 뒤 한 번에 임베딩/저장 (기존 방식)
+    --mode streaming    : 파일 단위로 청킹 후 INGESTION_BATCH_SIZE 배치로 임베딩/upsert (현재 방식)
+
+실행 (data-pipelines 디렉터리에서):
+    python -m benchmarks.ingestion_memory --pdf-dir ./sample_pdfs --mode materialized streaming --batch-size 16 64 256
+"""
+import os
+import shutil
+import json
+import time
+import argparse
+import multiprocessing as mp
+
+import chromadb
+from langchain_community.vectorstores.utils import filter_complex_metadata
+
+import injest_pdfs
+from partitioning import partition_in_pool, default_partition_cache
+from embedding_cache import ChunkEncoder
+
+
+def _run_once(pdf_dir: str, mode: str, batch_size: int, out: "mp.Queue") -> None:
+    def fetch(key: str, out) -> None:
+        with open(os.path.join(pdf_dir, key), "rb") as f:
+            shutil.copyfileobj(f, out)
+
+    keys = sorted(name for name in os.listdir(pdf_dir) if name.lower().endswith(".pdf"))
+    client = chromadb.EphemeralClient()
+    embeddings = injest_pdfs.load_embedding_model(injest_pdfs.EMBEDDING_MODEL, injest_pdfs.DEVICE_TYPE)
+    baseline = injest_pdfs.peak_rss_mb()
+    # 캐시 없이 매번 인코딩하여 인코더 메모리까지 측정
+    encoder = ChunkEncoder(embeddings, cache=None, batch_size=batch_size)
+    writer = injest_pdfs.ChromaWriter(client, encoder, "benchmark", full_rebuild=True, batch_size=batch_size)
+
+    started = time.perf_counter()
+    if mode == "materialized":
+        all_elements = []
+        for result in partition_in_pool(keys, fetch, cache=default_partition_cache()):
+            all_elements.extend(result.elements)
+        splits, chunk_ids = injest_pdfs.build_chunks(all_elements)
+        filtered_splits = filter_complex_metadata(splits)
+        writer.batch_size = encoder.batch_size = max(1, len(filtered_splits))
+        for source, (docs, ids) in _group(filtered_splits, chunk_ids).items():
+            writer.write_source(source, docs, ids, [])
+    else:
+        for result in partition_in_pool(keys, fetch, cache=default_partition_cache()):
+            splits, chunk_ids = injest_pdfs.build_chunks(result.elements)
+            result.elements = []
+            writer.write_source(result.key, filter_complex_metadata(splits), chunk_ids, [])
+    writer.finish()
+
+    out.put({
+        "mode": mode,
+        "batch_size": writer.batch_size if mode == "streaming" else "all",
+        "chunks": writer.chunks_written,
+        "seconds": round(time.perf_counter() - started, 2),
+        "rss_after_model_mb": round(baseline, 1),
+        "peak_rss_mb": round(injest_pdfs.peak_rss_mb(), 1),
+    })
+
+
+def _group(documents, ids):
+    by_source = {}
+    for doc, chunk_key in zip(documents, ids):
+        docs, keys = by_source.setdefault(doc.metadata.get("source", "unknown_file"), ([], []))
+        docs.append(doc)
+        keys.append(chunk_key)
+    return by_source
+
+
+def measure(pdf_dir: str, mode: str, batch_size: int) -> dict:
+    ctx = mp.get_context("spawn")
+    out = ctx.Queue()
+    proc = ctx.Process(target=_run_once, args=(pdf_dir, mode, batch_size, out))
+    proc.start()
+    report = out.get()
+    proc.join()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Peak RSS of materialized vs streaming ingestion")
+    parser.add_argument("--pdf-dir", required=True)
+    parser.add_argument("--mode", nargs="+", choices=["materialized", "streaming"], default=["materialized", "streaming"])
+    parser.add_argument("--batch-size", type=int, nargs="+", default=[64])
+    args = parser.parse_args()
+
+    runs = []
+    for run_mode in args.mode:
+        sizes = args.batch_size if run_mode == "streaming" else [0]
+        runs.extend(measure(args.pdf_dir, run_mode, size) for size in sizes)
+    print(json.dumps({"pdf_dir": args.pdf_dir, "runs": runs}, indent=2))
@@ -0,0 +1,59 @@
+"""
+PDF 파티셔닝 처리량 벤치마크
+
+로컬 디렉터리의 PDF들을 인제스천과 같은 프로세스 풀(partitioning.partition_in_pool)로 파티셔닝하면서
+워커 수별 처리량(pages/s), 소요 시간, 실패 수를 측정합니다.
+
+실행 (data-pipelines 디렉터리에서):
+    python -m benchmarks.partition_throughput --pdf-dir ./sample_pdfs --workers 1 2 4
+"""
+import os
+import shutil
+import json
+import time
+import argparse
+
+from partitioning import partition_in_pool, PARTITION_TIMEOUT_SECONDS
+
+
+def run(pdf_dir: str, keys, workers: int, timeout: float) -> dict:
+    def fetch(key: str, out) -> None:
+        with open(os.path.join(pdf_dir, key), "rb") as f:
+            shutil.copyfileobj(f, out)
+
+    pages = files = failed = 0
+    started = time.perf_counter()
+    for result in partition_in_pool(keys, fetch, workers=workers, timeout=timeout):
+        if result.error:
+            failed += 1
+        else:
+            files += 1
+            pages += result.pages
+    elapsed = time.perf_counter() - started
+    return {
+        "workers": workers,
+        "files": files,
+        "failed": failed,
+        "pages": pages,
+        "seconds": round(elapsed, 2),
+        "pages_per_sec": round(pages / elapsed, 3) if elapsed else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="PDF partitioning throughput by worker count")
+    parser.add_argument("--pdf-dir", required=True)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--limit", type=int, default=0, help="사용할 PDF 수 (0이면 전체)")
+    parser.add_argument("--timeout", type=float, default=PARTITION_TIMEOUT_SECONDS)
+    args = parser.parse_args()
+
+    pdf_keys = sorted(name for name in os.listdir(args.pdf_dir) if name.lower().endswith(".pdf"))
+    if args.limit:
+        pdf_keys = pdf_keys[:args.limit]
+
+    reports = [run(args.pdf_dir, pdf_keys, n, args.timeout) for n in args.workers]
+    baseline = reports[0]["pages_per_sec"] or 1.0
+    for report in reports:
+        report["speedup"] = round(report["pages_per_sec"] / baseline, 2)
+    print(json.dumps({"pdfs": len(pdf_keys), "runs": reports}, indent=2))
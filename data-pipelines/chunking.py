@@ -0,0 +1,43 @@
+import hashlib
+from typing import Dict, List, Tuple
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+
+def split_pages(page_docs: List[Document], chunk_size: int, chunk_overlap: int) -> Tuple[List[Document], List[str]]:
+    """
+    페이지 문서를 청크로 분할하고 (청크 목록, Chroma ID 목록)을 반환합니다.
+    문맥 확장을 위해 청크에 파일 내 순서(chunk_id)를, Chroma ID에는 내용 해시를 부여합니다.
+    (인제스천과 agent-crew 벤치마크 픽스처가 같은 분할/ID 규칙을 쓰도록 의존성이 가벼운 별도 모듈로 둠)
+    """
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap
+    )
+    splits = text_splitter.split_documents(page_docs)
+
+    chunk_ids = []
+    positions = {}
+    occurrences = {}
+    for doc in splits:
+        source_file = doc.metadata.get("source", "unknown_file")
+        position = positions.get(source_file, 0)
+        positions[source_file] = position + 1
+        doc.metadata["chunk_id"] = position
+        chunk_ids.append(chunk_content_id(source_file, doc, occurrences))
+    return splits, chunk_ids
+
+
+def chunk_content_id(source_file: str, doc: Document, occurrences: Dict[str, int]) -> str:
+    """
+    청크의 Chroma ID: 파일명 + (페이지 번호, 본문) 해시 + 같은 내용의 파일 내 출현 순번.
+    위치(chunk_id)와 무관하므로 앞쪽 청크가 추가/삭제되어도 내용이 같은 청크의 ID는 바뀌지 않습니다.
+    """
+    digest = hashlib.sha256(
+        f"{doc.metadata.get('page_number')}\x00{doc.page_content}".encode("utf-8")
+    ).hexdigest()[:16]
+    base = f"{source_file}_chunk_{digest}"
+    seen = occurrences.get(base, 0)
+    occurrences[base] = seen + 1
+    return base if seen == 0 else f"{base}_{seen}"
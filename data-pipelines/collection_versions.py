@@ -0,0 +1,196 @@
+import os
+import json
+import time
+import logging
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from snapshot_export import iter_collection_batches
+
+# 교체된 이전 세대 컬렉션을 지우기 전까지의 유예 시간 (에이전트의 버전 확인 주기 KB_VERSION_TTL_SECONDS보다 충분히 길게)
+COLLECTION_GC_GRACE_SECONDS = float(os.getenv("COLLECTION_GC_GRACE_SECONDS", 3600))
+# 전체 재구축 결과를 활성화하기 전에 실행할 스모크 질의 (JSONL: {"query", "source_file"}, 빈 값이면 자체 검사만)
+SMOKE_QUERIES_PATH = os.getenv("SMOKE_QUERIES_PATH", "")
+SMOKE_SAMPLE_CHUNKS = int(os.getenv("SMOKE_SAMPLE_CHUNKS", 20))
+SMOKE_TOP_K = 3
+# 새 세대의 원본 파일 수가 활성 세대보다 이 비율 넘게 줄면 교체하지 않음 (목록 조회 이상 등)
+SMOKE_MAX_SOURCE_SHRINK = float(os.getenv("SMOKE_MAX_SOURCE_SHRINK", 0.2))
+# 파티셔닝 실패/시간 초과로 빠진 파일을 이 비율(최소 1개)까지는 허용하고 경고만 남김 (다음 증분 실행에서 재시도)
+SMOKE_MAX_FAILED_FRACTION = float(os.getenv("SMOKE_MAX_FAILED_FRACTION", 0.05))
+
+# 레지스트리 컬렉션 메타데이터(포인터)에서 JSON 문자열로 저장하는 필드
+_JSON_FIELDS = ("routing_map", "retired")
+
+
+def generation_name(registry: str, generation: str) -> str:
+    """전체 재구축 한 번(세대)에 속하는 컬렉션 이름의 접두어. single 레이아웃에서는 이 이름이 곧 데이터 컬렉션입니다."""
+    return f"{registry}__g{generation}"
+
+
+def read_pointer(client, registry: str) -> Dict:
+    """
+    레지스트리 컬렉션 메타데이터(에이전트가 따르는 포인터)를 읽습니다. 레지스트리가 없으면 빈 dict.
+
+    {"ingestion_version", "layout", "generation",
+     "active_collection": single 레이아웃의 데이터 컬렉션 (없으면 레지스트리 자체, 이전 형식),
+     "routing_map": {source: 파티션 컬렉션} (per_source), "retired": {컬렉션 이름: 교체된 시각(epoch)}}
+    """
+    try:
+        meta = dict(client.get_collection(name=registry).metadata or {})
+    except Exception:
+        return {}
+    for field in _JSON_FIELDS:
+        meta[field] = json.loads(meta.get(field) or "{}")
+    return meta
+
+
+def publish_pointer(client, registry: str, pointer: Dict) -> None:
+    """포인터를 레지스트리 메타데이터 한 번의 갱신으로 교체합니다. 에이전트는 다음 버전 확인 시 새 컬렉션을 따릅니다."""
+    metadata = {
+        key: json.dumps(value, ensure_ascii=False) if key in _JSON_FIELDS else value
+        for key, value in pointer.items() if value is not None
+    }
+    client.get_or_create_collection(name=registry).modify(metadata=metadata)
+    logging.info(
+        f"Pointer '{registry}' -> version {pointer.get('ingestion_version')} "
+        f"(generation {pointer.get('generation')}, {len(pointer.get('retired') or {})} retired collections pending GC)"
+    )
+
+
+def collection_count(client, name: str) -> int:
+    try:
+        return client.get_collection(name=name).count()
+    except Exception:
+        return 0
+
+
+def _purge_records(collection) -> int:
+    """레지스트리에 남은 이전 형식의 청크를 지웁니다. (레지스트리 컬렉션 자체는 포인터라서 삭제하지 않음)"""
+    removed = 0
+    while True:
+        batch = next(iter_collection_batches(collection, []), None)
+        if not batch:
+            return removed
+        collection.delete(ids=batch["ids"])
+        removed += len(batch["ids"])
+
+
+def collect_garbage(client, registry: str, active: Set[str], retired: Dict[str, float],
+                    grace_seconds: float = COLLECTION_GC_GRACE_SECONDS) -> Dict[str, float]:
+    """
+    활성 컬렉션이 아닌 '<registry>__*' 컬렉션(교체된 세대, 삭제된 파일의 파티션, 중단된 실행의 잔여물)에
+    교체 시각을 기록하고, 유예 시간이 지난 것만 삭제합니다. 갱신된 retired 맵을 반환합니다.
+    """
+    now = time.time()
+    retired = {name: stamp for name, stamp in retired.items() if name not in active}
+    existing = set()
+    for coll in client.list_collections():
+        name = coll if isinstance(coll, str) else coll.name
+        if name.startswith(f"{registry}__") and name not in active:
+            existing.add(name)
+            retired.setdefault(name, now)
+    # 이전 형식(single 레이아웃에서 레지스트리에 직접 청크 저장)에서 전환된 경우 남은 청크도 같은 유예 후 정리
+    if registry not in active and collection_count(client, registry) > 0:
+        existing.add(registry)
+        retired.setdefault(registry, now)
+
+    remaining: Dict[str, float] = {}
+    for name, stamp in retired.items():
+        if name not in existing:
+            continue
+        if now - stamp < grace_seconds:
+            remaining[name] = stamp
+            continue
+        if name == registry:
+            logging.info(f"Purged {_purge_records(client.get_collection(name=registry))} legacy chunks from '{registry}'")
+        else:
+            logging.info(f"Deleting retired collection '{name}' (retired {int(now - stamp)}s ago)")
+            client.delete_collection(name=name)
+    return remaining
+
+
+def expire_retired(client, registry: str, grace_seconds: float = COLLECTION_GC_GRACE_SECONDS) -> None:
+    """인제스천할 변경이 없는 실행에서도 유예 시간이 지난 이전 세대를 정리합니다."""
+    pointer = read_pointer(client, registry)
+    if not pointer.get("retired"):
+        return
+    if pointer.get("layout") == "per_source":
+        active = set(pointer["routing_map"].values())
+    else:
+        active = {pointer.get("active_collection") or registry}
+    remaining = collect_garbage(client, registry, active, pointer["retired"], grace_seconds)
+    if remaining != pointer["retired"]:
+        publish_pointer(client, registry, {**pointer, "retired": remaining})
+
+
+def load_smoke_queries(path: str = SMOKE_QUERIES_PATH) -> List[Dict]:
+    if not path:
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def run_smoke_checks(
+    collections: List,
+    locate: Callable[[str], Tuple[Optional[object], Optional[Dict]]],
+    expected_chunks: int,
+    embed_query: Optional[Callable[[str], List[float]]] = None,
+    queries: Optional[List[Dict]] = None,
+    missing_sources: Optional[List[str]] = None,
+    source_count: int = 0,
+    previous_source_count: int = 0,
+) -> List[str]:
+    """
+    새 세대 컬렉션을 활성화해도 되는지 검사하고 실패 사유 목록을 반환합니다. (빈 목록이면 통과)
+    1. 저장된 청크 수가 기록한 청크 수와 같고 0보다 큼
+    2. 표본 청크를 자신의 임베딩으로 검색하면 상위 SMOKE_TOP_K 안에 자기 자신이 나옴 (색인 일관성)
+    3. 스모크 질의(SMOKE_QUERIES_PATH)마다 대상 파일에서 결과가 1건 이상 나옴
+    4. 버킷에 있는데 기록되지 않은 파일(missing_sources: 파티셔닝 실패/시간 초과)이 목록의
+       SMOKE_MAX_FAILED_FRACTION(최소 1개) 이하 (손상된 PDF 하나가 전체 재구축을 막지 않도록, 허용 범위면 경고만)
+    5. 원본 파일 수가 활성 세대(previous_source_count)보다 SMOKE_MAX_SOURCE_SHRINK 넘게 줄지 않음
+    """
+    failures = []
+    if missing_sources:
+        listed = source_count + len(missing_sources)
+        allowed = max(1, int(listed * SMOKE_MAX_FAILED_FRACTION))
+        summary = f"{len(missing_sources)}/{listed} listed files missing from the new generation: {sorted(missing_sources)[:10]}"
+        if len(missing_sources) > allowed:
+            failures.append(f"{summary} (allowed {allowed})")
+        else:
+            logging.warning(f"Smoke checks: {summary}. They will be retried by the next incremental run.")
+    if previous_source_count and source_count < previous_source_count * (1 - SMOKE_MAX_SOURCE_SHRINK):
+        failures.append(f"{source_count} files in the new generation, {previous_source_count} in the active one")
+    stored = sum(collection.count() for collection in collections)
+    if stored == 0 or stored != expected_chunks:
+        failures.append(f"stored {stored} chunks, expected {expected_chunks}")
+
+    per_collection = max(1, SMOKE_SAMPLE_CHUNKS // max(1, len(collections)))
+    for collection in collections[:SMOKE_SAMPLE_CHUNKS]:
+        sample = collection.get(limit=per_collection, include=["embeddings"])
+        if not sample["ids"]:
+            continue
+        result = collection.query(
+            query_embeddings=list(sample["embeddings"]), n_results=SMOKE_TOP_K, include=["distances"]
+        )
+        # 본문이 같은 청크가 여럿이면 자기 자신 대신 동일 벡터가 먼저 나올 수 있으므로 거리 0도 적중으로 인정
+        missed = [
+            chunk_id for chunk_id, found, distances in zip(sample["ids"], result["ids"], result["distances"])
+            if chunk_id not in found and not (distances and distances[0] <= 1e-6)
+        ]
+        if missed:
+            failures.append(f"'{collection.name}': {len(missed)}/{len(sample['ids'])} sample chunks not retrievable")
+
+    queries = load_smoke_queries() if queries is None else queries
+    if queries and embed_query is None:
+        logging.warning("Smoke queries configured but no query embedder available; skipping them")
+        queries = []
+    for item in queries:
+        collection, where = locate(item["source_file"])
+        if collection is None:
+            failures.append(f"query '{item['query']}': source '{item['source_file']}' missing")
+            continue
+        found = collection.query(
+            query_embeddings=[embed_query(item["query"])], n_results=SMOKE_TOP_K, where=where, include=["distances"]
+        )["ids"][0]
+        if not found:
+            failures.append(f"query '{item['query']}': no results in '{item['source_file']}'")
+    return failures
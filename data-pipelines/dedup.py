@@ -0,0 +1,258 @@
+import os
+import re
+import gzip
+import json
+import hashlib
+import logging
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+# 파일 간 중복 청크 제거 (single 레이아웃 전용). 공백을 정규화한 본문이 완전히 같은 청크만 한 벡터로 합침
+# 연도별 규정집처럼 숫자 하나만 다른 청크(예: 전공 72학점 / 60학점)는 합치지 않음
+CHUNK_DEDUP = os.getenv("CHUNK_DEDUP", "false").lower() == "true"
+
+INDEX_FORMAT = 2
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def ref_key(source: str) -> str:
+    """
+    대표 청크 메타데이터에서 source의 청크 위치를 담는 키. (where 필터로 source의 참조 청크를 찾는 데 사용)
+    에이전트 측 utils/vector_backends.source_ref_key 와 같은 규칙이어야 합니다.
+    """
+    return f"ref__{hashlib.sha1(source.encode('utf-8')).hexdigest()[:16]}"
+
+
+def normalized_digest(text: str) -> str:
+    """공백(줄바꿈/연속 공백)만 정규화한 본문의 해시. 이 값이 같은 청크만 합칩니다."""
+    return hashlib.sha256(_WHITESPACE.sub(" ", text).strip().encode("utf-8")).hexdigest()
+
+
+class DedupIndex:
+    """
+    저장된 대표 청크의 정규화 본문 해시와 참조(같은 본문을 가진 다른 파일의 청크 위치)를 관리하는 색인.
+
+    {
+      "format": 2, "version": <ingestion_version>,
+      "chunks": {"<대표 청크 ID>": {"source": 소유 파일, "digest": 정규화 본문 해시, "raw": 저장된 원문 해시,
+                                   "refs": {"<참조 파일>": [chunk_id, page_number, 원문(저장된 원문과 다를 때만)]}}}
+    }
+
+    대표 청크 하나만 임베딩/저장하고, 참조 파일은 대표 청크 메타데이터의 ref__<파일 해시> 키(위치)와
+    dup_refs(JSON 문자열, 전체 참조 목록)로 연결됩니다. 공백만 다른 참조는 자기 원문을 참조 항목에 보관하여
+    검색 결과로 그 원문을 돌려줍니다. 대표 청크의 소유 파일이 바뀌거나 삭제되어 더 이상 그 내용을 갖지 않으면,
+    참조 파일 중 하나가 소유권을 넘겨받아 벡터를 다시 계산하지 않고 유지합니다.
+    """
+
+    def __init__(self, path: str, data: Optional[Dict] = None):
+        self.path = path
+        data = data or {}
+        self.version: str = data.get("version", "")
+        self.chunks: Dict[str, Dict] = {}
+        self._by_digest: Dict[str, Set[str]] = {}
+        self._owned_by: Dict[str, Set[str]] = {}
+        self._referenced_by: Dict[str, Set[str]] = {}
+        self._dirty: Dict[str, Dict] = {}
+        self._documents: Dict[str, str] = {}
+        self.collapsed = 0
+        for chunk_id, entry in data.get("chunks", {}).items():
+            self._insert(chunk_id, entry["source"], entry["digest"], entry["raw"], entry.get("refs", {}))
+
+    @staticmethod
+    def settings() -> Dict:
+        return {"match": "normalized_text"}
+
+    @classmethod
+    def load(cls, path: str) -> "DedupIndex":
+        if not os.path.exists(path):
+            return cls(path)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("format") != INDEX_FORMAT:
+                logging.warning(f"Unsupported dedup index format {data.get('format')}, ignoring '{path}'")
+                return cls(path)
+            return cls(path, data=data)
+        except Exception as e:
+            logging.warning(f"Failed to read dedup index '{path}', ignoring: {e}")
+            return cls(path)
+
+    def save(self, version: str) -> None:
+        self.version = version
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump({"format": INDEX_FORMAT, "version": version, "chunks": self.chunks},
+                      f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+
+    # --- 색인 조작 ---
+
+    def _insert(self, chunk_id: str, source: str, digest: str, raw: str, refs: Dict) -> None:
+        self.chunks[chunk_id] = {"source": source, "digest": digest, "raw": raw, "refs": dict(refs)}
+        self._by_digest.setdefault(digest, set()).add(chunk_id)
+        self._owned_by.setdefault(source, set()).add(chunk_id)
+        for ref_source in refs:
+            self._referenced_by.setdefault(ref_source, set()).add(chunk_id)
+
+    def _remove(self, chunk_id: str) -> None:
+        entry = self.chunks.pop(chunk_id)
+        self._by_digest.get(entry["digest"], set()).discard(chunk_id)
+        self._owned_by.get(entry["source"], set()).discard(chunk_id)
+        self._dirty.pop(chunk_id, None)
+        self._documents.pop(chunk_id, None)
+
+    def _find(self, digest: str, source: str) -> Optional[str]:
+        """source가 아닌 파일이 소유하고, 아직 source가 참조하지 않은 같은 본문의 대표 청크"""
+        for chunk_id in sorted(self._by_digest.get(digest, ())):
+            entry = self.chunks[chunk_id]
+            if entry["source"] != source and source not in entry["refs"]:
+                return chunk_id
+        return None
+
+    def _release(self, source: str) -> None:
+        """source가 다른 파일의 대표 청크에 걸어 둔 참조를 모두 해제합니다."""
+        for chunk_id in self._referenced_by.pop(source, set()):
+            if chunk_id in self.chunks:
+                self.chunks[chunk_id]["refs"].pop(source, None)
+                # Chroma update에서 None 값은 해당 메타데이터 키 삭제
+                self._dirty.setdefault(chunk_id, {})[ref_key(source)] = None
+
+    def _disown(self, chunk_id: str) -> bool:
+        """
+        소유 파일에서 사라진 대표 청크를 첫 번째 참조 파일에 넘깁니다. 참조가 없으면 색인에서 지우고 False.
+        넘겨받는 파일의 원문이 저장된 원문과 다르면(공백 차이) 저장 본문도 그 원문으로 바꿉니다.
+        """
+        entry = self.chunks[chunk_id]
+        if not entry["refs"]:
+            self._remove(chunk_id)
+            return False
+        heir = sorted(entry["refs"])[0]
+        position, page, text = (entry["refs"].pop(heir) + [None])[:3]
+        self._owned_by[entry["source"]].discard(chunk_id)
+        self._referenced_by.get(heir, set()).discard(chunk_id)
+        entry["source"] = heir
+        self._owned_by.setdefault(heir, set()).add(chunk_id)
+        self._dirty.setdefault(chunk_id, {}).update(
+            {"source": heir, "chunk_id": position, "page_number": page, ref_key(heir): None}
+        )
+        if text is not None:
+            entry["raw"] = _raw_digest(text)
+            self._documents[chunk_id] = text
+            # 다른 참조의 원문 보관 여부는 새 저장 원문 기준으로 다시 판단
+            for ref in entry["refs"].values():
+                if len(ref) > 2 and _raw_digest(ref[2]) == entry["raw"]:
+                    del ref[2:]
+        return True
+
+    # --- 파이프라인 단계 ---
+
+    def assign(self, source: str, documents: List, ids: List[str], old_ids: List[str]
+               ) -> Tuple[List, List[str], List[str], List[Optional[str]]]:
+        """
+        한 파일의 청크를 대표 청크(저장 대상)와 기존 대표 청크의 참조로 나눕니다.
+        반환: (저장할 문서, 저장할 ID, 위치별 ID(참조 위치는 대표 청크 ID, 매니페스트 기록용),
+               차이 비교용 직전 ID(이 파일이 소유하지 않았거나 다른 파일로 넘어간 ID는 None))
+        """
+        previously_owned = set(self._owned_by.get(source, set()))
+        self._release(source)
+
+        owned_docs, owned_ids, positional_ids = [], [], []
+        for doc, chunk_id in zip(documents, ids):
+            if chunk_id in previously_owned:
+                owned_docs.append(doc)
+                owned_ids.append(chunk_id)
+                positional_ids.append(chunk_id)
+                continue
+            digest = normalized_digest(doc.page_content)
+            canonical = self._find(digest, source)
+            if canonical is None:
+                self._insert(chunk_id, source, digest, _raw_digest(doc.page_content), {})
+                owned_docs.append(doc)
+                owned_ids.append(chunk_id)
+                positional_ids.append(chunk_id)
+                continue
+            position = doc.metadata.get("chunk_id")
+            ref = [position, doc.metadata.get("page_number")]
+            if _raw_digest(doc.page_content) != self.chunks[canonical]["raw"]:
+                ref.append(doc.page_content)
+            self.chunks[canonical]["refs"][source] = ref
+            self._referenced_by.setdefault(source, set()).add(canonical)
+            self._dirty.setdefault(canonical, {})[ref_key(source)] = position
+            positional_ids.append(canonical)
+            self.collapsed += 1
+
+        kept = set(owned_ids)
+        diff_old_ids: List[Optional[str]] = []
+        for chunk_id in old_ids:
+            if chunk_id not in previously_owned:
+                diff_old_ids.append(None)
+            elif chunk_id in kept or not self._disown(chunk_id):
+                diff_old_ids.append(chunk_id)
+            else:
+                diff_old_ids.append(None)
+        return owned_docs, owned_ids, positional_ids, diff_old_ids
+
+    def drop_source(self, source: str) -> List[str]:
+        """삭제된 파일의 참조를 해제하고, 소유 청크 중 넘겨받을 파일이 없는 것(삭제 대상)의 ID를 반환합니다."""
+        self._release(source)
+        return [chunk_id for chunk_id in sorted(self._owned_by.get(source, set())) if not self._disown(chunk_id)]
+
+    def take_updates(self) -> Tuple[Dict[str, Dict], Dict[str, str]]:
+        """
+        직전 호출 이후 바뀐 대표 청크들의 (메타데이터 변경분, 저장 본문 변경분). Chroma update용이며,
+        본문 변경은 소유권을 넘겨받은 파일의 원문이 공백만 다른 경우에만 생깁니다.
+        """
+        updates = {}
+        for chunk_id, changes in self._dirty.items():
+            if chunk_id in self.chunks:
+                refs = self.chunks[chunk_id]["refs"]
+                updates[chunk_id] = {**changes, "dup_refs": json.dumps(refs, ensure_ascii=False) if refs else None}
+        documents = {chunk_id: text for chunk_id, text in self._documents.items() if chunk_id in self.chunks}
+        for chunk_id in documents:
+            # 참조 원문 보관 여부가 바뀌었을 수 있으므로 dup_refs도 함께 갱신
+            refs = self.chunks[chunk_id]["refs"]
+            updates.setdefault(chunk_id, {})["dup_refs"] = json.dumps(refs, ensure_ascii=False) if refs else None
+        self._dirty = {}
+        self._documents = {}
+        return updates, documents
+
+    def stats(self) -> Dict[str, int]:
+        references = sum(len(entry["refs"]) for entry in self.chunks.values())
+        return {
+            "stored_chunks": len(self.chunks),
+            "logical_chunks": len(self.chunks) + references,
+            "collapsed_this_run": self.collapsed,
+        }
+
+
+def _raw_digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def reference_sources(meta: Optional[Dict]) -> Dict[str, List]:
+    """대표 청크 메타데이터의 dup_refs -> {참조 파일: [chunk_id, page_number(, 원문)]}"""
+    return json.loads((meta or {}).get("dup_refs") or "{}")
+
+
+def localize(meta: Dict, text: str, source: str) -> Tuple[Dict, str]:
+    """
+    대표 청크를 참조 파일 기준으로 바꾼 (메타데이터 사본, 본문). 위치(source, chunk_id, page_number)와
+    참조 파일 자신의 원문을 쓰고, 소유 파일은 dup_of에 남깁니다. (에이전트 측 utils/vector_backends._localize 와 같은 규칙)
+    """
+    if meta.get("source") == source:
+        return meta, text
+    ref = reference_sources(meta)[source]
+    localized = {**meta, "source": source, "chunk_id": ref[0], "page_number": ref[1], "dup_of": meta.get("source")}
+    return localized, ref[2] if len(ref) > 2 else text
+
+
+def expand_references(records: Iterable[Tuple]) -> Iterator[Tuple]:
+    """
+    (ID, 본문, 메타데이터) 레코드를 참조 파일마다 한 번 더 내보냅니다. (파일별 어휘 색인에서 참조 청크도 검색되도록)
+    """
+    for chunk_id, text, meta in records:
+        yield chunk_id, text, meta
+        for source in reference_sources(meta):
+            localized, own_text = localize(meta, text, source)
+            yield chunk_id, own_text, localized
@@ -0,0 +1,152 @@
+import os
+import json
+import hashlib
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# 청크 임베딩 캐시 위치 (빈 문자열이면 사용 안 함) / 인코더 호출 배치 크기
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "./embedding_cache")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 32))
+
+CACHE_FORMAT = 1
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ChunkEmbeddingCache:
+    """
+    청크 본문 해시 -> 임베딩 벡터 캐시 (인제스천 전용, 단일 프로세스에서 사용).
+
+    root/<모델 이름 해시>/
+        meta.json    : 형식 버전, 모델 이름, 차원
+        vectors.f32  : float32 행렬을 행 단위로 이어 붙인 추가 전용(append-only) 파일
+        index.txt    : 행 순서대로의 본문 SHA-256 (한 줄에 하나)
+
+    벡터를 먼저 기록한 뒤 해시를 기록하며, 열 때 두 파일의 행 수가 다르면(중단된 기록) 짧은 쪽에 맞춰 잘라냅니다.
+    """
+
+    def __init__(self, root: str, model_name: str):
+        self.model_name = model_name
+        self.directory = os.path.join(root, hashlib.sha1(model_name.encode("utf-8")).hexdigest()[:16])
+        self._vectors_path = os.path.join(self.directory, "vectors.f32")
+        self._index_path = os.path.join(self.directory, "index.txt")
+        self._meta_path = os.path.join(self.directory, "meta.json")
+        self.dim = 0
+        self._rows: Dict[str, int] = {}
+        self._mmap: Optional[np.memmap] = None
+        self.hits = 0
+        self.misses = 0
+        self._open()
+
+    def _open(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        if not os.path.exists(self._meta_path):
+            return
+        with open(self._meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format") != CACHE_FORMAT or meta.get("model") != self.model_name:
+            logging.warning(f"Embedding cache at '{self.directory}' does not match, discarding it")
+            for path in (self._vectors_path, self._index_path, self._meta_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            return
+        self.dim = meta["dim"]
+
+        hashes = []
+        if os.path.exists(self._index_path):
+            with open(self._index_path, encoding="utf-8") as f:
+                hashes = [line.strip() for line in f if line.strip()]
+        row_bytes = self.dim * 4
+        n_vectors = os.path.getsize(self._vectors_path) // row_bytes if os.path.exists(self._vectors_path) else 0
+        rows = min(len(hashes), n_vectors)
+        if rows != len(hashes) or rows != n_vectors or (n_vectors and os.path.getsize(self._vectors_path) % row_bytes):
+            logging.warning(f"Embedding cache was not closed cleanly, truncating to {rows} rows")
+            if os.path.exists(self._vectors_path):
+                with open(self._vectors_path, "r+b") as f:
+                    f.truncate(rows * row_bytes)
+            with open(self._index_path, "w", encoding="utf-8") as f:
+                f.writelines(h + "\n" for h in hashes[:rows])
+        self._rows = {h: i for i, h in enumerate(hashes[:rows])}
+        logging.info(f"Embedding cache opened: {rows} vectors (dim {self.dim}, model {self.model_name})")
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _matrix(self) -> np.memmap:
+        if self._mmap is None or self._mmap.shape[0] < len(self._rows):
+            self._mmap = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(len(self._rows), self.dim))
+        return self._mmap
+
+    def get_many(self, hashes: List[str]) -> List[Optional[np.ndarray]]:
+        found = [self._rows.get(h) for h in hashes]
+        hit_rows = [row for row in found if row is not None]
+        self.hits += len(hit_rows)
+        self.misses += len(found) - len(hit_rows)
+        if not hit_rows:
+            return [None] * len(hashes)
+        matrix = self._matrix()
+        return [np.array(matrix[row]) if row is not None else None for row in found]
+
+    def add_many(self, hashes: List[str], vectors: np.ndarray) -> None:
+        new = [(h, v) for h, v in zip(hashes, vectors) if h not in self._rows]
+        if not new:
+            return
+        if not self.dim:
+            self.dim = int(vectors.shape[1])
+            with open(self._meta_path, "w", encoding="utf-8") as f:
+                json.dump({"format": CACHE_FORMAT, "model": self.model_name, "dim": self.dim}, f)
+        with open(self._vectors_path, "ab") as f:
+            f.write(np.asarray([v for _, v in new], dtype=np.float32).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        with open(self._index_path, "a", encoding="utf-8") as f:
+            f.writelines(h + "\n" for h, _ in new)
+        for h, _ in new:
+            self._rows[h] = len(self._rows)
+
+
+class ChunkEncoder:
+    """
+    청크 본문을 임베딩합니다. 캐시에 있는 본문은 재사용하고, 처음 보는 본문만 batch_size 단위로 인코딩하여 캐시에 추가합니다.
+    """
+
+    def __init__(self, embeddings, cache: Optional[ChunkEmbeddingCache] = None, batch_size: int = EMBEDDING_BATCH_SIZE):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.batch_size = batch_size
+        self.encoded = 0
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        hashes = [text_hash(text) for text in texts]
+        cached = self.cache.get_many(hashes) if self.cache is not None else [None] * len(texts)
+
+        # 같은 배치 안의 중복 본문은 한 번만 인코딩
+        missing: Dict[str, int] = {}
+        for i, vector in enumerate(cached):
+            if vector is None and hashes[i] not in missing:
+                missing[hashes[i]] = i
+        computed: Dict[str, np.ndarray] = {}
+        pending = list(missing.items())
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start:start + self.batch_size]
+            vectors = np.asarray(self.embeddings.embed_documents([texts[i] for _, i in batch]), dtype=np.float32)
+            self.encoded += len(batch)
+            if self.cache is not None:
+                self.cache.add_many([h for h, _ in batch], vectors)
+            computed.update((h, v) for (h, _), v in zip(batch, vectors))
+
+        return np.stack([vector if vector is not None else computed[h] for vector, h in zip(cached, hashes)])
+
+    def stats(self) -> Dict[str, object]:
+        report: Dict[str, object] = {"encoded": self.encoded}
+        if self.cache is not None:
+            report.update({"cache_hits": self.cache.hits, "cache_misses": self.cache.misses, "cache_size": len(self.cache)})
+        return report
+
+
+def default_chunk_cache(model_name: str) -> Optional[ChunkEmbeddingCache]:
+    return ChunkEmbeddingCache(EMBEDDING_CACHE_DIR, model_name) if EMBEDDING_CACHE_DIR else None
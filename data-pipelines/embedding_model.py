@@ -0,0 +1,23 @@
+import logging
+from langchain_huggingface import HuggingFaceEmbeddings
+
+
+def load_embedding_model(model_name: str, device: str) -> HuggingFaceEmbeddings:
+    """
+    지정된 HuggingFace 임베딩 모델을 메모리에 로드합니다.
+    (인제스천 본 프로세스와 임베딩 워커 프로세스가 함께 사용하므로 가벼운 별도 모듈로 둠)
+    """
+    logging.info(f"Loading embedding model: {model_name} (Device: {device})")
+    model_kwargs = {'device': device}
+    encode_kwargs = {'normalize_embeddings': True}
+    try:
+        embeddings = HuggingFaceEmbeddings(
+            model_name=model_name,
+            model_kwargs=model_kwargs,
+            encode_kwargs=encode_kwargs
+        )
+        logging.info("Embedding model loaded successfully.")
+        return embeddings
+    except Exception as e:
+        logging.error(f"Failed to load embedding model '{model_name}': {e}", exc_info=True)
+        raise
@@ -0,0 +1,216 @@
+import os
+import io
+import json
+import time
+import pstats
+import cProfile
+import logging
+import resource
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional
+
+# true면 단계마다 cProfile을 켜고, 실행이 끝나면 가장 오래 걸린 단계의 프로파일만 .prof로 저장 (오버헤드 큼, 진단용)
+INGESTION_CPROFILE = os.getenv("INGESTION_CPROFILE", "false").lower() == "true"
+CPROFILE_TOP_FUNCTIONS = 25
+SLOWEST_FILES = 5
+
+
+def peak_rss_mb() -> float:
+    """현재 프로세스의 최대 RSS (MiB, Linux 기준 ru_maxrss는 KiB)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class _Frame:
+    __slots__ = ("name", "items", "source", "profile", "child_wall", "child_cpu")
+
+    def __init__(self, name: str, items: int, source: Optional[str], profile: Optional[cProfile.Profile]):
+        self.name = name
+        self.items = items
+        self.source = source
+        self.profile = profile
+        self.child_wall = 0.0
+        self.child_cpu = 0.0
+
+
+class IngestionProfiler:
+    """
+    인제스천 단계별 벽시계 시간, CPU 시간, 최대 RSS 증가량, 처리 항목 수를 단계/파일 단위로 누적합니다.
+
+    - stage(): 본 스레드에서 실행되는 단계. 중첩되면 바깥 단계 시간에서 안쪽 단계 시간을 빼므로(exclusive)
+      단계별 합이 전체 실행 시간을 넘지 않습니다.
+    - record(): 다른 스레드/프로세스에서 측정한 시간(다운로드, 파티셔닝 워커)을 더합니다. 본 스레드 작업과
+      겹쳐 진행되므로 전체 시간 비중에는 포함하지 않고 따로 표시합니다.
+    CPU 시간은 본 프로세스 전체(다운로드 스레드 포함) 기준이며, 자식 프로세스(파티셔닝/임베딩 워커)의
+    CPU 시간은 종료된 워커 기준으로 totals에만 기록됩니다.
+    """
+
+    def __init__(self, cprofile: bool = INGESTION_CPROFILE):
+        self.cprofile = cprofile
+        self.stages: Dict[str, Dict] = {}
+        self.files: Dict[str, Dict[str, Dict]] = {}
+        self.background: set = set()
+        # 실행 정보 (버전, 전체/증분 등). 보고서 최상위에 그대로 기록
+        self.meta: Dict = {}
+        self._stack: List[_Frame] = []
+        self._profiles: Dict[str, cProfile.Profile] = {}
+        self._lock = threading.Lock()
+        self._started_at = time.time()
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+
+    def _add(self, name: str, wall: float, cpu: float, items: int, source: Optional[str], rss_growth: float) -> None:
+        with self._lock:
+            entry = self.stages.setdefault(
+                name, {"calls": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0, "items": 0, "rss_growth_mb": 0.0}
+            )
+            entry["calls"] += 1
+            entry["wall_seconds"] += wall
+            entry["cpu_seconds"] += cpu
+            entry["items"] += items
+            entry["rss_growth_mb"] += rss_growth
+            if source is not None:
+                per_file = self.files.setdefault(source, {}).setdefault(name, {"wall_seconds": 0.0, "items": 0})
+                per_file["wall_seconds"] += wall
+                per_file["items"] += items
+
+    @contextmanager
+    def stage(self, name: str, items: int = 0, source: Optional[str] = None) -> Iterator[_Frame]:
+        """with 블록을 name 단계로 측정합니다. 처리 항목 수/파일은 블록 안에서 frame.items / frame.source로 정할 수 있습니다."""
+        parent = self._stack[-1] if self._stack else None
+        if parent is not None and parent.profile is not None:
+            parent.profile.disable()
+        profile = self._profiles.setdefault(name, cProfile.Profile()) if self.cprofile else None
+        frame = _Frame(name, items, source, profile)
+        self._stack.append(frame)
+        rss = peak_rss_mb()
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield frame
+        finally:
+            if profile is not None:
+                profile.disable()
+            wall = time.perf_counter() - wall
+            cpu = time.process_time() - cpu
+            self._stack.pop()
+            if parent is not None:
+                parent.child_wall += wall
+                parent.child_cpu += cpu
+                if parent.profile is not None:
+                    parent.profile.enable()
+            self._add(name, wall - frame.child_wall, cpu - frame.child_cpu, frame.items, frame.source,
+                      peak_rss_mb() - rss)
+
+    def iterate(self, name: str, iterable: Iterable) -> Iterator:
+        """이터레이터의 각 next() 대기 시간을 name 단계로 측정합니다. (항목의 key 속성을 파일로 기록)"""
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name, items=1) as frame:
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    frame.items = 0
+                    return
+                frame.source = getattr(item, "key", None)
+            yield item
+
+    def record(self, name: str, seconds: float, items: int = 0, source: Optional[str] = None) -> None:
+        """다른 스레드/프로세스에서 측정한 시간을 더합니다. (스레드 안전)"""
+        with self._lock:
+            self.background.add(name)
+        self._add(name, seconds, 0.0, items, source, 0.0)
+
+    def report(self, **extra) -> Dict:
+        wall = time.perf_counter() - self._wall
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        stages = {}
+        for name, entry in sorted(self.stages.items(), key=lambda item: -item[1]["wall_seconds"]):
+            seconds = entry["wall_seconds"]
+            stages[name] = {
+                **{key: round(value, 3) if isinstance(value, float) else value for key, value in entry.items()},
+                "items_per_second": round(entry["items"] / seconds, 2) if seconds > 0 and entry["items"] else None,
+                "share": None if name in self.background else round(seconds / wall, 3) if wall > 0 else 0.0,
+                "background": name in self.background,
+            }
+        files = {
+            source: {
+                "wall_seconds": round(sum(s["wall_seconds"] for name, s in per_stage.items() if name not in self.background), 3),
+                "stages": {name: {"wall_seconds": round(s["wall_seconds"], 3), "items": s["items"]}
+                           for name, s in per_stage.items()},
+            }
+            for source, per_stage in self.files.items()
+        }
+        return {
+            **self.meta,
+            **extra,
+            "started_at": datetime.fromtimestamp(self._started_at, timezone.utc).isoformat(),
+            "totals": {
+                "wall_seconds": round(wall, 3),
+                "cpu_seconds": round(time.process_time() - self._cpu, 3),
+                "child_cpu_seconds": round(children.ru_utime + children.ru_stime, 3),
+                "peak_rss_mb": round(peak_rss_mb(), 1),
+                "files": len(files),
+            },
+            "stages": stages,
+            "files": files,
+        }
+
+    def summary(self, report: Dict) -> str:
+        totals = report["totals"]
+        lines = [
+            f"Ingestion profile: {totals['wall_seconds']:.1f}s wall, {totals['cpu_seconds']:.1f}s CPU "
+            f"(+{totals['child_cpu_seconds']:.1f}s in worker processes), peak RSS {totals['peak_rss_mb']:.0f} MiB, "
+            f"{totals['files']} files",
+            f"  {'stage':<18}{'wall s':>10}{'share':>8}{'cpu s':>10}{'items':>10}{'items/s':>10}{'rss +MiB':>10}",
+        ]
+        for name, stage in report["stages"].items():
+            share = "bg" if stage["background"] else f"{stage['share'] * 100:.1f}%"
+            rate = f"{stage['items_per_second']:.1f}" if stage["items_per_second"] else "-"
+            lines.append(
+                f"  {name:<18}{stage['wall_seconds']:>10.1f}{share:>8}{stage['cpu_seconds']:>10.1f}"
+                f"{stage['items']:>10}{rate:>10}{stage['rss_growth_mb']:>10.0f}"
+            )
+        slowest = sorted(report["files"].items(), key=lambda item: -item[1]["wall_seconds"])[:SLOWEST_FILES]
+        if slowest:
+            lines.append("  Slowest files:")
+            for source, entry in slowest:
+                foreground = [item for item in entry["stages"].items() if item[0] not in self.background]
+                top = max(foreground, key=lambda item: item[1]["wall_seconds"])[0] if foreground else "-"
+                lines.append(f"    {entry['wall_seconds']:>8.1f}s  {source} (mostly {top})")
+        return "\n".join(lines)
+
+    def _dump_cprofile(self, report: Dict, path: str) -> Optional[Dict]:
+        """cProfile을 켠 경우 가장 오래 걸린 본 스레드 단계의 프로파일을 <path>.<단계>.prof로 저장합니다."""
+        profiled = [name for name in report["stages"] if name in self._profiles]
+        if not profiled:
+            return None
+        name = profiled[0]
+        prof_path = f"{os.path.splitext(path)[0]}.{name}.prof"
+        self._profiles[name].dump_stats(prof_path)
+        out = io.StringIO()
+        pstats.Stats(self._profiles[name], stream=out).sort_stats("cumulative").print_stats(CPROFILE_TOP_FUNCTIONS)
+        return {"stage": name, "path": prof_path, "top": out.getvalue()}
+
+    def write(self, path: str, **extra) -> Dict:
+        """JSON 보고서와 사람이 읽는 요약(<path>.txt, 로그)을 기록하고 보고서를 반환합니다."""
+        report = self.report(**extra)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        summary = self.summary(report)
+        cprofile = self._dump_cprofile(report, path)
+        if cprofile is not None:
+            report["cprofile"] = {"stage": cprofile["stage"], "path": cprofile["path"]}
+            summary += f"\n  cProfile of slowest stage '{cprofile['stage']}': {cprofile['path']}\n{cprofile['top']}"
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, path)
+        with open(f"{os.path.splitext(path)[0]}.txt", "w", encoding="utf-8") as f:
+            f.write(summary + "\n")
+        logging.info(summary)
+        logging.info(f"Ingestion profile saved: {path}")
+        return report
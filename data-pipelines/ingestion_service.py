@@ -0,0 +1,271 @@
+"""
+이벤트 기반 인제스천 서비스
+
+MinIO 버킷 알림(webhook)으로 PDF 추가/변경/삭제를 받아, 짧은 시간 안에 몰린 이벤트를 모은 뒤(디바운스)
+해당 객체만 증분 인제스천합니다. 알림이 유실되어도 INGESTION_POLL_SECONDS마다 버킷 목록을 매니페스트와 비교하여
+놓친 변경을 같은 큐에 넣습니다. (실패한 실행의 객체도 매니페스트에 기록되지 않으므로 다음 폴링에서 재시도)
+
+실행 (data-pipelines 디렉터리에서):
+    uvicorn ingestion_service:app --host 0.0.0.0 --port 8003
+
+MinIO 알림 설정 예:
+    MINIO_NOTIFY_WEBHOOK_ENABLE_INGEST=on
+    MINIO_NOTIFY_WEBHOOK_ENDPOINT_INGEST=http://<서비스 호스트>:8003/events/minio
+    MINIO_NOTIFY_WEBHOOK_AUTH_TOKEN_INGEST=<INGESTION_WEBHOOK_TOKEN>
+    mc event add local/academic-bucket arn:minio:sqs::INGEST:webhook --event put,delete --suffix .pdf
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import unquote_plus
+
+from fastapi import FastAPI, HTTPException, Request
+
+import injest_pdfs
+from manifest import IngestionManifest
+
+# 마지막 이벤트 후 이 시간 동안 새 이벤트가 없으면 실행 / 이벤트가 계속 와도 가장 오래된 이벤트 기준 이 시간이 지나면 실행
+INGESTION_DEBOUNCE_SECONDS = float(os.getenv("INGESTION_DEBOUNCE_SECONDS", 10))
+INGESTION_MAX_DELAY_SECONDS = float(os.getenv("INGESTION_MAX_DELAY_SECONDS", 120))
+# 알림 유실 대비 버킷 폴링 주기 (0이면 폴링하지 않음)
+INGESTION_POLL_SECONDS = float(os.getenv("INGESTION_POLL_SECONDS", 300))
+# 전체 재구축이 실패한 뒤 객체 목록/설정이 그대로면 폴링이 재구축을 다시 요청하기까지 기다리는 시간
+INGESTION_FULL_RETRY_SECONDS = float(os.getenv("INGESTION_FULL_RETRY_SECONDS", 6 * 3600))
+# MinIO webhook 대상의 auth_token과 같은 값 (빈 값이면 검사하지 않음)
+INGESTION_WEBHOOK_TOKEN = os.getenv("INGESTION_WEBHOOK_TOKEN", "")
+
+
+class IngestionQueue:
+    """
+    인제스천 대기 객체 키 집합. 같은 키의 이벤트가 여러 번 와도 한 번만 처리되며,
+    추가/삭제 구분은 실행 시점의 객체 상태(head_object)로 판단하므로 이벤트 순서가 뒤바뀌어도 안전합니다.
+    """
+
+    def __init__(self, debounce: float = INGESTION_DEBOUNCE_SECONDS, max_delay: float = INGESTION_MAX_DELAY_SECONDS):
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self._pending: Dict[str, float] = {}   # key -> 처음 들어온 시각
+        self._full_since: Optional[float] = None
+        self._last_event = 0.0
+        self._cond = threading.Condition()
+        self.events: Dict[str, int] = {"notification": 0, "poll": 0}
+
+    def add(self, keys: Iterable[str], origin: str) -> int:
+        now = time.time()
+        added = 0
+        with self._cond:
+            for key in keys:
+                self._pending.setdefault(key, now)
+                added += 1
+            if added:
+                self.events[origin] = self.events.get(origin, 0) + added
+                self._last_event = now
+                self._cond.notify()
+        return added
+
+    def request_full(self) -> None:
+        """매니페스트가 없거나 설정이 바뀌어 전체 재구축이 필요한 경우"""
+        with self._cond:
+            if self._full_since is None:
+                self._full_since = time.time()
+                self._last_event = self._full_since
+                self._cond.notify()
+
+    def _oldest(self) -> Optional[float]:
+        stamps = list(self._pending.values()) + ([self._full_since] if self._full_since is not None else [])
+        return min(stamps) if stamps else None
+
+    def next_batch(self, stop: threading.Event) -> Optional[Tuple[Optional[List[str]], float]]:
+        """
+        디바운스 조건을 만족할 때까지 기다렸다가 (대상 키 목록 또는 전체 재구축이면 None, 가장 오래된 이벤트 시각)을 반환합니다.
+        stop이 설정되면 None을 반환합니다.
+        """
+        with self._cond:
+            while not stop.is_set():
+                oldest = self._oldest()
+                if oldest is None:
+                    self._cond.wait(timeout=1.0)
+                    continue
+                now = time.time()
+                quiet_for = now - self._last_event
+                if quiet_for >= self.debounce or now - oldest >= self.max_delay:
+                    keys = None if self._full_since is not None else sorted(self._pending)
+                    self._pending.clear()
+                    self._full_since = None
+                    return keys, oldest
+                self._cond.wait(timeout=min(self.debounce - quiet_for, self.max_delay - (now - oldest)))
+        return None
+
+    def stats(self) -> Dict[str, object]:
+        with self._cond:
+            oldest = self._oldest()
+            return {
+                "queue_depth": len(self._pending),
+                "full_rebuild_pending": self._full_since is not None,
+                "oldest_pending_seconds": round(time.time() - oldest, 1) if oldest is not None else 0.0,
+                "events": dict(self.events),
+            }
+
+
+class IngestionService:
+    """대기 큐를 소비하는 인제스천 스레드와 폴링 스레드를 관리합니다. (인제스천은 한 번에 하나만 실행)"""
+
+    def __init__(self, poll_seconds: float = INGESTION_POLL_SECONDS):
+        self.queue = IngestionQueue()
+        self.poll_seconds = poll_seconds
+        self.ingesting = False
+        self.runs = {"ok": 0, "failed": 0}
+        self.last_ingest: Dict[str, object] = {}
+        self.last_poll_at: Optional[float] = None
+        # 임베딩 모델(또는 ShardedEmbeddings 워커 풀)은 첫 실행 때 한 번 만들어 모든 실행에서 재사용
+        self._embeddings = None
+        # 폴링이 요청한 전체 재구축의 (객체 목록 + 설정) 서명, 마지막으로 실패한 전체 재구축 {"signature", "at"}
+        self._full_signature: Optional[str] = None
+        self.failed_full: Optional[Dict[str, object]] = None
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        self._threads = [threading.Thread(target=self._ingest_loop, name="ingest", daemon=True)]
+        if self.poll_seconds > 0:
+            self._threads.append(threading.Thread(target=self._poll_loop, name="poll", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        if isinstance(self._embeddings, injest_pdfs.ShardedEmbeddings):
+            self._embeddings.close()
+
+    def _ingest_loop(self) -> None:
+        while not self._stop.is_set():
+            batch = self.queue.next_batch(self._stop)
+            if batch is None:
+                return
+            keys, oldest = batch
+            logging.info(f"Ingesting {'all objects (full rebuild)' if keys is None else f'{len(keys)} objects'}")
+            self.ingesting = True
+            started = time.time()
+            try:
+                if self._embeddings is None:
+                    self._embeddings = injest_pdfs.create_embeddings()
+                ok = injest_pdfs.main_ingestion_pipeline(keys, embeddings=self._embeddings)
+            except Exception as e:
+                logging.error(f"Ingestion run failed: {e}", exc_info=True)
+                ok = False
+            finally:
+                self.ingesting = False
+            finished = time.time()
+            self.runs["ok" if ok else "failed"] += 1
+            if keys is None:
+                self.failed_full = None if ok else {"signature": self._full_signature, "at": finished}
+            self.last_ingest = {
+                "ok": ok,
+                "objects": len(keys) if keys is not None else "all",
+                "finished_at": finished,
+                "duration_seconds": round(finished - started, 1),
+                # 가장 오래 기다린 변경이 검색에 반영되기까지 걸린 시간
+                "latency_seconds": round(finished - oldest, 1),
+            }
+
+    def _poll_loop(self) -> None:
+        while not self._stop.is_set():
+            if not self.ingesting:
+                try:
+                    self.poll_once()
+                except Exception as e:
+                    logging.warning(f"Bucket poll failed: {e}")
+            self._stop.wait(self.poll_seconds)
+
+    def poll_once(self) -> None:
+        """버킷 목록을 매니페스트와 비교하여 알림으로 받지 못한 추가/변경/삭제를 큐에 넣습니다."""
+        s3_client = injest_pdfs.create_s3_client(
+            injest_pdfs.MINIO_ENDPOINT_URL, injest_pdfs.MINIO_ACCESS_KEY, injest_pdfs.MINIO_SECRET_KEY
+        )
+        pdf_objects = injest_pdfs.list_pdf_objects(s3_client, injest_pdfs.MINIO_BUCKET)
+        manifest = IngestionManifest.load(injest_pdfs.INGESTION_MANIFEST_PATH, injest_pdfs.manifest_settings())
+        self.last_poll_at = time.time()
+        if not manifest.is_compatible():
+            # 실패한 전체 재구축은 매니페스트를 저장하지 않으므로, 객체 목록/설정이 바뀌거나 재시도 대기 시간이 지날 때까지
+            # 다시 요청하지 않음 (폴링마다 전체 코퍼스를 다시 파티셔닝/임베딩하지 않도록)
+            signature = full_rebuild_signature(pdf_objects)
+            failed = self.failed_full
+            if (failed and failed["signature"] == signature
+                    and self.last_poll_at - failed["at"] < INGESTION_FULL_RETRY_SECONDS):
+                return
+            self._full_signature = signature
+            self.queue.request_full()
+            return
+        changed = [key for key, etag in pdf_objects.items() if not manifest.is_unchanged(key, etag)]
+        missed = self.queue.add(changed + manifest.removed_keys(pdf_objects), origin="poll")
+        if missed:
+            logging.info(f"Bucket poll queued {missed} objects")
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            **self.queue.stats(),
+            "ingesting": self.ingesting,
+            "runs": dict(self.runs),
+            "last_ingest": self.last_ingest,
+            "last_poll_at": self.last_poll_at,
+            "last_failed_full_rebuild_at": self.failed_full["at"] if self.failed_full else None,
+        }
+
+
+def full_rebuild_signature(pdf_objects: Dict[str, str]) -> str:
+    """전체 재구축 입력(객체 키/ETag 목록과 인제스천 설정)의 서명"""
+    payload = json.dumps([sorted(pdf_objects.items()), injest_pdfs.manifest_settings()], sort_keys=True)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def parse_notification(payload: Dict, bucket: str) -> List[str]:
+    """MinIO(S3 형식) 버킷 알림에서 대상 버킷의 PDF 객체 키를 추출합니다. (생성/삭제 이벤트만)"""
+    keys = []
+    for record in payload.get("Records") or []:
+        event = record.get("eventName", "")
+        s3 = record.get("s3", {})
+        if not (event.startswith("s3:ObjectCreated:") or event.startswith("s3:ObjectRemoved:")):
+            continue
+        if s3.get("bucket", {}).get("name") != bucket:
+            continue
+        key = unquote_plus(s3.get("object", {}).get("key", ""))
+        if key.lower().endswith(".pdf"):
+            keys.append(key)
+    return keys
+
+
+service = IngestionService()
+app = FastAPI()
+
+
+@app.on_event("startup")
+def start_service():
+    service.start()
+
+
+@app.on_event("shutdown")
+def stop_service():
+    service.stop()
+
+
+@app.post("/events/minio")
+async def receive_bucket_event(request: Request):
+    """MinIO webhook 알림 수신. 객체 키만 큐에 넣고 바로 응답합니다. (처리는 디바운스 후 인제스천 스레드에서)"""
+    if INGESTION_WEBHOOK_TOKEN:
+        token = request.headers.get("Authorization", "")
+        if token not in (INGESTION_WEBHOOK_TOKEN, f"Bearer {INGESTION_WEBHOOK_TOKEN}"):
+            raise HTTPException(status_code=401, detail="invalid token")
+    keys = parse_notification(await request.json(), injest_pdfs.MINIO_BUCKET)
+    return {"queued": service.queue.add(keys, origin="notification")}
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """대기 큐 깊이, 마지막 인제스천 지연 시간 등 서비스 지표를 반환합니다."""
+    return service.stats()
@@ -1,17 +1,33 @@
 import os
+import json
+import time
+import hashlib
 import logging
 import chromadb
 import boto3
-from io import BytesIO
-from typing import List
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 from langchain_core.documents import Document
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_chroma import Chroma
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores.utils import filter_complex_metadata
 
-from unstructured.partition.pdf import partition_pdf
+from lexical_index import build_lexical_index, save_lexical_index
+from snapshot_export import export_vector_snapshot, iter_collection_records, partition_slug, collection_sources
+from manifest import IngestionManifest
+from chunking import split_pages
+from embedding_model import load_embedding_model
+from dedup import DedupIndex, expand_references, CHUNK_DEDUP
+from ingestion_profile import IngestionProfiler, peak_rss_mb
+from collection_versions import (
+    generation_name, read_pointer, publish_pointer, collect_garbage, expire_retired, run_smoke_checks
+)
+from embedding_cache import ChunkEncoder, default_chunk_cache, EMBEDDING_BATCH_SIZE
+from sharded_embedding import ShardedEmbeddings, EMBEDDING_WORKERS
+from partitioning import (
+    partition_in_pool, default_partition_cache, PartitionResult, PARTITION_WORKERS, PARTITION_TIMEOUT_SECONDS
+)
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logging.getLogger('unstructured').setLevel(logging.WARNING)
@@ -31,6 +47,8 @@ MINIO_SECRET_KEY = os.getenv("MINIO_SECRET_KEY", "software")
 CHROMA_HOST = os.getenv("CHROMA_HOST", "localhost")
 CHROMA_PORT = int(os.getenv("CHROMA_PORT", 8000))
 CHROMA_COLLECTION_NAME = os.getenv("CHROMA_COLLECTION_NAME", "academic_regulations")
+# single: 단일 컬렉션 + source 메타데이터 필터 / per_source: 원본 파일별 컬렉션(파티션) + 라우팅 맵
+COLLECTION_LAYOUT = os.getenv("COLLECTION_LAYOUT", "single")
 
 # 3. RAG 파이프라인 설정
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "jhgan/ko-sroberta-multitask")
@@ -38,194 +56,730 @@ CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", 1000))
 CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", 200)) 
 DEVICE_TYPE = os.getenv("DEVICE_TYPE", "cpu")
 
-def load_embedding_model(model_name: str, device: str) -> HuggingFaceEmbeddings:
-    """
-    지정된 HuggingFace 임베딩 모델을 메모리에 로드합니다.
-    """
-    logging.info(f"Loading embedding model: {model_name} (Device: {device})")
-    model_kwargs = {'device': device}
-    encode_kwargs = {'normalize_embeddings': True}
-    try:
-        embeddings = HuggingFaceEmbeddings(
-            model_name=model_name,
-            model_kwargs=model_kwargs,
-            encode_kwargs=encode_kwargs
-        )
-        logging.info("Embedding model loaded successfully.")
-        return embeddings
-    except Exception as e:
-        logging.error(f"Failed to load embedding model '{model_name}': {e}", exc_info=True)
-        raise
+# 4. 에이전트와 공유하는 검색 부가 산출물(어휘 색인 등) 저장 위치
+RAG_ARTIFACT_DIR = os.getenv("RAG_ARTIFACT_DIR", "./rag_artifacts")
+LEXICAL_INDEX_PATH = os.path.join(RAG_ARTIFACT_DIR, "lexical_index.json.gz")
+DEDUP_INDEX_PATH = os.path.join(RAG_ARTIFACT_DIR, "dedup_index.json.gz")
+# 단계별 시간/CPU/RSS/처리량 보고서 (빈 값이면 기록하지 않음, 요약은 같은 이름의 .txt)
+INGESTION_PROFILE_PATH = os.getenv("INGESTION_PROFILE_PATH", os.path.join(RAG_ARTIFACT_DIR, "ingestion_profile.json"))
+VECTOR_SNAPSHOT_DIR = os.path.join(RAG_ARTIFACT_DIR, "vector_snapshot")
+EXPORT_VECTOR_SNAPSHOT = os.getenv("EXPORT_VECTOR_SNAPSHOT", "true").lower() == "true"
+
+# 5. 증분 인제스천: 직전 실행의 파일별 ETag/SHA-256/청크 ID 기록. 없거나 설정이 바뀌면 전체 재구축
+INGESTION_MANIFEST_PATH = os.getenv("INGESTION_MANIFEST_PATH", os.path.join(RAG_ARTIFACT_DIR, "ingestion_manifest.json"))
+INGESTION_FULL_REBUILD = os.getenv("INGESTION_FULL_REBUILD", "false").lower() == "true"
+DELETE_BATCH_SIZE = 500
+
+# 6. 임베딩/저장 배치 크기 (파일 단위 스트리밍 처리 시 한 번에 메모리에 올리는 청크 수)
+INGESTION_BATCH_SIZE = int(os.getenv("INGESTION_BATCH_SIZE", 64))
 
-def load_and_partition_documents_from_minio(
-    bucket: str, endpoint: str, key: str, secret: str
-) -> List:
+# 7. 버킷 샤딩: "i/n"이면 최상위 prefix를 n개로 나눈 것 중 i번째만 파티셔닝하여 공유 파티션 캐시를 채움
+#    (여러 워커가 OCR을 나눠 수행하고, 샤드 없이 실행한 본 인제스천은 캐시에서 바로 시작)
+INGESTION_SHARD = os.getenv("INGESTION_SHARD", "")
+# 중복 청크 제거는 모든 청크가 한 컬렉션에 있는 single 레이아웃에서만 적용 (per_source는 파티션 간 공유 불가)
+DEDUP_ENABLED = CHUNK_DEDUP and COLLECTION_LAYOUT != "per_source"
+# 해시 계산을 위해 객체를 순서대로 받아 임시 파일에 기록 (동시성은 DOWNLOAD_CONCURRENCY로 파일 단위 제어)
+STREAMING_TRANSFER = TransferConfig(use_threads=False)
+
+def create_embeddings():
     """
-    MinIO (S3) 버킷에 연결하여 모든 PDF 파일을 찾아
-    'unstructured'로 메모리 내에서 직접 파티셔닝합니다.
-    (S3DirectoryLoader 대신 unstructured 로직 직접 구현)
+    인제스천용 임베딩 모델을 생성합니다.
+    CPU 호스트에서 EMBEDDING_WORKERS > 1이면 코어 구간별 워커 프로세스에 샤딩하는 ShardedEmbeddings (사용 후 close 필요)
     """
-    logging.info(f"Connecting to MinIO bucket: {bucket} at {endpoint}")
-    s3_client = boto3.client(
+    if EMBEDDING_WORKERS > 1:
+        return ShardedEmbeddings(EMBEDDING_MODEL, DEVICE_TYPE)
+    return load_embedding_model(EMBEDDING_MODEL, DEVICE_TYPE)
+
+def create_s3_client(endpoint: str, key: str, secret: str):
+    logging.info(f"Connecting to MinIO at {endpoint}")
+    return boto3.client(
         's3',
         endpoint_url=endpoint,
         aws_access_key_id=key,
         aws_secret_access_key=secret,
         use_ssl=False
     )
-    
-    pdf_files = []
-    try:
-        response = s3_client.list_objects_v2(Bucket=bucket)
-        if 'Contents' not in response:
-            logging.warning(f"No files found in bucket '{bucket}'.")
-            return []
-        
-        for obj in response['Contents']:
+
+def parse_shard(spec: str) -> Optional[Tuple[int, int]]:
+    """INGESTION_SHARD("i/n")를 (i, n)으로 변환합니다. 빈 값이면 None."""
+    if not spec:
+        return None
+    index, count = (int(part) for part in spec.split("/"))
+    if not 0 <= index < count:
+        raise ValueError(f"Invalid INGESTION_SHARD '{spec}': expected i/n with 0 <= i < n")
+    return index, count
+
+def _shard_of(name: str, count: int) -> int:
+    return int(hashlib.sha1(name.encode("utf-8")).hexdigest()[:8], 16) % count
+
+def list_pdf_objects(s3_client, bucket: str, shard: Optional[Tuple[int, int]] = None) -> Dict[str, str]:
+    """
+    버킷의 PDF 객체 목록을 {object key: ETag} 형태로 반환합니다.
+    list_objects_v2 페이지네이터로 끝까지 나열하므로 1000개가 넘는 버킷도 모두 포함됩니다.
+    shard=(i, n)이면 최상위 prefix(와 최상위 객체)를 이름 해시로 n개로 나눈 것 중 i번째만 나열합니다.
+    """
+    paginator = s3_client.get_paginator("list_objects_v2")
+    pdf_objects = {}
+    pages = 0
+
+    def collect(objects) -> None:
+        for obj in objects:
             if obj['Key'].lower().endswith('.pdf'):
-                pdf_files.append(obj['Key'])
+                pdf_objects[obj['Key']] = obj.get('ETag', '').strip('"')
+
+    try:
+        if shard is None:
+            for page in paginator.paginate(Bucket=bucket):
+                pages += 1
+                collect(page.get('Contents', []))
+        else:
+            index, count = shard
+            prefixes = []
+            for page in paginator.paginate(Bucket=bucket, Delimiter="/"):
+                pages += 1
+                collect(obj for obj in page.get('Contents', []) if _shard_of(obj['Key'], count) == index)
+                prefixes.extend(
+                    p['Prefix'] for p in page.get('CommonPrefixes', []) if _shard_of(p['Prefix'], count) == index
+                )
+            for prefix in prefixes:
+                for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+                    pages += 1
+                    collect(page.get('Contents', []))
+            logging.info(f"Shard {index}/{count}: {len(prefixes)} prefixes")
     except Exception as e:
         logging.error(f"Failed to list objects in MinIO bucket: {e}", exc_info=True)
         raise
-        
-    if not pdf_files:
+
+    logging.info(f"Listed {len(pdf_objects)} PDF objects in bucket '{bucket}' ({pages} pages)")
+    if not pdf_objects:
         logging.warning(f"No PDF files found in bucket '{bucket}'.")
-        return []
+    return pdf_objects
 
-    logging.info(f"Found {len(pdf_files)} PDF files. Starting partitioning...")
-    
-    all_elements = []
-    for pdf_key in pdf_files:
-        logging.info(f"  - Processing: {pdf_key}")
-        try:
-            pdf_obj = s3_client.get_object(Bucket=bucket, Key=pdf_key)
-            pdf_bytes = pdf_obj['Body'].read()
-            
-            elements = partition_pdf(
-                file=BytesIO(pdf_bytes),
-                infer_table_structure=True, 
-                strategy="hi_res", 
-                languages=["kor"],
-                metadata_filename=pdf_key 
+def partition_documents_from_minio(
+    s3_client, bucket: str, pdf_keys: List[str], manifest: Optional[IngestionManifest] = None,
+    known_digests: Optional[Dict[str, str]] = None, profiler: Optional[IngestionProfiler] = None
+) -> Iterator[PartitionResult]:
+    """
+    지정된 PDF들을 MinIO에서 내려받아 'unstructured'로 파티셔닝하고, 파일 단위로 결과를 내보냅니다.
+    (S3DirectoryLoader 대신 unstructured 로직 직접 구현)
+    파티셔닝은 PARTITION_WORKERS개 프로세스에서 병렬로 수행되며, 다운로드는 파티셔닝과 겹쳐 진행됩니다.
+
+    manifest가 주어지면 내려받은 파일의 SHA-256이 매니페스트와 같을 때(ETag만 바뀐 재업로드)
+    파티셔닝을 생략하고 skipped 결과를 냅니다.
+    파티셔닝에 실패(오류/시간 초과)한 파일은 내보내지 않으므로 기존 청크가 유지되고 다음 실행에서 재시도됩니다.
+
+    파티션 캐시(PARTITION_CACHE_DIR)에 같은 내용의 결과가 있으면 OCR 없이 재사용합니다.
+    known_digests({key: SHA-256}, ETag가 같은 직전 매니페스트 기록)가 있으면 캐시 적중 시 다운로드도 생략하므로,
+    CHUNK_SIZE나 임베딩 모델만 바꾼 재구축은 캐시에서 바로 시작합니다.
+    profiler가 주어지면 다운로드(스레드)와 파티셔닝(워커 프로세스) 시간을 파일별로 기록합니다.
+    """
+    cache = default_partition_cache()
+    profiler = profiler or IngestionProfiler(cprofile=False)
+    logging.info(
+        f"Partitioning {len(pdf_keys)} PDF files from bucket '{bucket}' "
+        f"(workers: {PARTITION_WORKERS}, timeout: {PARTITION_TIMEOUT_SECONDS:.0f}s)..."
+    )
+
+    def fetch(pdf_key: str, out) -> None:
+        # 객체를 메모리에 모으지 않고 임시 파일로 스트리밍
+        started = time.perf_counter()
+        s3_client.download_fileobj(bucket, pdf_key, out, Config=STREAMING_TRANSFER)
+        profiler.record("download", time.perf_counter() - started, items=1, source=pdf_key)
+
+    partitioned = 0
+    failed = 0
+    total_pages = 0
+    strategy_totals: Dict[str, Dict[str, float]] = {}
+    page_classes: Dict[str, int] = {}
+    started = time.monotonic()
+    results = partition_in_pool(
+        pdf_keys, fetch,
+        skip_if=manifest.has_same_content if manifest is not None else None,
+        cache=cache,
+        known_digest=(known_digests or {}).get
+    )
+    for done, result in enumerate(results, start=1):
+        progress = f"[{done}/{len(pdf_keys)}]"
+        if result.skipped:
+            logging.info(f"  {progress} {result.key}: content unchanged (SHA-256 match), skipped")
+        elif result.error:
+            logging.warning(f"  {progress} Failed to partition PDF '{result.key}': {result.error}")
+            failed += 1
+            continue
+        else:
+            partitioned += 1
+            total_pages += result.pages
+            if not result.cached:
+                profiler.record("partition_worker", result.seconds, items=result.pages, source=result.key)
+            for name, entry in result.strategy_stats.items():
+                if name == "classes":
+                    for label, count in entry.items():
+                        page_classes[label] = page_classes.get(label, 0) + count
+                    continue
+                totals = strategy_totals.setdefault(name, {"pages": 0, "seconds": 0.0})
+                totals["pages"] += entry["pages"]
+                totals["seconds"] += entry["seconds"]
+            elapsed = time.monotonic() - started
+            logging.info(
+                f"  {progress} {result.key}: {len(result.elements)} elements, {result.pages} pages "
+                + ("from partition cache" if result.cached else f"in {result.seconds:.1f}s")
+                + f" (overall {total_pages / max(elapsed, 1e-9):.2f} pages/s)"
             )
-            all_elements.extend(elements)
-        except Exception as e:
-            logging.warning(f"Failed to partition PDF '{pdf_key}': {e}", exc_info=True)
+        yield result
     
-    logging.info(f"Partitioning complete. {len(all_elements)} elements extracted.")
-    return all_elements
+    logging.info(
+        f"Partitioning complete. {partitioned} files ({total_pages} pages, {failed} failed) "
+        f"in {time.monotonic() - started:.1f}s."
+        + (f" Partition cache: {cache.hits} hits, {cache.misses} misses." if cache is not None else "")
+    )
+    if page_classes:
+        logging.info("  Page classes: " + ", ".join(f"{label} {count}" for label, count in sorted(page_classes.items())))
+    for name, totals in sorted(strategy_totals.items()):
+        per_page = totals["seconds"] / totals["pages"] if totals["pages"] else 0.0
+        logging.info(f"  Strategy '{name}': {totals['pages']} pages in {totals['seconds']:.1f}s ({per_page:.2f}s/page)")
 
-def main_ingestion_pipeline() -> None:
+def build_chunks(all_elements: List) -> Tuple[List[Document], List[str]]:
     """
-    전체 데이터 인제스천(Ingestion) 파이프라인을 실행합니다.
-    1. MinIO에서 PDF 로드 및 Unstructured 파티셔닝
-    2. [수정됨] 파일명(filename)별로 먼저 그룹화, 그 다음 페이지별로 그룹화
-    3. Recursive 청킹 (Overlap 적용)
-    4. 임베딩 모델 로드
-    5. 메타데이터 필터링
-    6. 원격 ChromaDB 서버에 접속하여 벡터 저장
+    파티셔닝 요소를 파일명 -> 페이지 번호 순으로 묶어 페이지 문서를 만들고 청크로 분할합니다.
+    chunk_id는 파일 내 순서이므로 다른 파일이 추가/삭제되어도 값이 바뀌지 않습니다.
     """
-    try:
-        # --- 1. Load & Partition ---
-        all_elements = load_and_partition_documents_from_minio(
-            bucket=MINIO_BUCKET,
-            endpoint=MINIO_ENDPOINT_URL,
-            key=MINIO_ACCESS_KEY,
-            secret=MINIO_SECRET_KEY
-        )
-        if not all_elements:
-            logging.info("No elements extracted from MinIO PDFs. Exiting pipeline.")
-            return
-
-        # --- 2. '파일명'별로 먼저 그룹화, 그 다음 '페이지 번호'별로 그룹화 ---
-        logging.info("Grouping elements by filename, then by page number...")
+    # --- '파일명'별로 먼저 그룹화, 그 다음 '페이지 번호'별로 그룹화 ---
+    logging.info("Grouping elements by filename, then by page number...")
+    
+    file_page_elements = {}
+    for el in all_elements:
+        page_num = el.metadata.page_number
+        filename = el.metadata.filename
         
-        file_page_elements = {}
-        for el in all_elements:
-            page_num = el.metadata.page_number
-            filename = el.metadata.filename
-            
-            if not page_num or not filename:
-                continue
+        if not page_num or not filename:
+            continue
 
-            if filename not in file_page_elements:
-                file_page_elements[filename] = {}
-            
-            if page_num not in file_page_elements[filename]:
-                file_page_elements[filename][page_num] = []
-            
-            file_page_elements[filename][page_num].append(str(el))
+        if filename not in file_page_elements:
+            file_page_elements[filename] = {}
         
-        logging.info(f"Creating page-level Documents across {len(file_page_elements)} files...")
+        if page_num not in file_page_elements[filename]:
+            file_page_elements[filename][page_num] = []
         
-        page_docs = []
-        for filename, pages in file_page_elements.items():
-            for page_num in sorted(pages.keys()):
-                page_text = "\n\n".join(pages[page_num])
-                
-                clean_metadata = {
-                    "source": filename,
-                    "page_number": page_num
-                }
-                
-                page_docs.append(Document(page_content=page_text, metadata=clean_metadata))
-
-        logging.info(f"{len(page_docs)} page Documents created.")
-
-        # --- 3. Split (Chunk) ---
-        logging.info(f"Splitting {len(page_docs)} pages into chunks (Size: {CHUNK_SIZE}, Overlap: {CHUNK_OVERLAP})...")
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=CHUNK_SIZE,
-            chunk_overlap=CHUNK_OVERLAP
+        file_page_elements[filename][page_num].append(str(el))
+    
+    logging.info(f"Creating page-level Documents across {len(file_page_elements)} files...")
+    
+    page_docs = []
+    for filename, pages in file_page_elements.items():
+        for page_num in sorted(pages.keys()):
+            page_text = "\n\n".join(pages[page_num])
+            
+            clean_metadata = {
+                "source": filename,
+                "page_number": page_num
+            }
+            
+            page_docs.append(Document(page_content=page_text, metadata=clean_metadata))
+
+    logging.info(f"{len(page_docs)} page Documents created.")
+
+    # --- Split (Chunk) ---
+    logging.info(f"Splitting {len(page_docs)} pages into chunks (Size: {CHUNK_SIZE}, Overlap: {CHUNK_OVERLAP})...")
+    splits, chunk_ids = split_pages(page_docs, CHUNK_SIZE, CHUNK_OVERLAP)
+    logging.info(f"Split completed: {len(splits)} text chunks created.")
+    return splits, chunk_ids
+
+def partition_collection_name(source: str, generation: str = "") -> str:
+    """원본 파일 전용 파티션 컬렉션 이름 (Chroma 이름 규칙을 만족하도록 해시 사용, 세대별로 구분)"""
+    prefix = generation_name(CHROMA_COLLECTION_NAME, generation) if generation else CHROMA_COLLECTION_NAME
+    return f"{prefix}__{partition_slug(source)}"
+
+def _reset_collection(client, name: str, metadata: dict):
+    # 같은 이름의 잔여 컬렉션(중단된 실행 등)을 지우고 새로 생성하여 중복 방지
+    try:
+        client.delete_collection(name=name)
+        logging.info(f"Deleted old collection '{name}'.")
+    except Exception:
+        logging.info(f"Collection '{name}' not found, creating new one.")
+    return client.create_collection(name=name, metadata=metadata)
+
+def collection_exists(client, name: str) -> bool:
+    try:
+        client.get_collection(name=name)
+        return True
+    except Exception:
+        return False
+
+
+class ChromaWriter:
+    """
+    파일 단위로 청크를 COLLECTION_LAYOUT에 맞게 ChromaDB에 기록합니다.
+    CHROMA_COLLECTION_NAME은 데이터 없이 버전/레이아웃/활성 컬렉션을 메타데이터로 갖는 레지스트리(포인터)이며,
+    에이전트는 이 포인터를 따라 검색할 컬렉션을 정합니다.
+
+    - single: 활성 데이터 컬렉션(active_collection) 하나에 모든 청크 저장 (검색 시 source 필터)
+    - per_source: 원본 파일별 파티션 컬렉션에 저장하고, 포인터의 라우팅 맵(source -> 파티션 이름)을 따라
+      에이전트가 대상 파일의 파티션만 검색합니다.
+
+    전체 재구축은 블루/그린 방식입니다. 새 세대(<이름>__g<버전>) 컬렉션에 기록하고 스모크 검사를 통과하면
+    포인터를 한 번에 바꾸며, 그동안 에이전트는 기존 세대를 계속 검색합니다. 이전 세대는 COLLECTION_GC_GRACE_SECONDS 뒤 삭제.
+    증분이면 활성 컬렉션에 청크 ID(내용 해시) 차이만 반영하고 삭제된 파일의 청크는 지웁니다.
+    임베딩과 upsert는 INGESTION_BATCH_SIZE 단위로 수행하므로 메모리 사용량은 배치 크기에 비례합니다.
+    임베딩은 encoder가 계산하며, 이전 실행에서 본 청크 본문은 캐시된 벡터를 재사용합니다.
+    임베딩과 Chroma 기록 시간은 profiler의 embedding / chroma_write 단계로 파일별로 측정됩니다.
+    """
+
+    def __init__(self, client, encoder: ChunkEncoder, version: str, full_rebuild: bool,
+                 batch_size: int = INGESTION_BATCH_SIZE, profiler: Optional[IngestionProfiler] = None):
+        self.client = client
+        self.profiler = profiler or IngestionProfiler(cprofile=False)
+        self.encoder = encoder
+        self.version = version
+        self.full_rebuild = full_rebuild
+        self.batch_size = batch_size
+        self.chunks_written = 0
+        self.chunks_deleted = 0
+        self.chunks_moved = 0
+        self.sources: set = set()
+        # 전체 재구축에서 목록에 있었지만 기록되지 않은 파일 (허용 범위 내면 교체는 진행, 매니페스트에 없으므로 다음 증분 때 재시도)
+        self.missing_sources: List[str] = []
+        self._started = False
+
+        pointer = read_pointer(client, CHROMA_COLLECTION_NAME)
+        self.retired: Dict[str, float] = dict(pointer.get("retired", {}))
+        self.routing_map: Dict[str, str] = {} if full_rebuild else dict(pointer.get("routing_map", {}))
+        if full_rebuild:
+            self.generation = version
+            self.data_collection = generation_name(CHROMA_COLLECTION_NAME, version)
+            # 스모크 검사용: 교체 대상(활성 세대)의 원본 파일 수
+            self.previous_source_count = self._active_source_count(pointer)
+        else:
+            # 이전 형식의 포인터(세대/활성 컬렉션 없음)는 레지스트리 자체가 데이터 컬렉션
+            self.generation = pointer.get("generation", "")
+            self.data_collection = pointer.get("active_collection") or CHROMA_COLLECTION_NAME
+
+    def _active_source_count(self, pointer: Dict) -> int:
+        if pointer.get("layout") == "per_source":
+            return len(pointer.get("routing_map", {}))
+        try:
+            active = self.client.get_collection(name=pointer.get("active_collection") or CHROMA_COLLECTION_NAME)
+            return len(collection_sources(active))
+        except Exception:
+            return 0
+
+    def begin(self) -> None:
+        """첫 기록 직전에 호출되어 (전체 재구축이면) 새 세대의 데이터 컬렉션을 만듭니다. 활성 세대는 건드리지 않습니다."""
+        if self._started:
+            return
+        self._started = True
+        if self.full_rebuild and COLLECTION_LAYOUT != "per_source":
+            with self.profiler.stage("chroma_write"):
+                _reset_collection(
+                    self.client, self.data_collection, {"ingestion_version": self.version, "layout": "single"}
+                )
+
+    def _retire(self, name: str) -> None:
+        # 에이전트가 아직 이전 포인터로 조회할 수 있으므로 바로 지우지 않고 유예 후 정리
+        self.retired.setdefault(name, time.time())
+
+    def _upsert(self, collection_name: str, documents: List[Document], ids: List[str]) -> None:
+        # 임베딩은 ChunkEncoder(청크 해시 캐시)로 미리 계산하고, 벡터를 직접 upsert
+        collection = self.client.get_collection(name=collection_name)
+        for start in range(0, len(documents), self.batch_size):
+            batch = documents[start:start + self.batch_size]
+            texts = [doc.page_content for doc in batch]
+            source = batch[0].metadata.get("source")
+            with self.profiler.stage("embedding", items=len(batch), source=source):
+                vectors = self.encoder.encode(texts).tolist()
+            with self.profiler.stage("chroma_write", items=len(batch), source=source):
+                collection.upsert(
+                    ids=ids[start:start + self.batch_size],
+                    embeddings=vectors,
+                    documents=texts,
+                    metadatas=[doc.metadata for doc in batch]
+                )
+        self.chunks_written += len(documents)
+
+    def remove_source(self, source: str, old_ids: List[str]) -> None:
+        """삭제된 파일의 청크를 제거합니다. (per_source면 파티션을 포인터에서 빼고 유예 후 삭제)"""
+        self.begin()
+        if COLLECTION_LAYOUT != "per_source":
+            collection = self.client.get_collection(name=self.data_collection)
+            with self.profiler.stage("chroma_write", items=len(old_ids), source=source):
+                for start in range(0, len(old_ids), DELETE_BATCH_SIZE):
+                    collection.delete(ids=old_ids[start:start + DELETE_BATCH_SIZE])
+        elif source in self.routing_map:
+            self._retire(self.routing_map.pop(source))
+        logging.info(f"Removed chunks of deleted file '{source}'")
+
+    def _apply_diff(self, collection_name: str, source: str, documents: List[Document],
+                    ids: List[str], old_ids: List[str]) -> None:
+        """
+        직전 청크 ID 목록(파일 내 순서)과 비교하여 바뀐 청크만 반영합니다.
+        - 사라진 ID: 삭제 / 새 ID: 임베딩 후 upsert
+        - 내용이 같지만 위치가 바뀐 ID: 메타데이터(chunk_id)만 갱신 (재임베딩 없음)
+        중복 제거로 다른 파일의 대표 청크를 참조하는 위치는 old_ids에서 None이며 비교에서 제외됩니다.
+        """
+        collection = self.client.get_collection(name=collection_name)
+        old_positions = {chunk_id: i for i, chunk_id in enumerate(old_ids) if chunk_id is not None}
+        current = set(ids)
+        stale = [chunk_id for chunk_id in old_positions if chunk_id not in current]
+        added = [i for i, chunk_id in enumerate(ids) if chunk_id not in old_positions]
+        moved = [
+            i for i, chunk_id in enumerate(ids)
+            if chunk_id in old_positions and old_positions[chunk_id] != documents[i].metadata.get("chunk_id")
+        ]
+
+        # 같은 chunk_id를 가진 청크가 잠시라도 둘이 되지 않도록 삭제를 먼저 수행
+        with self.profiler.stage("chroma_write", items=len(stale) + len(moved), source=source):
+            for start in range(0, len(stale), DELETE_BATCH_SIZE):
+                collection.delete(ids=stale[start:start + DELETE_BATCH_SIZE])
+            for start in range(0, len(moved), self.batch_size):
+                batch = moved[start:start + self.batch_size]
+                collection.update(ids=[ids[i] for i in batch], metadatas=[documents[i].metadata for i in batch])
+        self._upsert(collection_name, [documents[i] for i in added], [ids[i] for i in added])
+        self.chunks_deleted += len(stale)
+        self.chunks_moved += len(moved)
+        logging.info(
+            f"'{source}': {len(added)} added, {len(stale)} deleted, {len(moved)} moved, "
+            f"{len(ids) - len(added) - len(moved)} unchanged chunks"
         )
-        splits = text_splitter.split_documents(page_docs)
-        logging.info(f"Split completed: {len(splits)} text chunks created.")
 
-        # 문맥 확장을 위해 청크에 순서 ID와 안정적인 Chroma ID를 부여.
-        logging.info("Adding sequential 'chunk_id' metadata and generating stable IDs...")
-        
-        chunk_ids = []
-        for i, doc in enumerate(splits):
-            doc.metadata["chunk_id"] = i 
-            source_file = doc.metadata.get("source", "unknown_file")
-            chunk_ids.append(f"{source_file}_chunk_{i}")
+    def update_metadata(self, updates: Dict[str, Dict], documents: Optional[Dict[str, str]] = None) -> None:
+        """
+        중복 제거 참조가 바뀐 대표 청크의 메타데이터를 갱신합니다. (None 값은 해당 키 삭제)
+        documents가 있으면 저장 본문도 바꾸며, 벡터는 같은 본문(공백만 다름)이므로 기존 임베딩을 그대로 씁니다.
+        """
+        if not updates and not documents:
+            return
+        collection = self.client.get_collection(name=self.data_collection)
+        chunk_ids = sorted(updates)
+        with self.profiler.stage("chroma_write", items=len(chunk_ids)):
+            for start in range(0, len(chunk_ids), self.batch_size):
+                batch = chunk_ids[start:start + self.batch_size]
+                collection.update(ids=batch, metadatas=[updates[chunk_id] for chunk_id in batch])
+            if documents:
+                # 본문만 넘기면 Chroma가 컬렉션 임베딩 함수로 다시 임베딩하므로 기존 벡터를 함께 전달
+                stored = collection.get(ids=sorted(documents), include=["embeddings"])
+                collection.update(
+                    ids=stored["ids"], embeddings=list(stored["embeddings"]),
+                    documents=[documents[chunk_id] for chunk_id in stored["ids"]]
+                )
+
+    def write_source(self, source: str, documents: List[Document], ids: List[str], old_ids: List[str]) -> None:
+        """한 파일의 청크를 기록합니다. (증분 시 직전 청크 ID와 비교하여 바뀐 청크만 반영)"""
+        self.begin()
+        self.sources.add(source)
+        if COLLECTION_LAYOUT != "per_source":
+            logging.info(f"Writing {len(documents)} chunks of '{source}' into '{self.data_collection}'")
+            self._apply_diff(self.data_collection, source, documents, ids, old_ids)
+            return
+
+        name = partition_collection_name(source, self.generation)
+        logging.info(f"Ingesting {len(documents)} chunks of '{source}' into partition '{name}'")
+        previous = self.routing_map.get(source)
+        if old_ids and previous == name:
+            self._apply_diff(name, source, documents, ids, old_ids)
+        else:
+            with self.profiler.stage("chroma_write", source=source):
+                _reset_collection(self.client, name, {"ingestion_version": self.version, "source": source})
+            self._upsert(name, documents, ids)
+            if previous:
+                self._retire(previous)
+        self.routing_map[source] = name
+
+    def _locate(self, source: str):
+        """스모크 질의용: source를 검색할 (컬렉션, where 필터)"""
+        if COLLECTION_LAYOUT != "per_source":
+            return self.client.get_collection(name=self.data_collection), {"source": source}
+        name = self.routing_map.get(source)
+        return (self.client.get_collection(name=name), None) if name else (None, None)
+
+    def finish(self, embed_query=None, expected_sources: Iterable[str] = ()) -> List:
+        """
+        (전체 재구축이면 스모크 검사 후) 포인터를 새 버전으로 교체하고, 데이터가 담긴 컬렉션 목록을 반환합니다.
+        expected_sources(버킷의 파일 목록) 중 기록되지 않은 파일(파티셔닝 실패/시간 초과)이 허용 비율을 넘어도 검사에 실패합니다.
+        스모크 검사에 실패하면 새 세대를 지우고 RuntimeError를 일으키며, 에이전트는 기존 세대를 계속 사용합니다.
+        """
+        per_source = COLLECTION_LAYOUT == "per_source"
+        active = set(self.routing_map.values()) if per_source else {self.data_collection}
+        collections = [self.client.get_collection(name=name) for name in sorted(active)]
+
+        if self.full_rebuild:
+            self.missing_sources = sorted(set(expected_sources) - self.sources)
+            failures = run_smoke_checks(
+                collections, self._locate, self.chunks_written, embed_query,
+                missing_sources=self.missing_sources,
+                source_count=len(self.sources),
+                previous_source_count=self.previous_source_count,
+            )
+            if failures:
+                for name in active:
+                    self.client.delete_collection(name=name)
+                raise RuntimeError(
+                    f"Smoke checks failed for generation {self.generation}, keeping the active version: {failures}"
+                )
+            logging.info(f"Smoke checks passed for generation {self.generation}")
+            # 직전 세대의 컬렉션은 아래 GC에서 교체 시각이 기록되어 유예 후 삭제됨
+
+        self.retired = collect_garbage(self.client, CHROMA_COLLECTION_NAME, active, self.retired)
+        publish_pointer(self.client, CHROMA_COLLECTION_NAME, {
+            "ingestion_version": self.version,
+            "layout": "per_source" if per_source else "single",
+            "generation": self.generation,
+            "active_collection": None if per_source else self.data_collection,
+            "routing_map": self.routing_map if per_source else None,
+            "retired": self.retired,
+            # 에이전트가 참조 청크(ref__<파일 해시> 메타데이터)까지 검색하도록 알림
+            "dedup": True if DEDUP_ENABLED else None,
+        })
+        return collections
+
+def prepartition_shard(s3_client, shard: Tuple[int, int]) -> None:
+    """
+    버킷 샤드 하나의 PDF를 파티셔닝하여 공유 파티션 캐시(PARTITION_CACHE_DIR)만 채웁니다.
+    ChromaDB와 매니페스트는 건드리지 않으며, 이후 샤드 없이 실행한 인제스천이 캐시 적중으로 OCR을 생략합니다.
+    """
+    if default_partition_cache() is None:
+        raise ValueError("INGESTION_SHARD requires PARTITION_CACHE_DIR (shared between shard workers)")
+    pdf_objects = list_pdf_objects(s3_client, MINIO_BUCKET, shard)
+    for result in partition_documents_from_minio(s3_client, MINIO_BUCKET, sorted(pdf_objects)):
+        result.elements = []
+    logging.info(f"Shard {shard[0]}/{shard[1]} partitioned into the shared partition cache.")
 
-        # --- 4. Embed ---
-        embeddings = load_embedding_model(EMBEDDING_MODEL, DEVICE_TYPE)
+def manifest_settings() -> Dict:
+    """매니페스트에 기록하는 설정. 이 값이 바뀌면 기존 청크를 재사용할 수 없어 전체 재구축합니다."""
+    return {
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+        "embedding_model": EMBEDDING_MODEL,
+        "collection": CHROMA_COLLECTION_NAME,
+        "layout": COLLECTION_LAYOUT,
+        # 중복 제거를 켠 경우에만 기록 (끈 상태의 기존 매니페스트는 그대로 호환)
+        **({"dedup": DedupIndex.settings()} if DEDUP_ENABLED else {}),
+    }
 
-        # --- 5. Filter Metadata ---
-        logging.info("Filtering complex metadata for ChromaDB compatibility...")
-        filtered_splits = filter_complex_metadata(splits)
+def stat_pdf_objects(s3_client, bucket: str, keys: Iterable[str]) -> Dict[str, str]:
+    """지정한 객체들만 조회하여 {object key: ETag}를 반환합니다. (없는 객체는 제외 -> 삭제로 처리)"""
+    pdf_objects = {}
+    for key in keys:
+        try:
+            pdf_objects[key] = s3_client.head_object(Bucket=bucket, Key=key).get('ETag', '').strip('"')
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') not in ('404', 'NoSuchKey', 'NotFound'):
+                raise
+    return pdf_objects
+
+def main_ingestion_pipeline(keys: Optional[Iterable[str]] = None, embeddings=None) -> bool:
+    """
+    전체 데이터 인제스천(Ingestion) 파이프라인을 실행합니다.
+    0. MinIO 객체 목록(ETag)을 매니페스트와 비교하여 신규/변경/삭제 파일 결정
+       (매니페스트가 없거나 청크/임베딩 설정이 바뀌었거나 INGESTION_FULL_REBUILD=true 이면 전체 재구축)
+    1. 신규/변경 PDF만 로드 및 Unstructured 파티셔닝 (병렬, 파일 단위로 결과 수신)
+    파일마다 아래 2~6을 바로 수행하고 다음 파일로 넘어가므로, 전체 코퍼스를 메모리에 올리지 않습니다.
+    2. [수정됨] 파일명(filename)별로 먼저 그룹화, 그 다음 페이지별로 그룹화
+    3. Recursive 청킹 (Overlap 적용, 파일 내 chunk_id)
+    4. 메타데이터 필터링 및 중복 청크 제거 (CHUNK_DEDUP, 본문이 같은 다른 파일의 대표 청크를 참조로 연결)
+    5~6. 임베딩 후 원격 ChromaDB에 배치 단위 upsert (증분 시 청크 ID 차이만 반영, 삭제 파일의 청크 삭제)
+         전체 재구축은 새 세대 컬렉션에 기록 -> 스모크 검사 -> 레지스트리 포인터 교체 (이전 세대는 유예 후 삭제)
+    7. 하이브리드 검색용 어휘(BM25) 색인 생성 (저장된 전체 청크 기준)
+    8. 에이전트 프로세스 내 검색용 벡터 스냅샷 내보내기
+    9. 매니페스트 저장
+    INGESTION_SHARD가 지정되면 해당 샤드의 파티셔닝(1)만 수행하여 공유 파티션 캐시를 채웁니다.
+
+    keys가 주어지면(이벤트 기반 인제스천 서비스) 버킷 전체를 나열하지 않고 해당 객체만 조회하여 증분 반영합니다.
+    (전체 재구축이 필요한 상태이면 keys와 관계없이 버킷 전체를 처리)
+    embeddings가 주어지면(create_embeddings()로 미리 만든 모델, 상주 서비스) 실행마다 모델을 다시 로드하지 않으며,
+    닫는 것은 호출자 책임입니다.
+    성공하면 True, 오류로 중단되면 False를 반환합니다.
+    실행이 끝나면(실패 포함) 단계별 시간/CPU/RSS/처리량 보고서를 INGESTION_PROFILE_PATH에 기록합니다.
+    """
+    profiler = IngestionProfiler()
+    ok = _run_pipeline(keys, profiler, embeddings)
+    if INGESTION_PROFILE_PATH:
+        try:
+            profiler.write(INGESTION_PROFILE_PATH, ok=ok)
+        except Exception as e:
+            logging.warning(f"Failed to write ingestion profile '{INGESTION_PROFILE_PATH}': {e}")
+    return ok
+
+def _run_pipeline(keys: Optional[Iterable[str]], profiler: IngestionProfiler, embeddings=None) -> bool:
+    owns_embeddings = embeddings is None
+    try:
+        # --- 0. Diff against manifest ---
+        s3_client = create_s3_client(MINIO_ENDPOINT_URL, MINIO_ACCESS_KEY, MINIO_SECRET_KEY)
+        shard = parse_shard(INGESTION_SHARD)
+        if shard is not None:
+            profiler.meta["mode"] = f"shard {shard[0]}/{shard[1]}"
+            prepartition_shard(s3_client, shard)
+            return True
 
-        # --- 6. Store to Remote ChromaDB ---
         logging.info(f"Connecting to ChromaDB server at {CHROMA_HOST}:{CHROMA_PORT}")
         client = chromadb.HttpClient(
             host=CHROMA_HOST, 
             port=CHROMA_PORT
         )
-        
-        # DB를 새로 구축할 때마다 기존 컬렉션을 삭제하여 중복 방지
-        try:
-            logging.warning(f"Attempting to delete existing collection: '{CHROMA_COLLECTION_NAME}' for a fresh start.")
-            client.delete_collection(name=CHROMA_COLLECTION_NAME)
-            logging.info(f"Successfully deleted old collection.")
-        except Exception:
-            logging.info(f"Collection '{CHROMA_COLLECTION_NAME}' not found, creating new one.")
 
-        logging.info(f"Ingesting {len(filtered_splits)} chunks into new collection: '{CHROMA_COLLECTION_NAME}'")
-        
-        Chroma.from_documents(
-            documents=filtered_splits,
-            embedding=embeddings,
-            client=client,
-            collection_name=CHROMA_COLLECTION_NAME,
-            ids=chunk_ids
+        manifest = IngestionManifest.load(INGESTION_MANIFEST_PATH, settings=manifest_settings())
+        dedup_index = DedupIndex.load(DEDUP_INDEX_PATH) if DEDUP_ENABLED else None
+        if CHUNK_DEDUP and not DEDUP_ENABLED:
+            logging.warning("CHUNK_DEDUP is ignored with COLLECTION_LAYOUT=per_source")
+        incremental = (
+            not INGESTION_FULL_REBUILD
+            and manifest.is_compatible()
+            and collection_exists(client, CHROMA_COLLECTION_NAME)
+            # 중복 제거 색인이 매니페스트와 같은 실행에서 저장된 것이어야 참조 관계를 이어서 쓸 수 있음
+            and (dedup_index is None or dedup_index.version == manifest.ingestion_version)
         )
+        scope = set(keys) if keys is not None and incremental else None
+        profiler.meta["mode"] = "incremental" if incremental else "full_rebuild"
+        with profiler.stage("list_objects") as frame:
+            if scope is not None:
+                pdf_objects = stat_pdf_objects(s3_client, MINIO_BUCKET, sorted(scope))
+            else:
+                pdf_objects = list_pdf_objects(s3_client, MINIO_BUCKET)
+            frame.items = len(pdf_objects)
+        if scope is None:
+            if not pdf_objects:
+                logging.info("No PDF files in MinIO bucket. Exiting pipeline.")
+                return True
+
+        known_digests = {}
+        if incremental:
+            pending = sorted(key for key, etag in pdf_objects.items() if not manifest.is_unchanged(key, etag))
+            if scope is None:
+                removed = manifest.removed_keys(pdf_objects)
+            else:
+                removed = sorted(key for key in scope - set(pdf_objects) if key in manifest.files)
+            logging.info(
+                f"Incremental ingestion: {len(pending)} new/changed, {len(removed)} removed, "
+                f"{len(pdf_objects) - len(pending)} unchanged files"
+            )
+            if not pending and not removed:
+                logging.info("Knowledge base is up to date. Nothing to ingest.")
+                expire_retired(client, CHROMA_COLLECTION_NAME)
+                return True
+        else:
+            logging.info("Full rebuild: manifest missing, settings changed or rebuild requested.")
+            pending = sorted(pdf_objects)
+            removed = []
+            # 내용이 그대로인 파일은 직전 해시로 파티션 캐시를 바로 조회
+            known_digests = {
+                key: entry["sha256"] for key, entry in manifest.files.items()
+                if entry.get("sha256") and entry.get("etag") == pdf_objects.get(key)
+            }
+            manifest.files = {}
+            if dedup_index is not None:
+                dedup_index = DedupIndex(DEDUP_INDEX_PATH)
+
+        if owns_embeddings:
+            with profiler.stage("load_model"):
+                embeddings = create_embeddings()
+        # 샤딩 시 워커마다 EMBEDDING_BATCH_SIZE개씩 받도록 배치 확대
+        encode_batch = EMBEDDING_BATCH_SIZE * EMBEDDING_WORKERS
+        encoder = ChunkEncoder(embeddings, default_chunk_cache(EMBEDDING_MODEL), encode_batch)
+        # 에이전트 측 검색 결과 캐시는 이 버전이 바뀌면 자동으로 무효화됨
+        ingestion_version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        profiler.meta["ingestion_version"] = ingestion_version
+        writer = ChromaWriter(
+            client, encoder, ingestion_version, full_rebuild=not incremental,
+            batch_size=max(INGESTION_BATCH_SIZE, encode_batch), profiler=profiler
+        )
+
+        for key in removed:
+            if dedup_index is not None:
+                # 다른 파일이 참조하는 대표 청크는 지우지 않고 그 파일로 소유권을 넘김
+                writer.remove_source(key, dedup_index.drop_source(key))
+                writer.update_metadata(*dedup_index.take_updates())
+            else:
+                writer.remove_source(key, manifest.chunk_ids(key))
+            manifest.forget(key)
+
+        # --- 1~6. Partition -> Group & Split -> Filter -> Embed & Upsert (파일 단위 스트리밍) ---
+        changed_files = 0
+        results = partition_documents_from_minio(
+            s3_client, MINIO_BUCKET, pending, manifest if incremental else None, known_digests, profiler
+        )
+        # 파티셔닝 결과를 기다린 시간 (다운로드/OCR은 백그라운드에서 진행되며 download / partition_worker로 따로 기록)
+        for result in profiler.iterate("partition_wait", results):
+            if result.skipped:
+                manifest.touch(result.key, pdf_objects[result.key])
+                continue
+            with profiler.stage("chunking", source=result.key) as frame:
+                splits, chunk_ids = build_chunks(result.elements)
+                frame.items = len(splits)
+            result.elements = []
+            with profiler.stage("filter_metadata", items=len(splits), source=result.key):
+                filtered_splits = filter_complex_metadata(splits)
+            old_ids = manifest.chunk_ids(result.key)
+            if dedup_index is not None:
+                # 매니페스트에는 위치별 ID(참조 위치는 대표 청크 ID)를 기록하고, 소유 청크만 저장
+                with profiler.stage("dedup", items=len(filtered_splits), source=result.key):
+                    filtered_splits, owned_ids, chunk_ids, old_ids = dedup_index.assign(
+                        result.key, filtered_splits, chunk_ids, old_ids
+                    )
+                writer.write_source(result.key, filtered_splits, owned_ids, old_ids)
+                writer.update_metadata(*dedup_index.take_updates())
+            else:
+                writer.write_source(result.key, filtered_splits, chunk_ids, old_ids)
+            manifest.record(result.key, pdf_objects[result.key], result.sha256, chunk_ids, ingestion_version)
+            changed_files += 1
+
+        if not changed_files and not incremental:
+            # 전체 재구축에서 기록된 파일이 없으면(모두 파티셔닝 실패 등) 비워진 매니페스트를 저장하지 않음
+            logging.error(f"Full rebuild wrote no files out of {len(pending)} listed. Keeping the active version.")
+            return False
+        if not changed_files and not removed:
+            manifest.save(manifest.ingestion_version)
+            logging.info("No content changes detected. Exiting pipeline.")
+            expire_retired(client, CHROMA_COLLECTION_NAME)
+            return True
+        # 전체 재구축이면 스모크 검사 통과 후에만 포인터가 새 세대로 바뀜 (실패 시 예외, 매니페스트 미저장)
+        with profiler.stage("finalize"):
+            collections = writer.finish(embed_query=embeddings.embed_query, expected_sources=pdf_objects)
+        profiler.meta.update(
+            files_changed=changed_files, files_removed=len(removed), chunks_written=writer.chunks_written,
+            files_missing=writer.missing_sources
+        )
+        logging.info(
+            f"Stored {writer.chunks_written} chunks from {changed_files} files "
+            f"({writer.chunks_deleted} deleted, {writer.chunks_moved} re-positioned) "
+            f"(embedding: {encoder.stats()}, peak RSS {peak_rss_mb():.0f} MiB)"
+        )
+        records = iter_collection_records(collections, include=["documents", "metadatas"])
+        if dedup_index is not None:
+            stats = dedup_index.stats()
+            logging.info(
+                f"Chunk dedup: {stats['logical_chunks']} chunks -> {stats['stored_chunks']} stored vectors "
+                f"({stats['logical_chunks'] - stats['stored_chunks']} collapsed, "
+                f"{stats['collapsed_this_run']} this run)"
+            )
+            # 참조 파일의 어휘 색인에도 대표 청크가 포함되도록 참조마다 한 번 더 색인
+            records = expand_references(records)
+
+        # --- 7. Lexical Index (BM25) ---
+        logging.info("Building lexical index for hybrid search...")
+        with profiler.stage("lexical_index") as frame:
+            lexical_index = build_lexical_index(records, version=ingestion_version)
+            save_lexical_index(lexical_index, LEXICAL_INDEX_PATH)
+            frame.items = sum(len(part["ids"]) for part in lexical_index["sources"].values())
+
+        # --- 8. In-process Vector Snapshot (VECTOR_BACKEND=local 용) ---
+        if EXPORT_VECTOR_SNAPSHOT:
+            logging.info("Exporting read-only vector snapshot for in-process search...")
+            with profiler.stage("snapshot_export"):
+                export_vector_snapshot(collections, VECTOR_SNAPSHOT_DIR, ingestion_version, dedup=DEDUP_ENABLED)
+
+        # --- 9. Manifest ---
+        with profiler.stage("save_state"):
+            if dedup_index is not None:
+                dedup_index.save(ingestion_version)
+            manifest.save(ingestion_version)
 
-        logging.info("Data ingestion pipeline completed successfully!")
+        logging.info(f"Data ingestion pipeline completed successfully! (peak RSS {peak_rss_mb():.0f} MiB)")
+        return True
 
     except Exception as e:
         logging.error(f"An error occurred during the ingestion pipeline: {e}", exc_info=True)
+        return False
+    finally:
+        if owns_embeddings and isinstance(embeddings, ShardedEmbeddings):
+            embeddings.close()
 
 if __name__ == "__main__":
-    main_ingestion_pipeline()
\ No newline at end of file
+    raise SystemExit(0 if main_ingestion_pipeline() else 1)
@@ -0,0 +1,62 @@
+import os
+import re
+import gzip
+import json
+import logging
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+# 에이전트 측 utils/lexical_index.py 의 토크나이저와 동일해야 함 (형식 버전으로 호환성 확인)
+LEXICAL_INDEX_FORMAT = 1
+NGRAM_SIZE = 2
+
+_WORD_PATTERN = re.compile(r"[0-9a-zA-Z가-힣]+")
+
+
+def tokenize(text: str, ngram_size: int = NGRAM_SIZE) -> List[str]:
+    """
+    한국어 규정집용 어휘 토크나이저.
+    단어(영숫자/한글 연속열) 자체와, 조사·어미 변화에 강하도록 단어 내부 문자 n-gram을 함께 생성합니다.
+    (예: 'SW캡스톤디자인' -> 'sw캡스톤디자인', 'sw', 'w캡', '캡스', ...)
+    """
+    tokens = []
+    for word in _WORD_PATTERN.findall(text.lower()):
+        tokens.append(word)
+        if len(word) > ngram_size:
+            tokens.extend(word[i:i + ngram_size] for i in range(len(word) - ngram_size + 1))
+    return tokens
+
+
+def build_lexical_index(records: Iterable[Tuple[str, str, Dict]], version: str) -> Dict:
+    """
+    (청크 ID, 본문, 메타데이터) 레코드로부터 원본 파일(source)별 BM25 역색인을 생성합니다.
+    레코드는 하나씩 소비하므로 본문 전체를 메모리에 올려 둘 필요가 없습니다.
+    postings는 {토큰: [[문서 위치, 빈도], ...]} 형태이며, 문서 위치는 파일별 ids 배열의 인덱스입니다.
+    """
+    sources: Dict[str, Dict] = {}
+    for chunk_key, text, meta in records:
+        source = (meta or {}).get("source", "unknown_file")
+        part = sources.setdefault(source, {"ids": [], "lengths": [], "postings": {}})
+        doc_idx = len(part["ids"])
+        tokens = tokenize(text)
+        part["ids"].append(chunk_key)
+        part["lengths"].append(len(tokens))
+        for term, tf in Counter(tokens).items():
+            part["postings"].setdefault(term, []).append([doc_idx, tf])
+
+    return {
+        "format": LEXICAL_INDEX_FORMAT,
+        "ngram_size": NGRAM_SIZE,
+        "version": version,
+        "sources": sources,
+    }
+
+
+def save_lexical_index(index: Dict, path: str) -> None:
+    """gzip 압축 JSON으로 원자적으로 저장합니다. (에이전트가 읽는 도중 교체되어도 안전)"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    logging.info(f"Lexical index saved: {path} ({os.path.getsize(path) / 1024:.1f} KiB, {len(index['sources'])} files)")
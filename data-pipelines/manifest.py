@@ -0,0 +1,94 @@
+import os
+import json
+import hashlib
+import logging
+from typing import Dict, List, Optional
+
+MANIFEST_FORMAT = 1
+
+
+def sha256_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class IngestionManifest:
+    """
+    직전 인제스천 결과를 기록하는 매니페스트 (증분 인제스천용).
+
+    {
+      "format": 1,
+      "ingestion_version": "20250101T000000Z",
+      "settings": {청크 크기/겹침, 임베딩 모델, 컬렉션 이름/레이아웃},
+      "files": {
+        "<object key>": {"etag": ..., "sha256": ..., "chunk_ids": [파일 내 순서대로의 청크 ID], "ingestion_version": ...}
+      }
+    }
+
+    settings가 현재 설정과 다르면 기존 청크를 재사용할 수 없으므로 전체 재구축 대상이 됩니다.
+    """
+
+    def __init__(self, path: str, settings: Dict, data: Optional[Dict] = None):
+        self.path = path
+        self.settings = settings
+        data = data or {}
+        self.ingestion_version: str = data.get("ingestion_version", "")
+        self.files: Dict[str, Dict] = data.get("files", {})
+        self._stored_settings: Dict = data.get("settings", {})
+
+    @classmethod
+    def load(cls, path: str, settings: Dict) -> "IngestionManifest":
+        if not os.path.exists(path):
+            return cls(path, settings)
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("format") != MANIFEST_FORMAT:
+                logging.warning(f"Unsupported manifest format {data.get('format')}, ignoring '{path}'")
+                return cls(path, settings)
+            return cls(path, settings, data)
+        except Exception as e:
+            logging.warning(f"Failed to read manifest '{path}', ignoring: {e}")
+            return cls(path, settings)
+
+    def is_compatible(self) -> bool:
+        """기존 청크를 재사용할 수 있는지 (매니페스트가 있고 청크/임베딩 설정이 동일한지)"""
+        return bool(self.files) and self._stored_settings == self.settings
+
+    def is_unchanged(self, key: str, etag: str) -> bool:
+        entry = self.files.get(key)
+        return entry is not None and entry.get("etag") == etag
+
+    def has_same_content(self, key: str, sha256: str) -> bool:
+        entry = self.files.get(key)
+        return entry is not None and entry.get("sha256") == sha256
+
+    def removed_keys(self, current_keys) -> List[str]:
+        return sorted(set(self.files) - set(current_keys))
+
+    def chunk_ids(self, key: str) -> List[str]:
+        return list(self.files.get(key, {}).get("chunk_ids", []))
+
+    def record(self, key: str, etag: str, sha256: str, chunk_ids: List[str], version: str) -> None:
+        self.files[key] = {"etag": etag, "sha256": sha256, "chunk_ids": chunk_ids, "ingestion_version": version}
+
+    def touch(self, key: str, etag: str) -> None:
+        """내용은 같고 ETag만 바뀐 경우(동일 파일 재업로드) ETag만 갱신"""
+        self.files[key]["etag"] = etag
+
+    def forget(self, key: str) -> None:
+        self.files.pop(key, None)
+
+    def save(self, version: str) -> None:
+        self.ingestion_version = version
+        self._stored_settings = self.settings
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "format": MANIFEST_FORMAT,
+                "ingestion_version": version,
+                "settings": self.settings,
+                "files": self.files,
+            }, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+        logging.info(f"Ingestion manifest saved: {self.path} ({len(self.files)} files, version {version})")
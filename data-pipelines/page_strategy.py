@@ -0,0 +1,65 @@
+import os
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from pdfminer.high_level import extract_pages
+from pdfminer.layout import LTTextContainer, LTRect, LTLine, LTCurve
+from pypdf import PdfReader, PdfWriter
+
+# 페이지 분류 기준
+PAGE_MIN_TEXT_CHARS = int(os.getenv("PAGE_MIN_TEXT_CHARS", 40))    # 이보다 텍스트가 적으면 스캔 이미지로 간주
+PAGE_TABLE_MIN_RULES = int(os.getenv("PAGE_TABLE_MIN_RULES", 8))   # 괘선(선/사각형) 수가 이 이상이면 표 포함 페이지
+
+TEXT, TABLE, SCANNED = "text", "table", "scanned"
+# 분류별 파티셔닝 전략: 텍스트 레이어만으로 충분한 페이지는 fast, 나머지는 레이아웃 모델/OCR(hi_res)
+STRATEGY_BY_CLASS = {TEXT: "fast", TABLE: "hi_res", SCANNED: "hi_res"}
+
+
+def classify_page(layout) -> str:
+    chars = 0
+    rules = 0
+    for obj in layout:
+        if isinstance(obj, LTTextContainer):
+            chars += len(obj.get_text().strip())
+        elif isinstance(obj, (LTRect, LTLine, LTCurve)):
+            rules += 1
+    if chars < PAGE_MIN_TEXT_CHARS:
+        return SCANNED
+    if rules >= PAGE_TABLE_MIN_RULES:
+        return TABLE
+    return TEXT
+
+
+def classify_pages(path: str) -> List[str]:
+    """
+    pdfminer 레이아웃으로 각 페이지를 text / table / scanned 로 분류합니다.
+    - scanned: 텍스트 레이어가 (거의) 없음 -> OCR 필요
+    - table: 표 괘선으로 보이는 선/사각형이 많음 -> 표 구조 추론 필요
+    - text: 텍스트 레이어만으로 추출 가능
+    """
+    return [classify_page(layout) for layout in extract_pages(path)]
+
+
+def plan_page_runs(labels: List[str]) -> List[Tuple[str, int, int]]:
+    """페이지 분류를 같은 전략의 연속 구간 [(전략, 시작 페이지, 끝 페이지)] (1-based)로 묶습니다."""
+    runs: List[Tuple[str, int, int]] = []
+    for page, label in enumerate(labels, start=1):
+        strategy = STRATEGY_BY_CLASS[label]
+        if runs and runs[-1][0] == strategy and runs[-1][2] == page - 1:
+            runs[-1] = (strategy, runs[-1][1], page)
+        else:
+            runs.append((strategy, page, page))
+    return runs
+
+
+def write_page_range(reader: PdfReader, first: int, last: int, out_path: str) -> str:
+    writer = PdfWriter()
+    for page in range(first - 1, last):
+        writer.add_page(reader.pages[page])
+    with open(out_path, "wb") as f:
+        writer.write(f)
+    return out_path
+
+
+def class_counts(labels: List[str]) -> Dict[str, int]:
+    return dict(Counter(labels))
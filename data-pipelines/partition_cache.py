@@ -0,0 +1,65 @@
+import os
+import gzip
+import json
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Optional
+
+
+class PartitionCache:
+    """
+    partition_pdf 결과(요소 스트림)를 디스크에 보관하는 캐시.
+    키는 PDF 내용의 SHA-256과 파티셔너 설정 해시이며, 값은 요소별
+    {"text", "category", "page_number", "text_as_html"} 레코드를 한 줄씩 담은 gzip JSONL 입니다.
+
+    root/<sha256 앞 2자리>/<sha256>-<설정 해시>.jsonl.gz
+    """
+
+    def __init__(self, root: str, settings: Dict):
+        self.root = root
+        self.settings_key = hashlib.sha1(json.dumps(settings, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _path(self, sha256: str) -> str:
+        return os.path.join(self.root, sha256[:2], f"{sha256}-{self.settings_key}.jsonl.gz")
+
+    def get(self, sha256: str) -> Optional[List[Dict]]:
+        path = self._path(sha256)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                records = [json.loads(line) for line in f]
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable partition cache entry '{path}': {e}")
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return records
+
+    def put(self, sha256: str, records: List[Dict]) -> None:
+        path = self._path(sha256)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logging.warning(f"Failed to write partition cache entry '{path}': {e}")
+
+    def stats(self) -> Dict[str, object]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,367 @@
+import os
+import time
+import hashlib
+import queue
+import logging
+import tempfile
+import threading
+import multiprocessing as mp
+from multiprocessing.connection import wait
+from dataclasses import dataclass, field
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+
+import unstructured
+from pypdf import PdfReader
+from unstructured.partition.pdf import partition_pdf
+
+from partition_cache import PartitionCache
+from page_strategy import (
+    classify_pages, plan_page_runs, write_page_range, class_counts, PAGE_MIN_TEXT_CHARS, PAGE_TABLE_MIN_RULES
+)
+
+# 파티셔닝 병렬도 / 파일당 제한 시간
+PARTITION_WORKERS = int(os.getenv("PARTITION_WORKERS", min(4, os.cpu_count() or 1)))
+PARTITION_TIMEOUT_SECONDS = float(os.getenv("PARTITION_TIMEOUT_SECONDS", 1800))
+# 동시 다운로드 수 (다운로드는 임시 파일로 스트리밍)
+DOWNLOAD_CONCURRENCY = int(os.getenv("DOWNLOAD_CONCURRENCY", 4))
+
+# 파티셔닝 결과 캐시 위치 (빈 문자열이면 사용 안 함). 아래 설정이 바뀌면 캐시 키도 바뀜
+PARTITION_CACHE_DIR = os.getenv("PARTITION_CACHE_DIR", "./partition_cache")
+# auto: 페이지별로 분류하여 표/스캔 페이지만 hi_res, 나머지는 fast / hi_res, fast: 모든 페이지에 동일 전략
+PARTITION_STRATEGY = os.getenv("PARTITION_STRATEGY", "auto")
+PARTITIONER_SETTINGS = {
+    "strategy": PARTITION_STRATEGY,
+    "infer_table_structure": True,
+    "languages": ["kor"],
+    "unstructured": getattr(unstructured, "__version__", "unknown"),
+    **({"page_min_text_chars": PAGE_MIN_TEXT_CHARS, "page_table_min_rules": PAGE_TABLE_MIN_RULES}
+       if PARTITION_STRATEGY == "auto" else {}),
+}
+
+
+@dataclass
+class PartitionResult:
+    key: str
+    sha256: str = ""
+    elements: List = field(default_factory=list)
+    pages: int = 0
+    seconds: float = 0.0
+    error: str = ""
+    skipped: bool = False  # 내용이 동일하여 파티셔닝을 생략한 경우
+    cached: bool = False   # 파티션 캐시에서 읽은 경우
+    # 전략별 {"pages", "seconds"} 및 페이지 분류별 수 ({"classes": {...}})
+    strategy_stats: Dict = field(default_factory=dict)
+
+
+@dataclass
+class ElementMetadata:
+    filename: str
+    page_number: Optional[int] = None
+    text_as_html: Optional[str] = None
+
+
+@dataclass
+class CachedElement:
+    """
+    청킹에 필요한 정보만 남긴 경량 요소 (unstructured Element와 같은 방식으로
+    str(el), el.category, el.metadata.page_number / filename / text_as_html 로 접근).
+    """
+    text: str
+    category: str
+    metadata: ElementMetadata
+
+    def __str__(self) -> str:
+        return self.text
+
+
+def element_records(elements: List) -> List[Dict]:
+    """unstructured 요소를 캐시/프로세스 간 전달용 레코드로 변환합니다."""
+    return [
+        {
+            "text": str(el),
+            "category": el.category,
+            "page_number": el.metadata.page_number,
+            "text_as_html": getattr(el.metadata, "text_as_html", None),
+        }
+        for el in elements
+    ]
+
+
+def elements_from_records(records: List[Dict], filename: str) -> List[CachedElement]:
+    return [
+        CachedElement(
+            text=record["text"],
+            category=record["category"],
+            metadata=ElementMetadata(filename, record.get("page_number"), record.get("text_as_html")),
+        )
+        for record in records
+    ]
+
+
+def default_partition_cache() -> Optional[PartitionCache]:
+    return PartitionCache(PARTITION_CACHE_DIR, PARTITIONER_SETTINGS) if PARTITION_CACHE_DIR else None
+
+
+def _partition_pages(path: str, pdf_key: str, strategy: str) -> List[Dict]:
+    elements = partition_pdf(
+        filename=path,
+        infer_table_structure=PARTITIONER_SETTINGS["infer_table_structure"] and strategy == "hi_res",
+        strategy=strategy,
+        languages=PARTITIONER_SETTINGS["languages"],
+        metadata_filename=pdf_key
+    )
+    return element_records(elements)
+
+
+def partition_pdf_file(path: str, pdf_key: str) -> Tuple[List[Dict], Dict]:
+    """
+    PDF 한 개를 unstructured로 파티셔닝하여 (요소 레코드, 전략별 통계)를 반환합니다.
+
+    PARTITION_STRATEGY=auto 이면 먼저 페이지를 분류(page_strategy.classify_pages)하고,
+    같은 전략의 연속 페이지 구간을 별도 PDF로 잘라 구간별 전략(fast / hi_res)으로 파티셔닝한 뒤
+    원래 페이지 번호로 되돌려 페이지 순서대로 합칩니다. 분류에 실패하면 전체를 hi_res로 처리합니다.
+    """
+    stats: Dict = {}
+
+    def timed(strategy: str, pages: int, target: str) -> List[Dict]:
+        started = time.monotonic()
+        records = _partition_pages(target, pdf_key, strategy)
+        entry = stats.setdefault(strategy, {"pages": 0, "seconds": 0.0})
+        entry["pages"] += pages
+        entry["seconds"] += time.monotonic() - started
+        return records
+
+    if PARTITION_STRATEGY != "auto":
+        records = timed(PARTITION_STRATEGY, 0, path)
+        stats[PARTITION_STRATEGY]["pages"] = len({r["page_number"] for r in records if r["page_number"]})
+        return records, stats
+
+    try:
+        labels = classify_pages(path)
+    except Exception as e:
+        logging.warning(f"Page classification failed for '{pdf_key}', using hi_res for all pages: {e}")
+        records = timed("hi_res", 0, path)
+        stats["hi_res"]["pages"] = len({r["page_number"] for r in records if r["page_number"]})
+        return records, stats
+    stats["classes"] = class_counts(labels)
+
+    runs = plan_page_runs(labels)
+    if len(runs) == 1:
+        return timed(runs[0][0], len(labels), path), stats
+
+    reader = PdfReader(path)
+    records = []
+    for index, (strategy, first, last) in enumerate(runs):
+        part_path = write_page_range(reader, first, last, f"{path}.{index}.pdf")
+        try:
+            for record in timed(strategy, last - first + 1, part_path):
+                record["page_number"] = first + (record["page_number"] or 1) - 1
+                records.append(record)
+        finally:
+            os.remove(part_path)
+    return records, stats
+
+
+def count_pages(elements: List) -> int:
+    return len({el.metadata.page_number for el in elements if el.metadata.page_number})
+
+
+def _worker_context():
+    """
+    forkserver: 깨끗한 서버 프로세스가 이 모듈(unstructured 포함)을 한 번 임포트해 두고 작업마다 fork합니다.
+    부모가 임베딩 모델(torch 스레드 풀)을 로드한 뒤에도 안전하며, spawn보다 기동 비용이 작습니다.
+    """
+    if "forkserver" not in mp.get_all_start_methods():
+        return mp.get_context()
+    ctx = mp.get_context("forkserver")
+    ctx.set_forkserver_preload([__name__])
+    return ctx
+
+
+def _partition_worker(conn, pdf_key: str, path: str) -> None:
+    # 워커 프로세스: 결과(요소 레코드 목록) 또는 오류 메시지를 파이프로 돌려줌
+    try:
+        conn.send(("ok", partition_pdf_file(path, pdf_key)))
+    except Exception as e:
+        conn.send(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+
+def _cached_result(cache: Optional[PartitionCache], key: str, digest: str) -> Optional[PartitionResult]:
+    if cache is None or not digest:
+        return None
+    records = cache.get(digest)
+    if records is None:
+        return None
+    elements = elements_from_records(records, key)
+    return PartitionResult(key, digest, elements, count_pages(elements), cached=True)
+
+
+class _HashingWriter:
+    """쓰는 내용의 SHA-256을 함께 계산하는 파일 래퍼 (다운로드 스트림을 메모리에 모으지 않고 해시 계산)"""
+
+    def __init__(self, f: BinaryIO):
+        self._f = f
+        self._hash = hashlib.sha256()
+
+    def write(self, data: bytes) -> int:
+        self._hash.update(data)
+        return self._f.write(data)
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+
+def _download_one(index: int, key: str, fetch: Callable[[str, BinaryIO], None], workdir: str,
+                  skip_if: Optional[Callable[[str, str], bool]], cache: Optional[PartitionCache],
+                  known_digest: Optional[Callable[[str], Optional[str]]]):
+    cached = _cached_result(cache, key, known_digest(key) if known_digest else "")
+    if cached is not None:
+        return cached
+    path = os.path.join(workdir, f"{index}.pdf")
+    try:
+        with open(path, "wb") as f:
+            writer = _HashingWriter(f)
+            fetch(key, writer)
+        digest = writer.hexdigest()
+        if skip_if is not None and skip_if(key, digest):
+            os.remove(path)
+            return PartitionResult(key, sha256=digest, skipped=True)
+        cached = _cached_result(cache, key, digest)
+        if cached is not None:
+            os.remove(path)
+            return cached
+        return key, digest, path
+    except Exception:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+
+
+def _download_all(keys: List[str], fetch: Callable[[str, BinaryIO], None], workdir: str, ready: "queue.Queue",
+                  skip_if: Optional[Callable[[str, str], bool]], cache: Optional[PartitionCache],
+                  known_digest: Optional[Callable[[str], Optional[str]]], stop: threading.Event,
+                  concurrency: int = DOWNLOAD_CONCURRENCY) -> None:
+    """
+    파티셔닝과 겹치도록 백그라운드에서 PDF를 임시 파일로 내려받습니다. (최대 concurrency개 동시 다운로드)
+    fetch(key, out)는 객체를 out에 스트리밍으로 기록하므로 큰 스캔본도 메모리에 통째로 올리지 않습니다.
+    ready 큐의 크기로 미리 받아 두는 파일 수(디스크 사용량)를 제한합니다.
+    내용 해시를 이미 알고(known_digest) 캐시에 있으면 다운로드도 생략합니다.
+    """
+    pending = iter(list(enumerate(keys)))
+    lock = threading.Lock()
+
+    def run() -> None:
+        while not stop.is_set():
+            with lock:
+                item = next(pending, None)
+            if item is None:
+                return
+            index, key = item
+            try:
+                ready.put(_download_one(index, key, fetch, workdir, skip_if, cache, known_digest))
+            except Exception as e:
+                ready.put(PartitionResult(key, error=f"download failed: {type(e).__name__}: {e}"))
+
+    threads = [threading.Thread(target=run, daemon=True) for _ in range(max(1, concurrency))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    ready.put(None)
+
+
+def partition_in_pool(keys: List[str], fetch: Callable[[str, BinaryIO], None], workers: int = PARTITION_WORKERS,
+                      timeout: float = PARTITION_TIMEOUT_SECONDS,
+                      skip_if: Optional[Callable[[str, str], bool]] = None,
+                      cache: Optional[PartitionCache] = None,
+                      known_digest: Optional[Callable[[str], Optional[str]]] = None) -> Iterator[PartitionResult]:
+    """
+    PDF들을 최대 workers개의 프로세스에서 병렬로 파티셔닝하고, 끝나는 순서대로 결과를 내보냅니다.
+
+    - 파일마다 별도 프로세스를 사용하므로 한 파일의 크래시/메모리 폭주가 다른 파일에 영향을 주지 않으며,
+      timeout을 넘긴 파일은 해당 프로세스만 종료하고 오류 결과로 보고합니다.
+    - 다운로드는 별도 스레드(DOWNLOAD_CONCURRENCY개)에서 미리 진행되어 파티셔닝과 겹칩니다.
+      fetch(key, out)는 객체 내용을 out(파일)에 기록해야 합니다.
+    - skip_if(key, sha256)가 참이면 파티셔닝하지 않고 skipped 결과를 냅니다.
+    - cache가 주어지면 같은 내용(SHA-256)·같은 파티셔너 설정의 이전 결과를 재사용하고, 새 결과를 저장합니다.
+      known_digest(key)로 내용 해시를 미리 알 수 있으면(매니페스트) 캐시 적중 시 다운로드도 하지 않습니다.
+    """
+    workers = max(1, workers)
+    ctx = _worker_context()
+    ready: "queue.Queue" = queue.Queue(maxsize=workers * 2)
+    stop = threading.Event()
+    running = {}
+    downloads_done = False
+
+    with tempfile.TemporaryDirectory(prefix="partition_") as workdir:
+        downloader = threading.Thread(
+            target=_download_all, args=(keys, fetch, workdir, ready, skip_if, cache, known_digest, stop), daemon=True
+        )
+        downloader.start()
+        try:
+            while not downloads_done or running:
+                # 빈 슬롯에 내려받은 파일 배정 (실행 중인 작업이 없으면 다운로드를 기다림)
+                while not downloads_done and len(running) < workers:
+                    try:
+                        item = ready.get(timeout=0.1) if running else ready.get()
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        downloads_done = True
+                    elif isinstance(item, PartitionResult):
+                        yield item
+                    else:
+                        key, digest, path = item
+                        parent_conn, child_conn = ctx.Pipe(duplex=False)
+                        proc = ctx.Process(target=_partition_worker, args=(child_conn, key, path))
+                        proc.start()
+                        child_conn.close()
+                        running[parent_conn] = (proc, key, digest, path, time.monotonic())
+
+                if not running:
+                    continue
+
+                for conn in wait(list(running), timeout=1.0):
+                    proc, key, digest, path, started = running.pop(conn)
+                    try:
+                        status, payload = conn.recv()
+                    except EOFError:
+                        status, payload = "error", f"worker exited unexpectedly (exit code {proc.exitcode})"
+                    conn.close()
+                    proc.join()
+                    os.remove(path)
+                    elapsed = time.monotonic() - started
+                    if status == "ok":
+                        records, strategy_stats = payload
+                        if cache is not None:
+                            cache.put(digest, records)
+                        elements = elements_from_records(records, key)
+                        yield PartitionResult(
+                            key, digest, elements, count_pages(elements), elapsed, strategy_stats=strategy_stats
+                        )
+                    else:
+                        yield PartitionResult(key, digest, seconds=elapsed, error=payload)
+
+                now = time.monotonic()
+                for conn, (proc, key, digest, path, started) in list(running.items()):
+                    if now - started > timeout:
+                        proc.kill()
+                        proc.join()
+                        conn.close()
+                        os.remove(path)
+                        del running[conn]
+                        yield PartitionResult(key, digest, seconds=now - started, error=f"timed out after {timeout:.0f}s")
+        finally:
+            stop.set()
+            for conn, (proc, *_rest) in running.items():
+                proc.kill()
+                proc.join()
+                conn.close()
+            # 다운로드 스레드가 큐에서 막혀 있지 않도록 비움
+            while downloader.is_alive():
+                try:
+                    ready.get(timeout=0.1)
+                except queue.Empty:
+                    pass
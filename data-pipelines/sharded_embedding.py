@@ -0,0 +1,83 @@
+import os
+import math
+import logging
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+# 인제스천 임베딩 병렬 프로세스 수 (1이면 단일 프로세스) / 워커당 torch 스레드 수 (0이면 할당된 코어 수)
+EMBEDDING_WORKERS = int(os.getenv("EMBEDDING_WORKERS", 1))
+EMBEDDING_THREADS_PER_WORKER = int(os.getenv("EMBEDDING_THREADS_PER_WORKER", 0))
+
+_worker_model = None
+
+
+def _init_worker(model_name: str, device: str, workers: int, threads: int, counter) -> None:
+    """워커 초기화: 순번에 따라 코어 구간에 고정하고 스레드 수를 제한한 뒤 모델을 한 번 로드합니다."""
+    global _worker_model
+    with counter.get_lock():
+        index = counter.value
+        counter.value += 1
+
+    cores = []
+    if hasattr(os, "sched_getaffinity"):
+        available = sorted(os.sched_getaffinity(0))
+        per_worker = max(1, len(available) // workers)
+        cores = available[index * per_worker:(index + 1) * per_worker] or available[-per_worker:]
+        os.sched_setaffinity(0, cores)
+    num_threads = threads or max(1, len(cores) or (os.cpu_count() or 1) // workers)
+    # torch 임포트 전에 설정해야 OpenMP/MKL 스레드 풀에 반영됨
+    os.environ["OMP_NUM_THREADS"] = str(num_threads)
+    os.environ["MKL_NUM_THREADS"] = str(num_threads)
+    import torch
+    torch.set_num_threads(num_threads)
+
+    # injest_pdfs(Chroma/boto3/unstructured 등)를 워커마다 임포트하지 않도록 모델 로더만 가져옴
+    from embedding_model import load_embedding_model
+    _worker_model = load_embedding_model(model_name, device)
+    logging.info(f"Embedding worker {index} ready (cores {cores or 'all'}, {num_threads} threads)")
+
+
+def _embed_shard(texts: List[str]) -> List[List[float]]:
+    return _worker_model.embed_documents(texts)
+
+
+def _embed_query(text: str) -> List[float]:
+    return _worker_model.embed_query(text)
+
+
+class ShardedEmbeddings:
+    """
+    청크 임베딩을 여러 프로세스에 나누어 계산합니다. (HuggingFaceEmbeddings.embed_documents와 같은 인터페이스)
+    각 워커는 전체 코어를 workers개로 나눈 구간에 고정되고 스레드 수가 제한되어 서로 경쟁하지 않으며,
+    입력을 연속 구간(샤드)으로 나누어 보낸 뒤 원래 순서대로 합쳐 반환합니다.
+    """
+
+    def __init__(self, model_name: str, device: str, workers: int = EMBEDDING_WORKERS,
+                 threads_per_worker: int = EMBEDDING_THREADS_PER_WORKER, min_shard_size: int = 8):
+        self.workers = max(1, workers)
+        self.min_shard_size = min_shard_size
+        ctx = mp.get_context("spawn")
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(model_name, device, self.workers, threads_per_worker, ctx.Value("i", 0)),
+        )
+        logging.info(f"Sharded embedding: {self.workers} worker processes for {model_name}")
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        shards = max(1, min(self.workers, len(texts) // self.min_shard_size))
+        size = math.ceil(len(texts) / shards)
+        vectors: List[List[float]] = []
+        for shard in self._executor.map(_embed_shard, [texts[i:i + size] for i in range(0, len(texts), size)]):
+            vectors.extend(shard)
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._executor.submit(_embed_query, text).result()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
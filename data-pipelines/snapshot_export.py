@@ -0,0 +1,126 @@
+import os
+import json
+import shutil
+import hashlib
+import logging
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+
+from dedup import ref_key, reference_sources, localize
+
+SNAPSHOT_FORMAT = 1
+FETCH_BATCH_SIZE = 1000
+
+
+def partition_slug(source: str) -> str:
+    """원본 파일명을 파일시스템/컬렉션 이름에 안전한 고정 길이 식별자로 변환합니다."""
+    return hashlib.sha1(source.encode("utf-8")).hexdigest()[:16]
+
+
+def fetch_collection_records(collection, include: List[str], where: Optional[Dict] = None) -> Dict[str, list]:
+    """Chroma 컬렉션의 (where 조건에 맞는) 전체 레코드를 배치 단위로 읽어옵니다."""
+    records = {"ids": [], **{field: [] for field in include}}
+    for batch in iter_collection_batches(collection, include, where):
+        records["ids"].extend(batch["ids"])
+        for field in include:
+            records[field].extend(batch[field])
+    return records
+
+
+def iter_collection_batches(collection, include: List[str], where: Optional[Dict] = None) -> Iterator[Dict[str, list]]:
+    offset = 0
+    while True:
+        batch = collection.get(include=include, where=where, limit=FETCH_BATCH_SIZE, offset=offset)
+        if not batch["ids"]:
+            break
+        yield batch
+        offset += len(batch["ids"])
+
+
+def iter_collection_records(collections: List, include: List[str]) -> Iterator[Tuple]:
+    """여러 컬렉션(파티션)의 레코드를 (id, *include 필드) 튜플로 하나씩 내보냅니다. (전체를 메모리에 올리지 않음)"""
+    for collection in collections:
+        for batch in iter_collection_batches(collection, include):
+            yield from zip(batch["ids"], *(batch[field] for field in include))
+
+
+def collection_sources(collection) -> List[str]:
+    source = (collection.metadata or {}).get("source")
+    if source:
+        return [source]
+    sources = set()
+    for batch in iter_collection_batches(collection, ["metadatas"]):
+        for meta in batch["metadatas"]:
+            sources.add((meta or {}).get("source", "unknown_file"))
+            # 중복 제거로 청크를 하나도 소유하지 않는 파일도 참조로 포함
+            sources.update(reference_sources(meta))
+    return sorted(sources)
+
+
+def source_filter(source: str, dedup: bool = False) -> Dict:
+    """단일 컬렉션에서 source의 청크를 고르는 where 필터 (dedup이면 source가 참조하는 다른 파일의 대표 청크 포함)"""
+    if not dedup:
+        return {"source": source}
+    return {"$or": [{"source": source}, {ref_key(source): {"$gte": 0}}]}
+
+
+def export_vector_snapshot(collections: List, snapshot_root: str, version: str, keep: int = 2,
+                           dedup: bool = False) -> str:
+    """
+    컬렉션(들)을 에이전트가 프로세스 내에서 직접 검색할 수 있는 읽기 전용 스냅샷으로 내보냅니다.
+    원본 파일(source) 단위로 읽고 기록하므로 메모리 사용량은 가장 큰 파일 하나에 비례합니다.
+
+    snapshot_root/<version>/
+        manifest.json          : 버전, 차원, 원본 파일(source)별 파티션 목록
+        <slug>.f32.npy         : 파티션 임베딩 행렬 (float32, 메모리 매핑용)
+        <slug>.json            : 같은 순서의 ids / documents / metadatas
+    snapshot_root/CURRENT      : 활성 버전 이름 (모든 파일 기록 후 원자적으로 교체)
+
+    dedup이면 다른 파일의 대표 청크를 참조하는 위치도 해당 파일의 파티션에 (그 파일 기준 메타데이터로) 포함합니다.
+    """
+    include = ["embeddings", "documents", "metadatas"]
+    out_dir = os.path.join(snapshot_root, version)
+    os.makedirs(out_dir, exist_ok=True)
+
+    partitions = {}
+    dim = 0
+    total = 0
+    for collection in collections:
+        per_source_collection = bool((collection.metadata or {}).get("source"))
+        for source in collection_sources(collection):
+            where = None if per_source_collection else source_filter(source, dedup)
+            records = fetch_collection_records(collection, include=include, where=where)
+            if not records["ids"]:
+                continue
+            if dedup:
+                localized = [localize(meta, text, source) for meta, text in zip(records["metadatas"], records["documents"])]
+                records["metadatas"] = [meta for meta, _ in localized]
+                records["documents"] = [text for _, text in localized]
+            slug = partition_slug(source)
+            matrix = np.asarray(records["embeddings"], dtype=np.float32)
+            dim = matrix.shape[1]
+            np.save(os.path.join(out_dir, f"{slug}.f32.npy"), matrix)
+            with open(os.path.join(out_dir, f"{slug}.json"), "w", encoding="utf-8") as f:
+                json.dump({
+                    "ids": records["ids"],
+                    "documents": records["documents"],
+                    "metadatas": records["metadatas"],
+                }, f, ensure_ascii=False)
+            partitions[source] = {"slug": slug, "count": len(records["ids"])}
+            total += len(records["ids"])
+
+    with open(os.path.join(out_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump({"format": SNAPSHOT_FORMAT, "version": version, "dim": dim, "partitions": partitions}, f, ensure_ascii=False)
+
+    pointer_tmp = os.path.join(snapshot_root, "CURRENT.tmp")
+    with open(pointer_tmp, "w") as f:
+        f.write(version)
+    os.replace(pointer_tmp, os.path.join(snapshot_root, "CURRENT"))
+    logging.info(f"Vector snapshot exported: {out_dir} ({total} chunks, {len(partitions)} partitions)")
+
+    # 이전 스냅샷 정리 (읽는 중인 에이전트를 위해 최근 keep개는 유지)
+    versions = sorted(d for d in os.listdir(snapshot_root) if os.path.isdir(os.path.join(snapshot_root, d)))
+    for old in versions[:-keep]:
+        if old != version:
+            shutil.rmtree(os.path.join(snapshot_root, old), ignore_errors=True)
+    return out_dir